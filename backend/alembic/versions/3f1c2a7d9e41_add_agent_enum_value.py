@@ -0,0 +1,27 @@
+"""add AGENT enum value
+
+Revision ID: 3f1c2a7d9e41
+Revises: 8b8a0b4796e0
+Create Date: 2026-01-05 10:12:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a7d9e41"
+down_revision: Union[str, Sequence[str], None] = "8b8a0b4796e0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add AGENT to chatmode enum."""
+    op.execute("ALTER TYPE chatmode ADD VALUE IF NOT EXISTS 'AGENT'")
+
+
+def downgrade() -> None:
+    """Enum value removal is not supported automatically."""
+    # PostgreSQL does not support removing enum values easily; leave as-is.
+    pass
@@ -0,0 +1,40 @@
+"""add usage columns to message
+
+Revision ID: a7d3e5b1c902
+Revises: 3f1c2a7d9e41
+Create Date: 2026-01-09 14:03:27.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e5b1c902'
+down_revision: Union[str, Sequence[str], None] = '3f1c2a7d9e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('message', sa.Column('model', sa.String(), nullable=True))
+    op.add_column('message', sa.Column('input_tokens', sa.Integer(), nullable=True))
+    op.add_column('message', sa.Column('output_tokens', sa.Integer(), nullable=True))
+    op.add_column('message', sa.Column('cached_tokens', sa.Integer(), nullable=True))
+    op.add_column('message', sa.Column('ttft_ms', sa.Integer(), nullable=True))
+    op.add_column('message', sa.Column('duration_ms', sa.Integer(), nullable=True))
+    op.create_index('ix_message_created_at', 'message', ['created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_message_created_at', table_name='message')
+    op.drop_column('message', 'duration_ms')
+    op.drop_column('message', 'ttft_ms')
+    op.drop_column('message', 'cached_tokens')
+    op.drop_column('message', 'output_tokens')
+    op.drop_column('message', 'input_tokens')
+    op.drop_column('message', 'model')
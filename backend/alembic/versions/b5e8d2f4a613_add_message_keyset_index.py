@@ -0,0 +1,28 @@
+"""add message keyset index
+
+Revision ID: b5e8d2f4a613
+Revises: f7c3d1e8a925
+Create Date: 2026-10-19 09:12:41.503318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e8d2f4a613'
+down_revision: Union[str, Sequence[str], None] = 'f7c3d1e8a925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_message_session_created_id', 'message', ['session_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_message_session_created_id', table_name='message')
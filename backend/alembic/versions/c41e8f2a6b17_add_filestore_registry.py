@@ -0,0 +1,41 @@
+"""add filestore registry
+
+Revision ID: c41e8f2a6b17
+Revises: a7d3e5b1c902
+Create Date: 2026-01-12 10:21:45.306118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e8f2a6b17'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e5b1c902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('filestore',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(), nullable=False),
+    sa.Column('chunking_key', sa.String(), nullable=False),
+    sa.Column('store_name', sa.String(), nullable=False),
+    sa.Column('file_name', sa.String(), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash', 'chunking_key', name='uq_filestore_content'),
+    sa.UniqueConstraint('store_name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('filestore')
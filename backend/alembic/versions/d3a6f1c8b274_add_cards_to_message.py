@@ -0,0 +1,28 @@
+"""add cards to message
+
+Revision ID: d3a6f1c8b274
+Revises: b5e8d2f4a613
+Create Date: 2026-10-19 10:12:41.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a6f1c8b274'
+down_revision: Union[str, Sequence[str], None] = 'b5e8d2f4a613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('message', sa.Column('cards', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('message', 'cards')
@@ -0,0 +1,28 @@
+"""add file search status to session
+
+Revision ID: e2b9a4c7d310
+Revises: c41e8f2a6b17
+Create Date: 2026-01-14 16:48:09.552731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b9a4c7d310'
+down_revision: Union[str, Sequence[str], None] = 'c41e8f2a6b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('session', sa.Column('file_search_status', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('session', 'file_search_status')
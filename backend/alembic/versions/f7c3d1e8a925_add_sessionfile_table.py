@@ -0,0 +1,43 @@
+"""add sessionfile table
+
+Revision ID: f7c3d1e8a925
+Revises: e2b9a4c7d310
+Create Date: 2026-01-16 11:37:52.840163
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c3d1e8a925'
+down_revision: Union[str, Sequence[str], None] = 'e2b9a4c7d310'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sessionfile',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('file_name', sa.String(), nullable=False),
+    sa.Column('content_hash', sa.String(), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['session_id'], ['session.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id', 'content_hash', name='uq_sessionfile_content')
+    )
+    op.create_index('ix_sessionfile_session_id', 'sessionfile', ['session_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sessionfile_session_id', table_name='sessionfile')
+    op.drop_table('sessionfile')
@@ -1,11 +1,25 @@
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncGenerator, AsyncIterator, Callable, Dict
 
 from fastapi import Depends
 
+from app.core.admission import (
+    UPSTREAM_EXA,
+    UPSTREAM_GEMINI_CHAT,
+    UPSTREAM_GEMINI_FILE_SEARCH,
+    AdmissionController,
+    build_admission_controllers,
+)
 from app.core.config import Settings, get_settings
-from app.core.database import get_db_session
+from app.core.database import AsyncSessionLocal, get_db_session
+from app.services.agent_service import AgentService
+from app.services.citation_preview import CitationPreviewIndex, build_citation_previews
 from app.services.exa_service import ExaService
 from app.services.history_service import HistoryService
+from app.services.indexing_jobs import IndexingJobManager
+from app.services.store_reaper import StoreReaper
+from app.services.store_registry import StoreRegistry
+from app.services.usage_service import UsageService
 from app.services.llm_service import GeminiService
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.file_search_service import FileSearchService
@@ -17,6 +31,10 @@ from app.services.file_search_service import FileSearchService
 _gemini_service: GeminiService | None = None
 _exa_service: ExaService | None = None
 _file_search_service = None
+_admission_controllers: Dict[str, AdmissionController] | None = None
+_indexing_jobs: IndexingJobManager | None = None
+_store_reaper: StoreReaper | None = None
+_citation_previews: CitationPreviewIndex | None = None
 
 
 def get_gemini_service() -> GeminiService:
@@ -48,9 +66,112 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 # --- History Service Dependency ---
 def get_history_service(db: AsyncSession = Depends(get_db)) -> HistoryService:
     return HistoryService(db)
+
+
+# --- Scoped History Service (own DB session, for long-lived connections) ---
+@asynccontextmanager
+async def history_service_scope() -> AsyncIterator[HistoryService]:
+    async with AsyncSessionLocal() as session:
+        yield HistoryService(session)
+
+
+def get_history_scope_factory() -> Callable[[], AsyncContextManager[HistoryService]]:
+    """
+        WebSocket streams run concurrently, so each needs its own DB session.
+    """
+    return history_service_scope
+
+
+# --- Usage Service Dependency ---
+def get_usage_service(db: AsyncSession = Depends(get_db)) -> UsageService:
+    return UsageService(db)
+
+
+# --- Store Registry Dependency ---
+def get_store_registry(db: AsyncSession = Depends(get_db)) -> StoreRegistry:
+    return StoreRegistry(db)
+
+
 # --- File Search Service Dependency ---
 def get_file_search_service() -> FileSearchService:
     global _file_search_service
     if _file_search_service is None:
         _file_search_service = FileSearchService()
-    return _file_search_service
\ No newline at end of file
+    return _file_search_service
+
+
+# --- Admission Control Dependencies ---
+def get_admission_controllers() -> Dict[str, AdmissionController]:
+    global _admission_controllers
+    if _admission_controllers is None:
+        _admission_controllers = build_admission_controllers(get_settings())
+    return _admission_controllers
+
+
+def get_chat_admission() -> AdmissionController:
+    return get_admission_controllers()[UPSTREAM_GEMINI_CHAT]
+
+
+def get_file_search_admission() -> AdmissionController:
+    return get_admission_controllers()[UPSTREAM_GEMINI_FILE_SEARCH]
+
+
+def get_exa_admission() -> AdmissionController:
+    return get_admission_controllers()[UPSTREAM_EXA]
+
+
+# --- Citation Preview Index Dependency ---
+def get_citation_previews() -> CitationPreviewIndex | None:
+    global _citation_previews
+    if _citation_previews is None:
+        _citation_previews = build_citation_previews()
+    return _citation_previews
+
+
+# --- Indexing Job Manager Dependency ---
+def get_indexing_jobs() -> IndexingJobManager:
+    global _indexing_jobs
+    if _indexing_jobs is None:
+        _indexing_jobs = IndexingJobManager(
+            get_file_search_service(),
+            session_factory=AsyncSessionLocal,
+            previews=get_citation_previews(),
+        )
+    return _indexing_jobs
+
+
+# --- Store Lifecycle Dependency ---
+def get_store_reaper() -> StoreReaper:
+    global _store_reaper
+    if _store_reaper is None:
+        _store_reaper = StoreReaper(
+            get_file_search_service(),
+            session_factory=AsyncSessionLocal,
+            previews=get_citation_previews(),
+        )
+    return _store_reaper
+
+
+# --- Agent Service Dependency ---
+# NOTE: Cheap to build per request; it only wires the cached services together.
+def get_agent_service(
+    gemini: GeminiService = Depends(get_gemini_service),
+    exa: ExaService = Depends(get_exa_service),
+    exa_admission: AdmissionController = Depends(get_exa_admission),
+) -> AgentService:
+    return AgentService(gemini, exa, exa_admission=exa_admission)
+
+
+# --- Shutdown Hook ---
+async def shutdown_services() -> None:
+    """
+        Releases upstream resources held by the cached service instances.
+    """
+    if _store_reaper is not None:
+        await _store_reaper.close()
+    if _indexing_jobs is not None:
+        await _indexing_jobs.close()
+    if _file_search_service is not None:
+        await _file_search_service.operation_poller.close()
+        if _file_search_service.preprocessor is not None:
+            _file_search_service.preprocessor.close()
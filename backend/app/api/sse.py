@@ -0,0 +1,160 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Deque, Optional
+
+from pydantic import BaseModel
+
+from app.core.config import get_settings
+from app.core.logging import app_logger
+from app.schemas.chat import ChatStreamResponse
+
+settings = get_settings()
+
+# --- Slow client policies ---
+POLICY_COALESCE = "coalesce"      # merge queued token frames into one
+POLICY_DROP = "drop"              # discard intermediate token frames
+POLICY_DISCONNECT = "disconnect"  # end the stream
+
+# --- SSE comment frame; ignored by EventSource, keeps idle proxies from closing ---
+HEARTBEAT_FRAME = ": ping\n\n"
+
+
+def format_sse(event: BaseModel) -> str:
+    """
+        Serialises one stream event as an SSE `data:` frame (null fields omitted).
+    """
+    return f"data: {event.model_dump_json(exclude_none=True)}\n\n"
+
+
+def _is_token(event: BaseModel) -> bool:
+    return getattr(event, "type", None) == "token"
+
+
+class SlowClient(Exception):
+    """
+        Raised by the buffer under the disconnect policy when the client falls behind.
+    """
+
+
+class EventBuffer:
+    """
+    Bounded buffer between the upstream reader and the response writer.
+
+    When `max_frames` are already waiting, the policy decides what happens
+    to the next frame. Only `token` frames are ever merged or dropped;
+    structural frames (citations, cards, done, error) always get through,
+    waiting for space if they must, which in turn pauses the upstream read.
+    """
+
+    def __init__(self, max_frames: int, policy: str):
+        self.max_frames = max(1, max_frames)
+        self.policy = policy
+        self.coalesced = 0
+        self.dropped = 0
+        self._frames: Deque[BaseModel] = deque()
+        self._closed = False
+        self._changed = asyncio.Condition()
+
+    async def put(self, event: BaseModel) -> None:
+        async with self._changed:
+            while len(self._frames) >= self.max_frames:
+                if self.policy == POLICY_DISCONNECT:
+                    raise SlowClient()
+                if _is_token(event):
+                    tail = self._frames[-1]
+                    if self.policy == POLICY_COALESCE and _is_token(tail):
+                        tail.content = (tail.content or "") + (event.content or "")
+                        self.coalesced += 1
+                        return
+                    if self.policy == POLICY_DROP:
+                        self.dropped += 1
+                        return
+                await self._changed.wait()
+            self._frames.append(event)
+            self._changed.notify_all()
+
+    async def get(self, timeout: float) -> Optional[BaseModel]:
+        """
+            Next frame, or None when `timeout` passes first. Raises
+            StopAsyncIteration once closed and drained.
+        """
+        async with self._changed:
+            if not self._frames and not self._closed:
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: self._frames or self._closed),
+                        timeout
+                    )
+                except asyncio.TimeoutError:
+                    return None
+            if self._frames:
+                event = self._frames.popleft()
+                self._changed.notify_all()
+                return event
+            raise StopAsyncIteration
+
+    async def close(self, discard: bool = False) -> None:
+        async with self._changed:
+            self._closed = True
+            if discard:
+                self._frames.clear()
+            self._changed.notify_all()
+
+
+async def sse_stream(
+    events: AsyncIterator[BaseModel],
+    max_frames: Optional[int] = None,
+    policy: Optional[str] = None,
+    heartbeat: Optional[float] = None
+) -> AsyncIterator[str]:
+    """
+    Adapts an event pipeline (ChatStreamResponse, job status, ...) to a
+    text/event-stream body.
+
+    The pipeline runs in its own task and writes into an EventBuffer, so a
+    slow reader is handled by the slow-client policy instead of holding
+    an unbounded backlog. While nothing is ready, a heartbeat comment is
+    sent every `heartbeat` seconds.
+    """
+    buffer = EventBuffer(
+        max_frames or settings.SSE_BUFFER_SIZE,
+        policy or settings.SSE_SLOW_CLIENT_POLICY
+    )
+    heartbeat = heartbeat or settings.SSE_HEARTBEAT_S
+    slow_client = False
+
+    async def pump():
+        nonlocal slow_client
+        try:
+            async for event in events:
+                await buffer.put(event)
+        except SlowClient:
+            slow_client = True
+        finally:
+            await buffer.close(discard=slow_client)
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    producer = asyncio.create_task(pump())
+    try:
+        while True:
+            try:
+                event = await buffer.get(heartbeat)
+            except StopAsyncIteration:
+                break
+            yield HEARTBEAT_FRAME if event is None else format_sse(event)
+
+        if slow_client:
+            app_logger.warning("SSE client too slow; stream closed")
+            yield format_sse(ChatStreamResponse(type="error", content="Connection too slow; stream closed."))
+        elif buffer.coalesced or buffer.dropped:
+            app_logger.info(
+                f"SSE slow client | Policy: {buffer.policy} | "
+                f"Coalesced: {buffer.coalesced} | Dropped: {buffer.dropped}"
+            )
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
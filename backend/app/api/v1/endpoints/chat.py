@@ -1,83 +1,195 @@
+import asyncio
 import json
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
-from app.api.deps import get_gemini_service, get_history_service
+from starlette.background import BackgroundTask
+from typing import AsyncIterator
+from app.api.deps import get_gemini_service, get_history_service, get_chat_admission, get_agent_service
+from app.api.sse import sse_stream
+from app.core.admission import AdmissionController, release_after
+from app.core.config import get_settings
+from app.core.deadline import RequestDeadline, no_deadline
+from app.services.agent_service import AgentService
 from app.services.llm_service import GeminiService
 from app.services.history_service import HistoryService
 from app.schemas.chat import ChatMessageRequest, ChatStreamResponse, SourceCitation
+from app.schemas.common import ChatMode
 from app.core.logging import app_logger
 
 router = APIRouter(prefix="/chat", tags=["chat"])
+settings = get_settings()
 
-async def event_generator(
-    service: GeminiService, 
-    history_service: HistoryService,
+# --- Sentinel closing the upstream queue ---
+_STREAM_END = object()
+
+
+def _open_upstream(
+    service: GeminiService,
+    agent_service: AgentService | None,
     request: ChatMessageRequest
+) -> AsyncIterator[ChatStreamResponse]:
+    """
+        Picks the upstream pipeline for the requested mode.
+    """
+    if request.mode == ChatMode.AGENT and agent_service is not None:
+        return agent_service.chat_stream(request.message, request.model)
+    return service.chat_stream(request.message, request.mode, request.model)
+
+
+async def _pump_upstream(
+    stream: AsyncIterator[ChatStreamResponse],
+    queue: asyncio.Queue
 ):
     """
+        Reads the upstream stream into `queue` so it runs independently of DB writes.
+        Exceptions are forwarded through the queue and reported by the reader.
+    """
+    try:
+        async for chunk in stream:
+            await queue.put(chunk)
+    except Exception as e:
+        await queue.put(e)
+    finally:
+        await queue.put(_STREAM_END)
+
+
+async def chat_events(
+    service: GeminiService, 
+    history_service: HistoryService,
+    request: ChatMessageRequest,
+    agent_service: AgentService | None = None
+) -> AsyncIterator[ChatStreamResponse]:
+    """
+    Transport-agnostic chat pipeline (used by SSE and WebSocket).
+
     Handles:
-    1. Session Creation/Retrieval
-    2. Message Persistence (User)
-    3. Streaming Response
-    4. Message Persistence (AI)
+    1. Streaming Response (started first, so TTFT never waits on the DB)
+    2. Session Creation + User Message (one transaction, concurrently with 1)
+    3. Message Persistence (AI text with its cards, one message)
+
+    `session_created` is always the first event of a new conversation:
+    buffered upstream tokens are only released once the session exists.
     """
-    
-    # ---  Handle Session ID ---
-    session_id = request.conversation_id
-    if not session_id:
-        title = request.message[:30] + "..." if len(request.message) > 30 else request.message
-        new_session = await history_service.create_session(title=title, mode=request.mode)
-        session_id = new_session.id
-        id_event = {"type": "session_created", "session_id": session_id, "title": title}
-        yield f"data: {json.dumps(id_event)}\n\n"
-
-    # ---  Persist User Message ---
-    await history_service.add_message(
-        session_id=session_id,
-        role="user",
-        content=request.message
-    )
+    title = request.message[:30] + "..." if len(request.message) > 30 else request.message
 
-    # --- Stream & Accumulate AI Response ----
-    full_response_text = ""
-    citations_data = []
+    async def open_session() -> int:
+        if request.conversation_id:
+            return request.conversation_id
+        # --- New conversation: the session and the user turn are one unit of work ---
+        batch = await (
+            history_service.batch()
+            .create_session(title=title, mode=request.mode)
+            .add_message(role="user", content=request.message)
+            .flush()
+        )
+        return batch.session_id
+
+    async def persist_user_message(session_task: asyncio.Task) -> None:
+        session_id = await session_task
+        if request.conversation_id:
+            await history_service.batch(session_id).add_message(role="user", content=request.message).flush()
+
+    # --- Kick off upstream first, then the history writes ---
+    upstream: asyncio.Queue = asyncio.Queue(maxsize=64)
+    upstream_task = asyncio.create_task(
+        _pump_upstream(_open_upstream(service, agent_service, request), upstream)
+    )
+    session_task = asyncio.create_task(open_session())
+    user_message_task = asyncio.create_task(persist_user_message(session_task))
+    for task in (session_task, user_message_task):
+        # --- Failures are reported inline; don't let asyncio warn about them ---
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
 
     try:
-        async for chunk in service.chat_stream(request.message, request.mode, request.model):
+        # ---  Handle Session ID ---
+        try:
+            session_id = await session_task
+        except Exception as e:
+            app_logger.error(f"Session creation failed: {str(e)}")
+            yield ChatStreamResponse(type="error", content="Error saving chat history.")
+            return
+
+        if not request.conversation_id:
+            yield ChatStreamResponse(type="session_created", session_id=session_id, title=title)
+
+        # --- Stream & Accumulate AI Response ----
+        full_response_text = ""
+        citations_data = []
+        cards_data = []
+        usage = None
+
+        while True:
+            chunk = await upstream.get()
+            if chunk is _STREAM_END:
+                break
+            if isinstance(chunk, Exception):
+                app_logger.error(f"Stream Error: {str(chunk)}")
+                yield ChatStreamResponse(
+                    type="error",
+                    content="The AI service is unavailable. Please try again."
+                )
+                continue
+
             # Pass through to frontend
-            yield f"data: {chunk.model_dump_json()}\n\n"
-            
+            yield chunk
+
             # Accumulate text for DB
             if chunk.type == "token" and chunk.content:
                 full_response_text += chunk.content
-            
-            # Capture citations for DB
+
+            # Capture citations for DB (emitted incrementally, each event holds new sources)
             if chunk.type == "citation" and chunk.sources:
-                citations_data = chunk.sources
-
-        # 4. Persist AI Message (After stream completes)
-        # Convert citations to JSON string if they exist
-        sources_json = json.dumps([c.model_dump() for c in citations_data]) if citations_data else None
-        
-        await history_service.add_message(
-            session_id=session_id,
-            role="assistant",
-            content=full_response_text,
-            sources=sources_json
-        )
+                citations_data.extend(chunk.sources)
 
-    except Exception as e:
-        app_logger.error(f"Stream Error: {str(e)}")
-        error_resp = ChatStreamResponse(type="error", content="Error saving chat history.")
-        yield f"data: {error_resp.model_dump_json()}\n\n"
+            # Capture usage accounting for DB
+            if chunk.type == "done":
+                usage = chunk.usage
+
+            # Capture agent cards for DB
+            if chunk.type == "cards" and chunk.cards:
+                cards_data.extend(chunk.cards)
+
+        # 3. Persist AI Message (After stream completes and the user turn is stored)
+        try:
+            await user_message_task
+            # Convert citations and cards to JSON strings if they exist
+            sources_json = json.dumps([c.model_dump() for c in citations_data]) if citations_data else None
+            cards_json = json.dumps([c.model_dump(mode="json") for c in cards_data]) if cards_data else None
+
+            # Cards belong to the answer that produced them: one message, reloaded as one bubble
+            batch = history_service.batch(session_id).add_message(
+                role="assistant",
+                content=full_response_text,
+                sources=sources_json,
+                usage=usage,
+                cards=cards_json
+            )
+            # --- The answer was paid for and shown: save it even if the budget just ran out ---
+            with no_deadline():
+                await batch.flush()
+        except Exception as e:
+            app_logger.error(f"History Error: {str(e)}")
+            yield ChatStreamResponse(type="error", content="Error saving chat history.")
+
+    finally:
+        # --- Client went away or we bailed out: stop the upstream call ---
+        upstream_task.cancel()
+        for task in (session_task, user_message_task):
+            if not task.done():
+                task.cancel()
 
-@router.post("/message")
+@router.post("/message", dependencies=[Depends(RequestDeadline(settings.REQUEST_DEADLINE_CHAT_S))])
 async def chat_message(
     request: ChatMessageRequest,
     service: GeminiService = Depends(get_gemini_service),
-    history_service: HistoryService = Depends(get_history_service)
+    history_service: HistoryService = Depends(get_history_service),
+    admission: AdmissionController = Depends(get_chat_admission),
+    agent_service: AgentService = Depends(get_agent_service)
 ):
+    # --- Admit before the response starts so overload surfaces as a 429 ---
+    permit = await admission.acquire()
     return StreamingResponse(
-        event_generator(service, history_service, request),
-        media_type="text/event-stream"
+        release_after(sse_stream(chat_events(service, history_service, request, agent_service)), permit),
+        media_type="text/event-stream",
+        background=BackgroundTask(permit.release)
     )
\ No newline at end of file
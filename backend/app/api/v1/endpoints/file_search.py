@@ -1,136 +1,475 @@
 import json
-import tempfile
 import os
 from pathlib import Path
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, Path as PathParam, Query, UploadFile, HTTPException
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-from app.api.deps import get_file_search_service, get_history_service
+from app.api.deps import (
+    get_citation_previews,
+    get_file_search_admission,
+    get_file_search_service,
+    get_history_service,
+    get_indexing_jobs,
+    get_store_registry,
+)
+from app.api.sse import sse_stream
+from app.core.admission import AdmissionController, release_after
+from app.core.config import get_settings
+from app.core.deadline import RequestDeadline, no_deadline
+from app.core.uploads import spool_upload
+from app.services.citation_preview import CitationPreviewIndex
 from app.services.file_search_service import FileSearchService
+from app.db.models import Session, SessionFile
 from app.services.history_service import HistoryService
-from app.schemas.file_search import FileUploadResponse, FileSearchChatRequest, FileSearchCitation
-from app.schemas.common import ChatMode
+from app.services.indexing_jobs import IndexedFile, IndexingJobManager
+from app.services.store_registry import StoreRegistry
+from app.schemas.file_search import (
+    BatchUploadResponse,
+    CitationPreview,
+    FileSearchChatRequest,
+    FileUploadResponse,
+    IndexingFileStatus,
+    IndexingJobStatus,
+    SessionFileResponse,
+)
+from app.schemas.common import ChatMode, IndexingState
 from app.schemas.chat import ChatStreamResponse
 from app.core.logging import app_logger
 
 router = APIRouter(prefix="/file-search", tags=["file_search"])
+settings = get_settings()
 
-@router.post("/upload", response_model=FileUploadResponse)
+async def _spool_files(files: List[UploadFile]) -> List[IndexedFile]:
+    """
+        Streams each upload to disk (size-capped, hashed). Repeats of the same
+        content within one request are dropped; on error nothing is left behind.
+    """
+    spooled: List[IndexedFile] = []
+    seen = set()
+    try:
+        for file in files:
+            if not file.filename:
+                raise HTTPException(status_code=400, detail="No file provided")
+            upload = await spool_upload(
+                file,
+                max_bytes=settings.FILE_UPLOAD_MAX_BYTES,
+                chunk_size=settings.FILE_UPLOAD_CHUNK_BYTES,
+                suffix=Path(file.filename).suffix
+            )
+            if upload.sha256 in seen:
+                os.unlink(upload.path)
+                continue
+            seen.add(upload.sha256)
+            spooled.append(IndexedFile(
+                file_name=file.filename,
+                file_path=upload.path,
+                content_hash=upload.sha256,
+                size_bytes=upload.size
+            ))
+            app_logger.info(f"File spooled: {file.filename} | {upload.size} bytes | sha256 {upload.sha256[:12]}")
+    except Exception as e:
+        _discard(spooled)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+    return spooled
+
+
+def _discard(files: List[IndexedFile]) -> None:
+    for file in files:
+        if os.path.exists(file.file_path):
+            os.unlink(file.file_path)
+
+
+def _check_batch_size(files: List[UploadFile]) -> None:
+    if not files:
+        raise HTTPException(status_code=400, detail="No file provided")
+    if len(files) > settings.FILE_UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.FILE_UPLOAD_MAX_FILES} files per request"
+        )
+
+
+def _session_file(file: IndexedFile) -> SessionFile:
+    """
+        Unsaved SessionFile row for a spooled upload (session set on insert).
+    """
+    return SessionFile(
+        file_name=file.file_name,
+        content_hash=file.content_hash,
+        size_bytes=file.size_bytes,
+        status=IndexingState.QUEUED.value
+    )
+
+
+async def _record_files(history_service: HistoryService, session_id: int, files: List[IndexedFile]) -> None:
+    records = await history_service.add_session_files(session_id, [_session_file(f) for f in files])
+    for file, record in zip(files, records):
+        file.record_id = record.id
+
+
+async def _start_session(
+    history_service: HistoryService,
+    files: List[IndexedFile],
+    title: str,
+    file_name: str
+) -> Session:
+    """
+        Creates the FILE_SEARCH session (marked queued) and its SessionFile rows
+        in one transaction.
+    """
+    try:
+        batch = await (
+            history_service.batch()
+            .create_session(
+                title=title,
+                mode=ChatMode.FILE_SEARCH,
+                file_name=file_name,
+                file_search_status=IndexingState.QUEUED.value
+            )
+            .add_files([_session_file(f) for f in files])
+            .flush()
+        )
+        for file, record in zip(files, batch.files):
+            file.record_id = record.id
+        return batch.session
+    except Exception as e:
+        _discard(files)
+        app_logger.error(f"File upload error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to create session: {str(e)}")
+
+
+def _title(name: str, prefix: str = "File") -> str:
+    return f"{prefix}: {name[:30]}" if len(name) > 30 else f"{prefix}: {name}"
+
+
+@router.post(
+    "/upload",
+    response_model=FileUploadResponse,
+    status_code=202,
+    dependencies=[Depends(RequestDeadline(settings.REQUEST_DEADLINE_FILE_UPLOAD_S))]
+)
 async def upload_file(
     file: UploadFile = File(...),
-    service: FileSearchService = Depends(get_file_search_service),
     history_service: HistoryService = Depends(get_history_service),
+    jobs: IndexingJobManager = Depends(get_indexing_jobs),
 ):
     """
-        Upload a file and create a File Search Store for RAG.
+        Upload a file and start indexing it into a File Search Store for RAG.
+        Returns 202 at once; follow progress via /jobs/{job_id} or /jobs/{job_id}/events.
     """
     app_logger.info(f"File upload request: {file.filename}")
     
-    # --- Step 1: Validate file ---
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No file provided")
+    # --- Step 1: Stream file to disk in chunks (size-capped, hashed) ---
+    spooled = await _spool_files([file])
+    
+    # --- Step 2: Create session with mode=FILE_SEARCH, marked as indexing ---
+    session = await _start_session(history_service, spooled, _title(file.filename), file.filename)
+
+    # --- Step 3: Hand the spooled file to a background indexing job ---
+    job = jobs.submit(session_id=session.id, files=spooled)
     
-    # --- Step 2: Save file temporarily ---
+    return FileUploadResponse(
+        session_id=session.id,
+        file_name=file.filename,
+        status=job.state.value,
+        job_id=job.id
+    )
+
+
+@router.post(
+    "/upload-batch",
+    response_model=BatchUploadResponse,
+    status_code=202,
+    dependencies=[Depends(RequestDeadline(settings.REQUEST_DEADLINE_FILE_UPLOAD_S))]
+)
+async def upload_files(
+    files: List[UploadFile] = File(...),
+    history_service: HistoryService = Depends(get_history_service),
+    jobs: IndexingJobManager = Depends(get_indexing_jobs),
+):
+    """
+        Upload many files into one new session's store. Files are indexed
+        concurrently (bounded) and tracked individually.
+    """
+    _check_batch_size(files)
+    app_logger.info(f"Batch upload request: {len(files)} files")
+
+    spooled = await _spool_files(files)
+    first = spooled[0].file_name
+    name = first if len(spooled) == 1 else f"{first} (+{len(spooled) - 1} more)"
+    session = await _start_session(history_service, spooled, _title(name, "Files"), name)
+
+    job = jobs.submit(session_id=session.id, files=spooled)
+
+    return BatchUploadResponse(
+        session_id=session.id,
+        job_id=job.id,
+        status=job.state.value,
+        files=[f.status() for f in spooled]
+    )
+
+
+@router.post(
+    "/sessions/{session_id}/files",
+    response_model=BatchUploadResponse,
+    status_code=202,
+    dependencies=[Depends(RequestDeadline(settings.REQUEST_DEADLINE_FILE_UPLOAD_S))]
+)
+async def add_files(
+    session_id: int,
+    files: List[UploadFile] = File(...),
+    history_service: HistoryService = Depends(get_history_service),
+    registry: StoreRegistry = Depends(get_store_registry),
+    jobs: IndexingJobManager = Depends(get_indexing_jobs),
+):
+    """
+        Add files to an existing session's store. Files whose content is
+        already in the store are skipped rather than re-indexed.
+    """
+    _check_batch_size(files)
+
+    session = await history_service.get_session(session_id, include_messages=False)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session.mode != ChatMode.FILE_SEARCH:
+        raise HTTPException(status_code=400, detail="Not a file search session")
+    conflict = indexing_conflict(session)
+    if conflict is not None and conflict["code"] == "STILL_INDEXING":
+        raise HTTPException(status_code=409, detail=conflict)
+
+    # --- A deduplicated store shared with other sessions must not change under them ---
+    store_name = session.file_search_store_name
+    if store_name and not await registry.detach(store_name):
+        raise HTTPException(status_code=409, detail={
+            "code": "STORE_SHARED",
+            "message": "This document set is shared with other sessions; upload the files to a new session instead.",
+        })
+
+    spooled = await _spool_files(files)
+    existing = {f.content_hash: f for f in await history_service.get_session_files(session_id)}
+
+    skipped: List[IndexingFileStatus] = []
+    retried: List[IndexedFile] = []
+    new: List[IndexedFile] = []
+    for file in spooled:
+        record = existing.get(file.content_hash)
+        if record is None:
+            new.append(file)
+        elif record.status == IndexingState.FAILED.value or store_name is None:
+            # --- Without a store (expired or failed) nothing is indexed: upload it again ---
+            file.record_id = record.id
+            retried.append(file)
+        else:
+            skipped.append(IndexingFileStatus(file_name=record.file_name, state=IndexingState(record.status)))
+            _discard([file])
+
+    to_index = retried + new
+    if not to_index:
+        return BatchUploadResponse(session_id=session_id, status=IndexingState.READY.value, files=skipped)
+
     try:
-        suffix = Path(file.filename).suffix
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            content = await file.read()
-            tmp.write(content)
-            temp_file_path = tmp.name
+        await _record_files(history_service, session_id, new)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+        _discard(to_index)
+        raise HTTPException(status_code=500, detail=f"Failed to record files: {str(e)}")
+
+    job = jobs.submit(session_id=session_id, files=to_index, store_name=store_name)
+    return BatchUploadResponse(
+        session_id=session_id,
+        job_id=job.id,
+        status=job.state.value,
+        files=[f.status() for f in to_index] + skipped
+    )
+
+
+@router.get("/sessions/{session_id}/files", response_model=List[SessionFileResponse])
+async def list_session_files(
+    session_id: int,
+    history_service: HistoryService = Depends(get_history_service),
+):
+    """
+        Documents in a session's store with their indexing status.
+    """
+    return await history_service.get_session_files(session_id)
+
+
+@router.get("/sessions/{session_id}/citations/{chunk_id}/preview", response_model=CitationPreview)
+async def citation_preview(
+    session_id: int,
+    chunk_id: str = PathParam(pattern=r"^[0-9a-f]{16}$"),
+    window_chars: int = Query(default=600, ge=50, le=5000),
+    history_service: HistoryService = Depends(get_history_service),
+    previews: Optional[CitationPreviewIndex] = Depends(get_citation_previews),
+):
+    """
+        Passage around a cited chunk, read from the local preview index
+        (no model call).
+    """
+    if previews is None:
+        raise HTTPException(status_code=404, detail="Citation previews are disabled")
+    for file in await history_service.get_session_files(session_id):
+        context = previews.lookup(file.content_hash, chunk_id, window_chars)
+        if context is not None:
+            return CitationPreview(chunk_id=chunk_id, **vars(context))
+    raise HTTPException(status_code=404, detail="Citation not found in this session's documents")
+
+
+@router.get("/jobs/{job_id}", response_model=IndexingJobStatus)
+async def get_indexing_job(
+    job_id: str,
+    jobs: IndexingJobManager = Depends(get_indexing_jobs),
+):
+    """
+        Current state of an indexing job.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.status()
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_indexing_job(
+    job_id: str,
+    jobs: IndexingJobManager = Depends(get_indexing_jobs),
+):
+    """
+        SSE stream of job_status events until the job is ready or failed.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(sse_stream(jobs.watch(job)), media_type="text/event-stream")
+
+
+def indexing_conflict(session: Session) -> Optional[dict]:
+    """
+        409 detail when a session's file is not ready to be searched yet.
+    """
+    status = session.file_search_status
+    if status is None or status == IndexingState.READY.value:
+        return None
+    if status == IndexingState.FAILED.value:
+        return {"code": "INDEXING_FAILED", "message": "Indexing this file failed. Please upload it again."}
+    if status == IndexingState.EXPIRED.value:
+        return {"code": "STORE_EXPIRED", "message": "This file was removed after a period of inactivity. Please upload it again."}
+    return {"code": "STILL_INDEXING", "status": status, "message": "The file is still being indexed."}
+
+
+async def file_search_events(
+    service: FileSearchService,
+    history_service: HistoryService,
+    session_id: int,
+    store_name: str,
+    message: str,
+    model: str,
+    previews: Optional[CitationPreviewIndex] = None
+) -> AsyncIterator[ChatStreamResponse]:
+    """
+        Transport-agnostic file search pipeline (used by SSE and WebSocket).
+        With `previews`, citations of unsharded documents get their page
+        from the document's page map.
+    """
+    # --- Save user message ---
+    await history_service.add_message(
+        session_id=session_id,
+        role="user",
+        content=message
+    )
     
-    try:
-        # --- Step 3: Create store and upload via service ---
-        store_name, file_name = await service.create_store_and_upload(
-            file_path=temp_file_path,
-            display_name=file.filename
-        )
-        
-        # --- Step 4: Create session with mode=FILE_SEARCH ---
-        title = f"File: {file.filename[:30]}" if len(file.filename) > 30 else f"File: {file.filename}"
-        session = await history_service.create_session(
-            title=title,
-            mode=ChatMode.FILE_SEARCH
-        )
+    full_response = ""
+    citations_data = []
+    usage = None
+    files: Optional[List[SessionFile]] = None
 
-        # --- Step 5: Store File Search metadata on session ---
-        await history_service.update_session_file_search(
-            session_id=session.id,
-            store_name=store_name,
-            file_name=file_name,
-        )
-        
-        return FileUploadResponse(
-            session_id=session.id,
-            store_name=store_name,
-            file_name=file_name,
-            status="indexed"
-        )
+    async def add_page_ranges(cited: List[dict]) -> None:
+        # --- Shards carry their pages in the title; whole documents resolve the chunk's page ---
+        nonlocal files
+        for citation in cited:
+            if previews is None or citation.get("page_range") or not citation.get("chunk_id"):
+                continue
+            if files is None:
+                files = await history_service.get_session_files(session_id)
+            for file in files:
+                page = previews.page(file.content_hash, citation["chunk_id"]) if file.file_name == citation["source_title"] else None
+                if page is not None:
+                    citation["page_range"] = f"p. {page}"
+                    break
+    
+    async for chunk in service.chat_with_file(
+        store_name=store_name,
+        query=message,
+        model=model
+    ):
+        if chunk.type == "file_citation" and chunk.content:
+            cited = json.loads(chunk.content)
+            await add_page_ranges(cited)
+            citations_data.extend(cited)
+            chunk = chunk.model_copy(update={"content": json.dumps(cited)})
+
+        yield chunk
         
-    except Exception as e:
-        app_logger.error(f"File upload error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to index file: {str(e)}")
+        if chunk.type == "token" and chunk.content:
+            full_response += chunk.content
+        elif chunk.type == "done":
+            usage = chunk.usage
     
-    finally:
-        # --- Cleanup temp file ---
-        if os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
+    # --- Save assistant response (already shown, so not subject to the deadline) ---
+    with no_deadline():
+        await history_service.add_message(
+            session_id=session_id,
+            role="assistant",
+            content=full_response,
+            sources=json.dumps(citations_data) if citations_data else None,
+            usage=usage
+        )
 
 
-@router.post("/chat")
+@router.post("/chat", dependencies=[Depends(RequestDeadline(settings.REQUEST_DEADLINE_FILE_SEARCH_CHAT_S))])
 async def file_search_chat(
     request: FileSearchChatRequest,
     service: FileSearchService = Depends(get_file_search_service),
     history_service: HistoryService = Depends(get_history_service),
+    admission: AdmissionController = Depends(get_file_search_admission),
+    previews: Optional[CitationPreviewIndex] = Depends(get_citation_previews),
 ):
     """
         Stream RAG response for a file search session.
     """
     
     # ---  Get session to retrieve store_name ---
-    session = await history_service.get_session(request.session_id)
+    session = await history_service.get_session(request.session_id, include_messages=False)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+
+    conflict = indexing_conflict(session)
+    if conflict is not None:
+        raise HTTPException(status_code=409, detail=conflict)
     
     if not session.file_search_store_name:
         raise HTTPException(status_code=400, detail="No file uploaded for this session")
     
-    async def event_generator():
-        # --- Save user message ---
-        await history_service.add_message(
-            session_id=request.session_id,
-            role="user",
-            content=request.message
-        )
-        
-        full_response = ""
-        citations_data = []
-        
-        async for chunk in service.chat_with_file(
-            store_name=session.file_search_store_name,
-            query=request.message,
-            model=request.model
-        ):
-            yield f"data: {chunk.model_dump_json()}\n\n"
-            
-            if chunk.type == "token" and chunk.content:
-                full_response += chunk.content
-            elif chunk.type == "file_citation":
-                citations_data = chunk.content
-        
-        # --- Save assistant response ---
-        await history_service.add_message(
-            session_id=request.session_id,
-            role="assistant",
-            content=full_response,
-            sources=citations_data if citations_data else None
-        )
-    
+    permit = await admission.acquire()
     return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream"
+        release_after(
+            sse_stream(file_search_events(
+                service,
+                history_service,
+                session_id=request.session_id,
+                store_name=session.file_search_store_name,
+                message=request.message,
+                model=request.model,
+                previews=previews
+            )),
+            permit
+        ),
+        media_type="text/event-stream",
+        background=BackgroundTask(permit.release)
     )
 
 
@@ -139,17 +478,18 @@ async def delete_file_search_session(
     session_id: int,
     service: FileSearchService = Depends(get_file_search_service),
     history_service: HistoryService = Depends(get_history_service),
+    registry: StoreRegistry = Depends(get_store_registry),
 ):
     """
-        Delete a file search session and cleanup the store.
+        Delete a file search session and release its (possibly shared) store.
     """
-    session = await history_service.get_session(session_id)
+    session = await history_service.get_session(session_id, include_messages=False)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    # --- Cleanup store if it exists ---
+    # --- Release store; deleted upstream only when no other session uses it ---
     if session.file_search_store_name:
-        await service.delete_store(session.file_search_store_name)
+        await service.release_store(registry, session.file_search_store_name)
     
     # --- Delete session ---
     await history_service.delete_session(session_id)
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List
+from typing import List, Optional
 from app.api.deps import get_history_service
-from app.services.history_service import HistoryService
-from app.schemas.history import SessionSummary, SessionDetail, SessionUpdate
+from app.services.history_service import HistoryService, decode_cursor, encode_cursor
+from app.schemas.history import MessagePage, SessionSummary, SessionDetail, SessionUpdate
 
 router = APIRouter()
 
@@ -20,16 +20,52 @@ async def list_sessions(
 @router.get("/sessions/{session_id}", response_model=SessionDetail)
 async def get_session_history(
     session_id: int,
+    include_messages: bool = True,
     service: HistoryService = Depends(get_history_service)
 ):
     """
-        Load a specific conversation
+        Load a specific conversation. With include_messages=false only the
+        session is returned; page its messages via /sessions/{id}/messages.
     """
-    session = await service.get_session(session_id)
+    session = await service.get_session(session_id, include_messages=include_messages)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    if not include_messages:
+        return SessionDetail(**session.model_dump())
     return session
 
+@router.get("/sessions/{session_id}/messages", response_model=MessagePage)
+async def list_session_messages(
+    session_id: int,
+    limit: int = Query(default=50, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    service: HistoryService = Depends(get_history_service)
+):
+    """
+        Page through a conversation, latest messages first: no cursor returns
+        the newest `limit` messages; `before`/`after` continue from a page edge.
+    """
+    if before is not None and after is not None:
+        raise HTTPException(status_code=400, detail="Pass either before or after, not both")
+    try:
+        before_key = decode_cursor(before) if before is not None else None
+        after_key = decode_cursor(after) if after is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if await service.get_session(session_id, include_messages=False) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    window = await service.get_messages(session_id, limit=limit, before=before_key, after=after_key)
+    messages = window.messages
+    return MessagePage(
+        messages=[m.model_dump() for m in messages],
+        before=encode_cursor(messages[0]) if messages else before,
+        after=encode_cursor(messages[-1]) if messages else after,
+        has_more_before=window.has_more_before,
+        has_more_after=window.has_more_after
+    )
+
 @router.patch("/sessions/{session_id}", response_model=SessionSummary)
 async def rename_session(
     session_id: int,
@@ -0,0 +1,45 @@
+from typing import Dict
+from fastapi import APIRouter, Depends, Query
+from app.api.deps import get_admission_controllers, get_store_reaper, get_usage_service
+from app.core.admission import AdmissionController
+from app.schemas.metrics import AdmissionMetrics, AdmissionMetricsResponse, StoreLifecycleMetrics, UsageAggregate, UsageReport
+from app.services.store_reaper import StoreReaper
+from app.services.usage_service import UsageService, window_start
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/admission", response_model=AdmissionMetricsResponse)
+async def admission_metrics(
+    controllers: Dict[str, AdmissionController] = Depends(get_admission_controllers)
+):
+    """
+        Queue depth, in-flight count and wait-time percentiles per upstream.
+    """
+    return AdmissionMetricsResponse(
+        upstreams=[AdmissionMetrics(**c.snapshot()) for c in controllers.values()]
+    )
+
+@router.get("/usage", response_model=UsageReport)
+async def usage_report(
+    window_hours: int = Query(default=24, ge=1, le=24 * 90),
+    service: UsageService = Depends(get_usage_service)
+):
+    """
+        Token totals, estimated cost and latency percentiles per mode and model.
+    """
+    since = window_start(window_hours)
+    groups = await service.get_usage_summary(since)
+    return UsageReport(
+        window_hours=window_hours,
+        since=since,
+        groups=[UsageAggregate(**g) for g in groups]
+    )
+
+@router.get("/stores", response_model=StoreLifecycleMetrics)
+async def store_lifecycle_metrics(
+    reaper: StoreReaper = Depends(get_store_reaper)
+):
+    """
+        File Search stores reclaimed by the idle reaper and orphan sweep.
+    """
+    return StoreLifecycleMetrics(**reaper.snapshot())
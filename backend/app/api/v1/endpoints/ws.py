@@ -0,0 +1,216 @@
+import asyncio
+from typing import AsyncContextManager, AsyncIterator, Callable, Dict, Optional
+
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from pydantic import TypeAdapter, ValidationError
+
+from app.api.deps import (
+    get_admission_controllers,
+    get_agent_service,
+    get_citation_previews,
+    get_file_search_service,
+    get_gemini_service,
+    get_history_scope_factory,
+)
+from app.api.v1.endpoints.chat import chat_events
+from app.api.v1.endpoints.file_search import file_search_events, indexing_conflict
+from app.core.admission import (
+    UPSTREAM_GEMINI_CHAT,
+    UPSTREAM_GEMINI_FILE_SEARCH,
+    AdmissionController,
+    AdmissionRejected,
+)
+from app.core.config import get_settings
+from app.core.deadline import Deadline, set_current_deadline
+from app.core.logging import app_logger
+from app.schemas.chat import ChatStreamResponse
+from app.schemas.ws import WSCancel, WSChatOpen, WSClientMessage, WSFileSearchOpen
+from app.services.agent_service import AgentService
+from app.services.citation_preview import CitationPreviewIndex
+from app.services.file_search_service import FileSearchService
+from app.services.history_service import HistoryService
+from app.services.llm_service import GeminiService
+
+router = APIRouter(tags=["ws"])
+settings = get_settings()
+
+_client_message = TypeAdapter(WSClientMessage)
+
+
+class StreamMultiplexer:
+    """
+    Runs many ChatStreamResponse pipelines over one WebSocket.
+
+    - Every outgoing frame is tagged with its `stream_id`.
+    - A single writer task owns the socket.
+    - Backpressure: each stream may have at most `window` frames queued but
+      not yet written; a slow client therefore pauses the producing
+      pipeline (and its upstream read) instead of growing memory.
+    - Streams finish with an `end` frame, or `cancelled` when cancelled.
+    """
+
+    def __init__(self, websocket: WebSocket, max_streams: int, window: int):
+        self.websocket = websocket
+        self.max_streams = max_streams
+        self.window = window
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._streams: Dict[str, asyncio.Task] = {}
+        self._windows: Dict[str, asyncio.Semaphore] = {}
+
+    # --- Output ---
+    def _control(self, stream_id: str | None, event: ChatStreamResponse) -> None:
+        """
+            Queues a frame outside the per-stream window (errors, end markers).
+        """
+        event.stream_id = stream_id
+        self._outbox.put_nowait((None, event))
+
+    async def _send(self, stream_id: str, event: ChatStreamResponse) -> None:
+        window = self._windows[stream_id]
+        await window.acquire()
+        event.stream_id = stream_id
+        await self._outbox.put((window, event))
+
+    async def writer(self) -> None:
+        while True:
+            window, event = await self._outbox.get()
+            try:
+                await self.websocket.send_text(event.model_dump_json(exclude_none=True))
+            finally:
+                if window is not None:
+                    window.release()
+
+    # --- Streams ---
+    def open(self, stream_id: str, events: Callable[[], AsyncIterator[ChatStreamResponse]]) -> None:
+        if stream_id in self._streams:
+            self._control(stream_id, ChatStreamResponse(type="error", content="Stream id already in use."))
+            return
+        if len(self._streams) >= self.max_streams:
+            self._control(stream_id, ChatStreamResponse(type="error", content="Too many concurrent streams."))
+            return
+        self._windows[stream_id] = asyncio.Semaphore(self.window)
+        self._streams[stream_id] = asyncio.create_task(self._run(stream_id, events))
+
+    async def _run(self, stream_id: str, events: Callable[[], AsyncIterator[ChatStreamResponse]]) -> None:
+        try:
+            async for event in events():
+                await self._send(stream_id, event)
+            self._control(stream_id, ChatStreamResponse(type="end"))
+        except asyncio.CancelledError:
+            self._control(stream_id, ChatStreamResponse(type="cancelled"))
+            raise
+        except AdmissionRejected as e:
+            self._control(stream_id, ChatStreamResponse(
+                type="error",
+                content=f"Service is busy, please retry in {int(e.retry_after)}s."
+            ))
+        except Exception as e:
+            app_logger.error(f"WebSocket stream {stream_id} failed: {str(e)}")
+            self._control(stream_id, ChatStreamResponse(type="error", content="Stream failed."))
+        finally:
+            self._streams.pop(stream_id, None)
+            self._windows.pop(stream_id, None)
+
+    def cancel(self, stream_id: str) -> None:
+        task = self._streams.get(stream_id)
+        if task is not None:
+            task.cancel()
+
+    async def close(self) -> None:
+        tasks = list(self._streams.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _admitted(
+    controller: AdmissionController,
+    deadline_s: float,
+    events: Callable[[], AsyncIterator[ChatStreamResponse]]
+) -> AsyncIterator[ChatStreamResponse]:
+    """
+        Applies the same admission and deadline rules as the HTTP endpoints.
+    """
+    set_current_deadline(Deadline(deadline_s))
+    async with controller.admit():
+        async for event in events():
+            yield event
+
+
+@router.websocket("/ws")
+async def multiplexed_streams(
+    websocket: WebSocket,
+    gemini: GeminiService = Depends(get_gemini_service),
+    file_search: FileSearchService = Depends(get_file_search_service),
+    agent_service: AgentService = Depends(get_agent_service),
+    history_scope: Callable[[], AsyncContextManager[HistoryService]] = Depends(get_history_scope_factory),
+    controllers: Dict[str, AdmissionController] = Depends(get_admission_controllers),
+    previews: Optional[CitationPreviewIndex] = Depends(get_citation_previews),
+):
+    """
+        Multiplexes chat and file search streams over one connection.
+
+        Client frames: {"op": "chat" | "file_search", "stream_id": ..., ...request}
+        and {"op": "cancel", "stream_id": ...}. Server frames are
+        ChatStreamResponse events tagged with `stream_id`.
+    """
+    await websocket.accept()
+    mux = StreamMultiplexer(
+        websocket,
+        max_streams=settings.WS_MAX_STREAMS_PER_CONNECTION,
+        window=settings.WS_STREAM_WINDOW,
+    )
+    writer = asyncio.create_task(mux.writer())
+
+    def chat_stream(op: WSChatOpen):
+        async def events():
+            async with history_scope() as history:
+                async for event in chat_events(gemini, history, op, agent_service):
+                    yield event
+        return lambda: _admitted(controllers[UPSTREAM_GEMINI_CHAT], settings.REQUEST_DEADLINE_CHAT_S, events)
+
+    def file_search_stream(op: WSFileSearchOpen):
+        async def events():
+            async with history_scope() as history:
+                session = await history.get_session(op.session_id, include_messages=False)
+                conflict = indexing_conflict(session) if session else None
+                if conflict is not None:
+                    yield ChatStreamResponse(type="error", content=conflict["message"])
+                    return
+                if not session or not session.file_search_store_name:
+                    yield ChatStreamResponse(type="error", content="No file uploaded for this session.")
+                    return
+                async for event in file_search_events(
+                    file_search,
+                    history,
+                    session_id=op.session_id,
+                    store_name=session.file_search_store_name,
+                    message=op.message,
+                    model=op.model,
+                    previews=previews
+                ):
+                    yield event
+        return lambda: _admitted(
+            controllers[UPSTREAM_GEMINI_FILE_SEARCH], settings.REQUEST_DEADLINE_FILE_SEARCH_CHAT_S, events
+        )
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                op = _client_message.validate_json(raw)
+            except ValidationError:
+                mux._control(None, ChatStreamResponse(type="error", content="Invalid message."))
+                continue
+
+            if isinstance(op, WSCancel):
+                mux.cancel(op.stream_id)
+            elif isinstance(op, WSChatOpen):
+                mux.open(op.stream_id, chat_stream(op))
+            elif isinstance(op, WSFileSearchOpen):
+                mux.open(op.stream_id, file_search_stream(op))
+    except WebSocketDisconnect:
+        app_logger.info("WebSocket client disconnected")
+    finally:
+        await mux.close()
+        writer.cancel()
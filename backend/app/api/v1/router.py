@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import chat, search, history, file_search
+from app.api.v1.endpoints import chat, search, history, file_search, metrics, ws
 
 router = APIRouter(prefix="/api/v1")
 
@@ -7,4 +7,6 @@ router = APIRouter(prefix="/api/v1")
 router.include_router(chat.router)
 router.include_router(search.router)
 router.include_router(history.router)
-router.include_router(file_search.router)
\ No newline at end of file
+router.include_router(file_search.router)
+router.include_router(metrics.router)
+router.include_router(ws.router)
\ No newline at end of file
@@ -0,0 +1,204 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, TypeVar
+
+from app.core.config import Settings
+from app.core.deadline import current_deadline
+from app.core.logging import app_logger
+from app.core.metrics import LatencyTracker
+
+# --- Upstream names (one controller each) ---
+UPSTREAM_GEMINI_CHAT = "gemini_chat"
+UPSTREAM_GEMINI_FILE_SEARCH = "gemini_file_search"
+UPSTREAM_EXA = "exa"
+
+T = TypeVar("T")
+
+
+class AdmissionRejected(Exception):
+    """
+        Raised when an upstream is saturated and the request should be retried later.
+    """
+
+    def __init__(self, upstream: str, retry_after: float, reason: str):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(f"{upstream} admission rejected: {reason}")
+
+
+class AdmissionPermit:
+    """
+        A held concurrency slot. `release()` is idempotent.
+    """
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(time.monotonic() - self._acquired_at)
+
+
+class AdmissionController:
+    """
+    Concurrency limiter for a single upstream with a bounded FIFO wait queue.
+
+    - Up to `max_concurrency` requests run at once.
+    - Up to `max_queue` requests wait, each for at most `max_wait` seconds.
+    - Requests are rejected immediately when the queue is full, or when the
+      expected wait (queue position x average hold time / concurrency)
+      already exceeds `max_wait`.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_hold: Optional[float] = None
+        self._wait_times = LatencyTracker(window_size=1000)
+        self.admitted_total = 0
+        self.rejected_total = 0
+
+    # --- Helpers ---
+    def _expected_wait(self, position: int) -> float:
+        if self._avg_hold is None:
+            return 0.0
+        return position * self._avg_hold / self.max_concurrency
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejected:
+        self.rejected_total += 1
+        app_logger.warning(f"Admission rejected | Upstream: {self.name} | Reason: {reason}")
+        return AdmissionRejected(self.name, max(1, math.ceil(retry_after)), reason)
+
+    def _admit(self, waited: float) -> AdmissionPermit:
+        self.admitted_total += 1
+        self._wait_times.record(self.name, waited)
+        return AdmissionPermit(self)
+
+    def _release(self, held: Optional[float]) -> None:
+        # --- Exponentially weighted hold time feeds the early-reject estimate ---
+        if held is not None:
+            self._avg_hold = held if self._avg_hold is None else 0.8 * self._avg_hold + 0.2 * held
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # --- Hand the slot straight to the next waiter ---
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    # --- Public API ---
+    async def acquire(self) -> AdmissionPermit:
+        """
+            Waits for a slot or raises AdmissionRejected.
+        """
+        if self._in_flight < self.max_concurrency and not self._waiters:
+            self._in_flight += 1
+            return self._admit(0.0)
+
+        position = len(self._waiters) + 1
+        if position > self.max_queue:
+            raise self._reject("queue full", self._expected_wait(position) or self.max_wait)
+        expected = self._expected_wait(position)
+        if expected > self.max_wait:
+            raise self._reject("expected wait exceeds deadline", expected)
+
+        # --- Never queue longer than the request has left ---
+        deadline = current_deadline()
+        max_wait = deadline.timeout(self.max_wait) if deadline is not None else self.max_wait
+        if max_wait <= 0:
+            raise self._reject("request deadline exhausted", self.max_wait)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max_wait)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # --- Slot was handed over right at the deadline; keep it ---
+                return self._admit(time.monotonic() - started)
+            waiter.cancel()
+            raise self._reject("queue wait timeout", self._expected_wait(len(self._waiters)) or self.max_wait)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(None)
+            else:
+                waiter.cancel()
+            raise
+        return self._admit(time.monotonic() - started)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[AdmissionPermit]:
+        permit = await self.acquire()
+        try:
+            yield permit
+        finally:
+            permit.release()
+
+    def snapshot(self) -> Dict[str, object]:
+        queue_depth = sum(1 for w in self._waiters if not w.done())
+        return {
+            "upstream": self.name,
+            "in_flight": self._in_flight,
+            "queue_depth": queue_depth,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total,
+            "wait_p50_ms": _to_ms(self._wait_times.percentile(self.name, 50)),
+            "wait_p95_ms": _to_ms(self._wait_times.percentile(self.name, 95)),
+            "wait_p99_ms": _to_ms(self._wait_times.percentile(self.name, 99)),
+        }
+
+
+async def release_after(stream: AsyncIterator[T], permit: AdmissionPermit) -> AsyncIterator[T]:
+    """
+        Holds `permit` for the lifetime of a streaming response body.
+    """
+    try:
+        async for item in stream:
+            yield item
+    finally:
+        permit.release()
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def build_admission_controllers(settings: Settings) -> Dict[str, AdmissionController]:
+    """
+        Creates one controller per upstream from settings.
+    """
+    return {
+        UPSTREAM_GEMINI_CHAT: AdmissionController(
+            UPSTREAM_GEMINI_CHAT,
+            max_concurrency=settings.GEMINI_CHAT_MAX_CONCURRENCY,
+            max_queue=settings.GEMINI_CHAT_MAX_QUEUE,
+            max_wait=settings.GEMINI_CHAT_MAX_QUEUE_WAIT_MS / 1000,
+        ),
+        UPSTREAM_GEMINI_FILE_SEARCH: AdmissionController(
+            UPSTREAM_GEMINI_FILE_SEARCH,
+            max_concurrency=settings.FILE_SEARCH_MAX_CONCURRENCY,
+            max_queue=settings.FILE_SEARCH_MAX_QUEUE,
+            max_wait=settings.FILE_SEARCH_MAX_QUEUE_WAIT_MS / 1000,
+        ),
+        UPSTREAM_EXA: AdmissionController(
+            UPSTREAM_EXA,
+            max_concurrency=settings.EXA_MAX_CONCURRENCY,
+            max_queue=settings.EXA_MAX_QUEUE,
+            max_wait=settings.EXA_MAX_QUEUE_WAIT_MS / 1000,
+        ),
+    }
@@ -21,6 +21,102 @@ class Settings(BaseSettings):
     # --- Frontend ---
     FRONTEND_URL: str = "http://localhost:3000"
 
+    # --- Gemini Hedging ---
+    GEMINI_HEDGING_ENABLED: bool = False
+    GEMINI_HEDGE_PERCENTILE: float = 95.0
+    GEMINI_HEDGE_MAX_RATIO: float = 0.05
+    GEMINI_HEDGE_MIN_SAMPLES: int = 20
+    GEMINI_HEDGE_MIN_DELAY_MS: int = 250
+    GEMINI_HEDGE_WINDOW: int = 500
+
+    # --- Admission Control (per upstream) ---
+    GEMINI_CHAT_MAX_CONCURRENCY: int = 32
+    GEMINI_CHAT_MAX_QUEUE: int = 64
+    GEMINI_CHAT_MAX_QUEUE_WAIT_MS: int = 2000
+    FILE_SEARCH_MAX_CONCURRENCY: int = 16
+    FILE_SEARCH_MAX_QUEUE: int = 32
+    FILE_SEARCH_MAX_QUEUE_WAIT_MS: int = 2000
+    EXA_MAX_CONCURRENCY: int = 16
+    EXA_MAX_QUEUE: int = 32
+    EXA_MAX_QUEUE_WAIT_MS: int = 3000
+    EXA_TIMEOUT_S: float = 20
+
+    # --- File Search Answer Cache (per store, normalized query, model) ---
+    # In-process and invalidated only by the worker that changed the store:
+    # enable it only when the API runs as a single worker process.
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_TTL_S: int = 3600
+    ANSWER_CACHE_MAX_ENTRIES: int = 1024
+
+    # --- WebSocket Multiplexing ---
+    WS_MAX_STREAMS_PER_CONNECTION: int = 8
+    WS_STREAM_WINDOW: int = 32
+
+    # --- File Uploads ---
+    FILE_UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024
+    FILE_UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    FILE_UPLOAD_MAX_FILES: int = 50
+    FILE_UPLOAD_MAX_BATCH_BYTES: int = 1024 * 1024 * 1024
+    FILE_SEARCH_UPLOAD_CONCURRENCY: int = 4
+    FILE_SEARCH_INDEXING_CONCURRENCY: int = 8  # uploads in flight across all jobs; the rest wait their turn
+
+    # --- File Search Backend ---
+    FILE_SEARCH_BACKEND: str = "gemini"  # "gemini" | "local" (offline BM25 + vector index)
+    LOCAL_RAG_DIR: str = "data/local_rag"
+    LOCAL_RAG_TOP_K: int = 5
+
+    # --- Citation Previews (local extracted-text index per document) ---
+    CITATION_PREVIEW_ENABLED: bool = True
+    CITATION_PREVIEW_DIR: str = "data/citation_previews"
+
+    # --- Chunking Profiles (whitespace tokens per chunk / overlap) ---
+    CHUNKING_PROFILES_ENABLED: bool = True
+    CHUNKING_DEFAULT_TOKENS: int = 300
+    CHUNKING_DEFAULT_OVERLAP: int = 30
+    CHUNKING_PROSE_TOKENS: int = 600
+    CHUNKING_PROSE_OVERLAP: int = 60
+    CHUNKING_PROSE_MIN_BYTES: int = 1024 * 1024
+    CHUNKING_TABULAR_TOKENS: int = 150
+    CHUNKING_TABULAR_OVERLAP: int = 15
+
+    # --- Upload Preprocessing (PDF/DOCX uploaded as cleaned text) ---
+    # Opt-in: File Search then indexes our extraction instead of the original
+    # file (no layout, tables or images), which changes answers for existing users.
+    UPLOAD_PREPROCESSING_ENABLED: bool = False
+    UPLOAD_PREPROCESS_WORKERS: int = 2  # process pool; also builds citation previews
+    UPLOAD_PREPROCESS_MIN_BYTES: int = 256 * 1024
+    UPLOAD_PREPROCESS_MAX_RATIO: float = 0.8
+
+    # --- Large Document Sharding ---
+    FILE_SEARCH_SHARDING_ENABLED: bool = True
+    FILE_SEARCH_SHARD_MIN_PAGES: int = 100
+    FILE_SEARCH_SHARD_PAGES: int = 50
+    FILE_SEARCH_SHARD_TEXT_BYTES: int = 2 * 1024 * 1024
+    FILE_SEARCH_SHARD_CONCURRENCY: int = 8
+
+    # --- Indexing Operation Polling (seconds) ---
+    FILE_SEARCH_POLL_INITIAL_S: float = 1.0
+    FILE_SEARCH_POLL_MAX_S: float = 15.0
+    FILE_SEARCH_POLL_SWEEP_S: float = 0.5
+
+    # --- Store Lifecycle (idle reaper & orphan sweep, seconds) ---
+    STORE_REAPER_ENABLED: bool = True
+    STORE_IDLE_TTL_S: float = 7 * 24 * 3600
+    STORE_REAPER_INTERVAL_S: float = 900
+    STORE_ORPHAN_GRACE_S: float = 3600
+    STORE_REAPER_CONCURRENCY: int = 4
+
+    # --- SSE Delivery ---
+    SSE_BUFFER_SIZE: int = 64
+    SSE_SLOW_CLIENT_POLICY: str = "coalesce"  # "coalesce" | "drop" | "disconnect"
+    SSE_HEARTBEAT_S: float = 15
+
+    # --- Request Deadlines (seconds, per endpoint) ---
+    REQUEST_DEADLINE_CHAT_S: float = 120
+    REQUEST_DEADLINE_SEARCH_S: float = 30
+    REQUEST_DEADLINE_FILE_SEARCH_CHAT_S: float = 120
+    REQUEST_DEADLINE_FILE_UPLOAD_S: float = 600
+
     # --- Config ---
     model_config = SettingsConfigDict(
         env_file=".env",
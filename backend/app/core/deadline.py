@@ -0,0 +1,146 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+
+from fastapi import Request
+
+T = TypeVar("T")
+
+# --- Header clients can use to shorten (never extend) the server budget ---
+DEADLINE_HEADER = "X-Request-Timeout"
+
+
+class DeadlineExceeded(Exception):
+    """
+        Raised when a request's time budget runs out before `stage` could finish.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        super().__init__(f"Deadline exceeded during {stage}")
+
+
+class Deadline:
+    """
+        A request-scoped time budget shared by every stage of a pipeline.
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str) -> None:
+        """
+            Fails fast if nothing is left of the budget.
+        """
+        if self.expired:
+            raise DeadlineExceeded(stage)
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """
+            Remaining budget, optionally capped by a stage's own limit.
+        """
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    async def wait(self, awaitable: Awaitable[T], stage: str) -> T:
+        """
+            Awaits `awaitable` within the remaining budget.
+        """
+        self.check(stage)
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage) from None
+
+    async def bound_stream(self, stream: AsyncIterator[T], stage: str) -> AsyncIterator[T]:
+        """
+            Re-yields `stream`, failing if any item does not arrive within the budget.
+        """
+        iterator = stream.__aiter__()
+        while True:
+            try:
+                item = await self.wait(iterator.__anext__(), stage)
+            except StopAsyncIteration:
+                return
+            yield item
+
+
+# --- The active deadline is carried in a ContextVar so services need no extra args ---
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def set_current_deadline(deadline: Optional[Deadline]) -> None:
+    _current_deadline.set(deadline)
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """
+        Runs a block without the current deadline: for persisting work that
+        was already paid for and shown to the user (e.g. a streamed answer).
+    """
+    token = _current_deadline.set(None)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def check_deadline(stage: str) -> None:
+    """
+        No-op outside a request; raises DeadlineExceeded when the budget is spent.
+    """
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+async def within_deadline(awaitable: Awaitable[T], stage: str) -> T:
+    """
+        Awaits `awaitable` bounded by the current deadline, if any.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return await awaitable
+    return await deadline.wait(awaitable, stage)
+
+
+class RequestDeadline:
+    """
+    FastAPI dependency that starts a request's deadline.
+
+    The endpoint default applies unless the client sends a shorter
+    `X-Request-Timeout` (seconds). The result is bound to the current
+    context so downstream services can read it via `current_deadline()`.
+    """
+
+    def __init__(self, default_seconds: float):
+        self.default_seconds = default_seconds
+
+    async def __call__(self, request: Request) -> Deadline:
+        seconds = self.default_seconds
+        header = request.headers.get(DEADLINE_HEADER)
+        if header:
+            try:
+                requested = float(header)
+                if requested > 0:
+                    seconds = min(seconds, requested)
+            except ValueError:
+                pass
+        deadline = Deadline(seconds)
+        set_current_deadline(deadline)
+        return deadline
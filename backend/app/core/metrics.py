@@ -0,0 +1,34 @@
+import math
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class LatencyTracker:
+    """
+        Rolling window of latency samples (seconds) kept per key, e.g. per model.
+    """
+
+    def __init__(self, window_size: int = 500):
+        self.window_size = window_size
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, key: str, seconds: float) -> None:
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = deque(maxlen=self.window_size)
+            self._samples[key] = samples
+        samples.append(seconds)
+
+    def count(self, key: str) -> int:
+        return len(self._samples.get(key, ()))
+
+    def percentile(self, key: str, pct: float) -> Optional[float]:
+        """
+            Nearest-rank percentile over the current window, or None when empty.
+        """
+        samples = self._samples.get(key)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return ordered[rank - 1]
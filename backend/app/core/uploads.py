@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Iterable
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# --- Room for multipart boundaries and part headers on top of the file itself ---
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(HTTPException):
+    """
+        413 for bodies over the upload limit. An HTTPException so it also
+        passes through FastAPI's form parsing, which reports anything else as 400.
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = limit_bytes
+        super().__init__(status_code=413, detail=_too_large_detail(limit_bytes))
+
+
+def _too_large_detail(limit_bytes: int) -> dict:
+    return {
+        "code": "FILE_TOO_LARGE",
+        "limit_bytes": limit_bytes,
+        "message": f"File exceeds the {limit_bytes // (1024 * 1024)} MB upload limit.",
+    }
+
+
+@dataclass
+class SpooledUpload:
+    """
+        An upload copied to a local temp file; the caller removes `path`.
+    """
+    path: str
+    size: int
+    sha256: str
+
+
+async def spool_upload(
+    file: UploadFile,
+    max_bytes: int,
+    chunk_size: int,
+    suffix: str = ""
+) -> SpooledUpload:
+    """
+    Copies `file` to a temp file in `chunk_size` pieces, hashing as it goes.
+
+    Peak memory is one chunk regardless of file size. Raises UploadTooLarge
+    as soon as more than `max_bytes` have been read (the partial file is removed).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        with tmp:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await run_in_threadpool(tmp.write, chunk)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return SpooledUpload(path=tmp.name, size=size, sha256=digest.hexdigest())
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized upload bodies before they are parsed or spooled.
+
+    - A declared Content-Length over the limit is answered with 413 at once.
+    - Chunked bodies are counted while they stream in and aborted with
+      UploadTooLarge once they pass the limit.
+    Only requests whose path ends with one of `paths` are checked.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, paths: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.max_body = max_bytes + MULTIPART_OVERHEAD_BYTES
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].endswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_body:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def counting_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    raise UploadTooLarge(self.max_bytes)
+            return message
+
+        await self.app(scope, counting_receive, send)
+
+    async def _reject(self, send: Send) -> None:
+        body = json.dumps({"detail": _too_large_detail(self.max_bytes)}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
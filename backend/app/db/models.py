@@ -1,3 +1,4 @@
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import SQLModel , Field , Relationship 
 from typing import List , Optional 
 from datetime import datetime 
@@ -10,14 +11,55 @@ class Session(SQLModel , table=True):
     # --- For File Search --- 
     file_search_store_name: Optional[str] = None 
     file_name: Optional[str] = None 
+    file_search_status: Optional[str] = None  # IndexingState; None for sessions indexed synchronously
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     messages: List["Message"] = Relationship(back_populates="session", cascade_delete=True)
 class Message(SQLModel , table=True):
+    # --- Keyset pagination: (session_id, created_at, id) ---
+    __table_args__ = (Index("ix_message_session_created_id", "session_id", "created_at", "id"),)
     id : Optional[int] = Field(default=None , primary_key=True)
     session_id: int = Field(foreign_key="session.id")
     role: str 
     content: str 
     sources: Optional[str] = None 
+    cards: Optional[str] = None  # JSON array of person/company cards (agent answers)
+    # --- Usage & Latency (assistant messages) --- 
+    model: Optional[str] = None 
+    input_tokens: Optional[int] = None 
+    output_tokens: Optional[int] = None 
+    cached_tokens: Optional[int] = None 
+    ttft_ms: Optional[int] = None 
+    duration_ms: Optional[int] = None 
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    session: Session = Relationship(back_populates="messages")
+
+class FileStore(SQLModel, table=True):
+    """
+        Content-addressed registry of indexed File Search stores, shared across sessions.
+    """
+    __table_args__ = (UniqueConstraint("content_hash", "chunking_key", name="uq_filestore_content"),)
+    id : Optional[int] = Field(default=None , primary_key=True)
+    content_hash: str 
+    chunking_key: str 
+    store_name: str = Field(unique=True)
+    file_name: str 
+    size_bytes: int 
+    ref_count: int = 1 
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SessionFile(SQLModel, table=True):
+    """
+        One document in a file-search session's store, with its own indexing status.
+    """
+    __table_args__ = (UniqueConstraint("session_id", "content_hash", name="uq_sessionfile_content"),)
+    id : Optional[int] = Field(default=None , primary_key=True)
+    session_id: int = Field(foreign_key="session.id", index=True)
+    file_name: str 
+    content_hash: str 
+    size_bytes: int 
+    status: str = "queued"  # IndexingState
+    error: Optional[str] = None 
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    session: Session = Relationship(back_populates="messages")
\ No newline at end of file
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from app.api.v1.router import router as v1_router
+from app.api.deps import get_indexing_jobs, get_store_reaper, shutdown_services
+from app.core.admission import AdmissionRejected
+from app.core.deadline import DeadlineExceeded
 from app.core.config import get_settings
+from app.core.uploads import UploadSizeLimitMiddleware
 from app.core.logging import app_logger
 
 settings = get_settings()
@@ -15,8 +20,13 @@ async def lifespan(app: FastAPI):
     """
     app_logger.info("🚀 Warm AI Backend starting up...")
     app_logger.info(f"📍 Environment: {settings.ENVIRONMENT}")
+    # --- Repairs sessions left "indexing" by a worker that died mid-job ---
+    get_indexing_jobs().start()
+    if settings.STORE_REAPER_ENABLED:
+        get_store_reaper().start()
     yield
     app_logger.info("👋 Warm AI Backend shutting down...")
+    await shutdown_services()
 
 
 # --- Create FastAPI Application ---
@@ -29,7 +39,19 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# --- CORS Configuration (Must be before routes) ---
+# --- Reject oversized uploads before the body is parsed ---
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=settings.FILE_UPLOAD_MAX_BYTES,
+    paths=["/file-search/upload"],
+)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=settings.FILE_UPLOAD_MAX_BATCH_BYTES,
+    paths=["/file-search/upload-batch", "/files"],
+)
+
+# --- CORS Configuration (Must be before routes; added last so it wraps every other middleware, 413s included) ---
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:8080", "http://localhost:5173", "http://127.0.0.1:8080", "http://127.0.0.1:5173"],
@@ -39,6 +61,42 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# --- Exception Handlers ---
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """
+        Upstream saturated: fail fast with 429 so clients back off.
+    """
+    return JSONResponse(
+        status_code=429,
+        content={
+            "detail": {
+                "code": "UPSTREAM_OVERLOADED",
+                "upstream": exc.upstream,
+                "message": "Service is busy, please retry shortly.",
+            }
+        },
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """
+        Request budget spent: give up instead of tying up a worker.
+    """
+    return JSONResponse(
+        status_code=504,
+        content={
+            "detail": {
+                "code": "DEADLINE_EXCEEDED",
+                "stage": exc.stage,
+                "message": "The request took too long. Please try again.",
+            }
+        },
+    )
+
+
 # --- Include Routers ---
 app.include_router(v1_router)
 
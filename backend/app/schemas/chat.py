@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from app.schemas.common import ChatMode
+from app.schemas.search import PersonCard, CompanyCard
 
 class ChatMessageRequest(BaseModel):
     conversation_id: Optional[int] = None
@@ -12,10 +13,26 @@ class SourceCitation(BaseModel):
     title: str
     url: str
 
+class UsageStats(BaseModel):
+    """
+        Token and latency accounting for one assistant message
+    """
+    model: Optional[str] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    ttft_ms: Optional[int] = None
+    duration_ms: Optional[int] = None
+
 class ChatStreamResponse(BaseModel):
     """
         The schema for each chunk in the SSE stream
     """
-    type: str  # "token" | "citation" | "done" | "error"
+    type: str  # "session_created" | "token" | "citation" | "cards" | "done" | "error"
     content: Optional[str] = None
-    sources: Optional[List[SourceCitation]] = None
\ No newline at end of file
+    session_id: Optional[int] = None  # Sent on "session_created"
+    title: Optional[str] = None
+    stream_id: Optional[str] = None  # Set when multiplexed over a WebSocket
+    sources: Optional[List[SourceCitation]] = None
+    cards: Optional[List[PersonCard | CompanyCard]] = None
+    usage: Optional[UsageStats] = None  # Sent on "done"
\ No newline at end of file
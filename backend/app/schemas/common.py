@@ -4,6 +4,7 @@ class ChatMode(str , Enum):
     STANDARD = "standard"
     WEB_SEARCH = "web_search"
     FILE_SEARCH = "file_search"
+    AGENT = "agent"
 
 class SearchCategory(str , Enum):
     PEOPLE = "people"
@@ -12,3 +13,11 @@ class SearchCategory(str , Enum):
 class CardType(str , Enum):
     PERSON = "person"
     COMPANY = "company"
+
+class IndexingState(str , Enum):
+    QUEUED = "queued"
+    UPLOADING = "uploading"
+    INDEXING = "indexing"
+    READY = "ready"
+    FAILED = "failed"
+    EXPIRED = "expired"  # store reclaimed after sitting idle
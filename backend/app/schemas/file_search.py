@@ -1,11 +1,54 @@
 from pydantic import BaseModel 
 from typing import List , Optional 
+from datetime import datetime
+from app.schemas.common import IndexingState
 
 class FileUploadResponse(BaseModel):
     session_id: int 
-    store_name: str 
+    store_name: Optional[str] = None  # set once indexing is done
     file_name: str 
-    status: str  # "indexed" | "error"
+    status: str  # IndexingState value
+    job_id: Optional[str] = None 
+
+class IndexingFileStatus(BaseModel):
+    """
+        Per-document state within an indexing job or session
+    """
+    file_name: str 
+    state: IndexingState 
+    error: Optional[str] = None 
+
+class IndexingJobStatus(BaseModel):
+    """
+        Progress of a background indexing job (status endpoint and SSE stream)
+    """
+    type: str = "job_status"
+    job_id: str 
+    session_id: int 
+    file_name: str 
+    state: IndexingState 
+    store_name: Optional[str] = None 
+    reused: bool = False 
+    error: Optional[str] = None 
+    files: List[IndexingFileStatus] = []
+    created_at: datetime 
+    updated_at: datetime 
+
+class BatchUploadResponse(BaseModel):
+    session_id: int 
+    job_id: Optional[str] = None  # None when every file was already in the store
+    status: str  # IndexingState value
+    files: List[IndexingFileStatus]
+
+class SessionFileResponse(BaseModel):
+    id: int 
+    file_name: str 
+    content_hash: str 
+    size_bytes: int 
+    status: str 
+    error: Optional[str] = None 
+    created_at: datetime 
+    updated_at: datetime 
 
 class FileSearchChatRequest(BaseModel):
     session_id: int 
@@ -17,3 +60,12 @@ class FileSearchCitation(BaseModel):
     text_segment: str 
     start_index: Optional[int] = None 
     end_index: Optional[int] = None
+    page_range: Optional[str] = None  # "pp. 51-100" for a shard, "p. 7" for a chunk of a whole document
+    chunk_id: Optional[str] = None  # Fingerprint of the retrieved chunk (citation preview key)
+
+class CitationPreview(BaseModel):
+    chunk_id: str
+    file_name: str
+    page: Optional[int] = None
+    context: str
+    match_offset: int  # Where the cited chunk starts within `context`
@@ -8,6 +8,13 @@ class MessageResponse(BaseModel):
     role: str
     content: str
     sources: Optional[str] = None
+    cards: Optional[str] = None
+    model: Optional[str] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    ttft_ms: Optional[int] = None
+    duration_ms: Optional[int] = None
     created_at: datetime
 
 class SessionSummary(BaseModel):
@@ -19,14 +26,27 @@ class SessionSummary(BaseModel):
     mode: ChatMode
     file_search_store_name: Optional[str] = None
     file_name: Optional[str] = None
+    file_search_status: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
 class SessionDetail(SessionSummary):
     """
-        Used when opening a specific chat
+        Used when opening a specific chat (messages is None when excluded;
+        page through them with /sessions/{id}/messages instead)
+    """
+    messages: Optional[List[MessageResponse]] = None
+
+class MessagePage(BaseModel):
+    """
+        One keyset page of a session's messages, oldest first.
+        Pass `before` back as ?before= for older messages, `after` as ?after= for newer.
     """
     messages: List[MessageResponse]
+    before: Optional[str] = None
+    after: Optional[str] = None
+    has_more_before: bool = False
+    has_more_after: bool = False
 
 class SessionUpdate(BaseModel):
     title: str
\ No newline at end of file
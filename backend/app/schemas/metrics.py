@@ -0,0 +1,47 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from app.schemas.common import ChatMode
+
+class AdmissionMetrics(BaseModel):
+    upstream: str
+    in_flight: int
+    queue_depth: int
+    max_concurrency: int
+    max_queue: int
+    admitted_total: int
+    rejected_total: int
+    wait_p50_ms: Optional[float] = None
+    wait_p95_ms: Optional[float] = None
+    wait_p99_ms: Optional[float] = None
+
+class AdmissionMetricsResponse(BaseModel):
+    upstreams: List[AdmissionMetrics]
+
+class UsageAggregate(BaseModel):
+    mode: ChatMode
+    model: str
+    messages: int
+    input_tokens: int
+    output_tokens: int
+    cached_tokens: int
+    estimated_cost_usd: Optional[float] = None
+    ttft_p50_ms: Optional[float] = None
+    ttft_p95_ms: Optional[float] = None
+    ttft_p99_ms: Optional[float] = None
+    duration_p50_ms: Optional[float] = None
+    duration_p95_ms: Optional[float] = None
+    duration_p99_ms: Optional[float] = None
+
+class UsageReport(BaseModel):
+    window_hours: int
+    since: datetime
+    groups: List[UsageAggregate]
+
+class StoreLifecycleMetrics(BaseModel):
+    runs: int
+    idle_reclaimed: int
+    orphans_reclaimed: int
+    failed: int
+    last_run_at: Optional[datetime] = None
+    idle_ttl_s: float
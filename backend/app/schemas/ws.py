@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import Annotated, Literal, Union
+from app.schemas.chat import ChatMessageRequest
+from app.schemas.file_search import FileSearchChatRequest
+
+class WSChatOpen(ChatMessageRequest):
+    """
+        Opens a chat stream on a multiplexed connection
+    """
+    op: Literal["chat"]
+    stream_id: str = Field(..., min_length=1, max_length=64)
+
+class WSFileSearchOpen(FileSearchChatRequest):
+    """
+        Opens a file search stream on a multiplexed connection
+    """
+    op: Literal["file_search"]
+    stream_id: str = Field(..., min_length=1, max_length=64)
+
+class WSCancel(BaseModel):
+    op: Literal["cancel"]
+    stream_id: str
+
+WSClientMessage = Annotated[Union[WSChatOpen, WSFileSearchOpen, WSCancel], Field(discriminator="op")]
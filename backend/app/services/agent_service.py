@@ -0,0 +1,133 @@
+import asyncio
+import re
+from typing import AsyncGenerator, Optional
+
+from app.core.admission import AdmissionController, AdmissionRejected
+from app.core.logging import app_logger
+from app.schemas.chat import ChatStreamResponse
+from app.schemas.common import ChatMode, SearchCategory
+from app.services.exa_service import ExaService
+from app.services.llm_service import GeminiService
+
+# --- Keyword heuristics for intent classification ---
+# NOTE: A regex pass costs microseconds; an extra LLM call would add a full
+# round-trip before the Exa search could even start.
+_PEOPLE_PATTERN = re.compile(
+    r"\b(who|whom|people|person|profiles?|candidates?|engineers?|developers?|designers?|"
+    r"scientists?|researchers?|leads?|founders?|co-?founders?|ceos?|ctos?|cfos?|vps?|"
+    r"heads? of|directors?|managers?|recruiters?|experts?|professionals?|talent|hires?|hiring)\b",
+    re.IGNORECASE,
+)
+_COMPANY_PATTERN = re.compile(
+    r"\b(compan(y|ies)|startups?|firms?|businesses|vendors?|competitors?|agencies|"
+    r"organi[sz]ations?|fintechs?|scale-?ups?|enterprises?|brands?|providers?)\b",
+    re.IGNORECASE,
+)
+
+
+def classify_intent(message: str) -> Optional[SearchCategory]:
+    """
+        Decides whether a chat message also warrants an Exa people/company search.
+        People wins over company ("ML leads at fintechs" is a people query).
+    """
+    if _PEOPLE_PATTERN.search(message):
+        return SearchCategory.PEOPLE
+    if _COMPANY_PATTERN.search(message):
+        return SearchCategory.COMPANY
+    return None
+
+
+class AgentService:
+    """
+    Agentic chat: grounded Gemini narrative plus Exa cards in one stream.
+
+    The Exa search runs concurrently with the Gemini stream; its `cards`
+    event is interleaved as soon as it lands and `done` is held back until
+    both branches have finished.
+    """
+
+    def __init__(
+        self,
+        gemini: GeminiService,
+        exa: ExaService,
+        exa_admission: Optional[AdmissionController] = None,
+        num_results: int = 5
+    ):
+        self.gemini = gemini
+        self.exa = exa
+        self.exa_admission = exa_admission
+        self.num_results = num_results
+
+    async def _search_cards(self, category: SearchCategory, query: str) -> Optional[ChatStreamResponse]:
+        search = self.exa.search_people if category == SearchCategory.PEOPLE else self.exa.search_companies
+        try:
+            if self.exa_admission is not None:
+                async with self.exa_admission.admit():
+                    result = await search(query, self.num_results)
+            else:
+                result = await search(query, self.num_results)
+        except AdmissionRejected:
+            app_logger.warning("Agent card search skipped: Exa saturated")
+            return None
+        if result.request_id == "error" or not result.results:
+            return None
+        return ChatStreamResponse(type="cards", cards=result.results)
+
+    async def chat_stream(
+        self,
+        message: str,
+        model: str = "gemini-flash-latest"
+    ) -> AsyncGenerator[ChatStreamResponse, None]:
+        """
+            Streams the web-grounded answer, interleaving typed card events.
+        """
+        category = classify_intent(message)
+        app_logger.info(f"Starting Agent Stream | Intent: {category} | Model: {model}")
+
+        queue: asyncio.Queue = asyncio.Queue()
+        end = object()
+        usage = None
+
+        async def pump_narrative():
+            nonlocal usage
+            try:
+                async for event in self.gemini.chat_stream(message, ChatMode.WEB_SEARCH, model):
+                    if event.type == "done":
+                        usage = event.usage
+                    else:
+                        await queue.put(event)
+            except Exception as e:
+                app_logger.error(f"Agent narrative failed: {str(e)}")
+                await queue.put(ChatStreamResponse(
+                    type="error",
+                    content="I encountered an error connecting to the AI service."
+                ))
+            finally:
+                await queue.put(end)
+
+        async def pump_cards():
+            try:
+                event = await self._search_cards(category, message)
+                if event is not None:
+                    await queue.put(event)
+            except Exception as e:
+                app_logger.error(f"Agent card search failed: {str(e)}")
+            finally:
+                await queue.put(end)
+
+        tasks = [asyncio.create_task(pump_narrative())]
+        if category is not None:
+            tasks.append(asyncio.create_task(pump_cards()))
+
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event = await queue.get()
+                if event is end:
+                    remaining -= 1
+                    continue
+                yield event
+            yield ChatStreamResponse(type="done", usage=usage)
+        finally:
+            for task in tasks:
+                task.cancel()
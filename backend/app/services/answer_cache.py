@@ -0,0 +1,105 @@
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+_SPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = " ?!.。？！"
+
+
+@dataclass
+class CachedAnswer:
+    """
+        A finished grounded answer: final text plus its citations (as dicts).
+    """
+    text: str
+    citations: List[dict]
+    expires_at: float
+
+
+class AnswerCache:
+    """
+    In-process LRU of final File Search answers keyed by
+    (store name, normalized query, model), with a TTL.
+
+    Each store has a generation that `invalidate` bumps when its contents
+    change or it is deleted. Callers read the generation before generating
+    and pass it to `put`, so an answer computed against the old contents is
+    never stored after the store changed.
+
+    Generations live in this process only, so an upload handled by another
+    worker does not invalidate anything here: the cache is for
+    single-worker deployments (see `ANSWER_CACHE_ENABLED`).
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[str, str, str], CachedAnswer]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """
+            Case-, width- and whitespace-insensitive form of a question.
+        """
+        text = unicodedata.normalize("NFKC", query).casefold()
+        return _SPACE.sub(" ", text).strip().rstrip(_TRAILING_PUNCTUATION)
+
+    def generation(self, store_name: str) -> int:
+        return self._generations.get(store_name, 0)
+
+    def get(self, store_name: str, query: str, model: str) -> Optional[CachedAnswer]:
+        key = (store_name, self.normalize(query), model)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self,
+        store_name: str,
+        query: str,
+        model: str,
+        text: str,
+        citations: List[dict],
+        generation: int
+    ) -> None:
+        if generation != self.generation(store_name):
+            return
+        key = (store_name, self.normalize(query), model)
+        self._entries[key] = CachedAnswer(text, citations, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, store_name: str) -> int:
+        """
+            Drops every answer for a store; returns how many were dropped.
+        """
+        self._generations[store_name] = self.generation(store_name) + 1
+        stale = [key for key in self._entries if key[0] == store_name]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+
+def build_answer_cache() -> Optional[AnswerCache]:
+    """
+        Returns the configured answer cache, or None when it is disabled.
+    """
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    return AnswerCache(settings.ANSWER_CACHE_TTL_S, settings.ANSWER_CACHE_MAX_ENTRIES)
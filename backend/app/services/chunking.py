@@ -0,0 +1,70 @@
+import mimetypes
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# --- Row-oriented formats: small chunks keep a row and its neighbours together ---
+TABULAR_MIME_TYPES = {
+    "text/csv",
+    "text/tab-separated-values",
+    "application/json",
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# --- Running text: large documents index faster with larger chunks ---
+PROSE_MIME_TYPES = {
+    "application/pdf",
+    "text/plain",
+    "text/markdown",
+    "text/html",
+    "application/msword",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+@dataclass(frozen=True)
+class ChunkingProfile:
+    """
+        A named `white_space_config` for File Search uploads.
+    """
+    name: str
+    max_tokens_per_chunk: int
+    max_overlap_tokens: int
+
+    @property
+    def config(self) -> dict:
+        return {
+            "white_space_config": {
+                "max_tokens_per_chunk": self.max_tokens_per_chunk,
+                "max_overlap_tokens": self.max_overlap_tokens
+            }
+        }
+
+
+CHUNKING_PROFILES: Dict[str, ChunkingProfile] = {
+    "default": ChunkingProfile("default", settings.CHUNKING_DEFAULT_TOKENS, settings.CHUNKING_DEFAULT_OVERLAP),
+    "prose": ChunkingProfile("prose", settings.CHUNKING_PROSE_TOKENS, settings.CHUNKING_PROSE_OVERLAP),
+    "tabular": ChunkingProfile("tabular", settings.CHUNKING_TABULAR_TOKENS, settings.CHUNKING_TABULAR_OVERLAP),
+}
+
+
+def select_profile(file_name: str, size_bytes: int, mime_type: Optional[str] = None) -> ChunkingProfile:
+    """
+    Picks the chunking profile for a document.
+
+    - Tabular MIME types always get the fine-grained `tabular` profile.
+    - Prose MIME types of at least CHUNKING_PROSE_MIN_BYTES get `prose`.
+    - Everything else, and everything when profiles are disabled, gets `default`.
+    """
+    if not settings.CHUNKING_PROFILES_ENABLED:
+        return CHUNKING_PROFILES["default"]
+    mime_type = mime_type or mimetypes.guess_type(file_name)[0] or ""
+    if mime_type in TABULAR_MIME_TYPES:
+        return CHUNKING_PROFILES["tabular"]
+    if mime_type in PROSE_MIME_TYPES and size_bytes >= settings.CHUNKING_PROSE_MIN_BYTES:
+        return CHUNKING_PROFILES["prose"]
+    return CHUNKING_PROFILES["default"]
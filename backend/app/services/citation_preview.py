@@ -0,0 +1,260 @@
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.chunking import select_profile
+from app.services.text_extraction import PDF_SUFFIXES, TEXT_SUFFIXES, extract_text, split_text
+
+settings = get_settings()
+
+# --- A chunk is identified by its first few words, so any retriever can name it ---
+SHINGLE_WORDS = 8
+_WORD = re.compile(r"\w+")
+_TOKEN = re.compile(r"\S+")
+_HEX_ID = re.compile(r"^[0-9a-f]{16}$")
+
+# --- Hash table slot: (fingerprint, byte offset + 1); offset 0 marks an empty slot ---
+_SLOT = struct.Struct("<QQ")
+_PAGE_BREAK = "\f"
+
+
+def _key(words: Iterable[str]) -> int:
+    digest = hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def fingerprint(text: str) -> Optional[str]:
+    """
+        `chunk_id` for a retrieved chunk: hash of its first SHINGLE_WORDS words.
+    """
+    if not isinstance(text, str):
+        return None
+    words = [w.casefold() for w in _WORD.findall(text)[:SHINGLE_WORDS]]
+    if not words:
+        return None
+    return f"{_key(words):016x}"
+
+
+def _chunked_separately(text: str, page_starts: List[int], file_name: str, file_path: str, prepared: bool) -> List[int]:
+    """
+        Char offsets where File Search starts chunking afresh: the document
+        start, plus every shard start when the upload gets sharded (same
+        rules as `FileSearchService._upload_document`).
+    """
+    if not settings.FILE_SEARCH_SHARDING_ENABLED:
+        return [0]
+    suffix = Path(file_name).suffix.lower()
+    if (prepared or suffix in PDF_SUFFIXES) and len(page_starts) >= settings.FILE_SEARCH_SHARD_MIN_PAGES:
+        return page_starts[::settings.FILE_SEARCH_SHARD_PAGES]
+    if not prepared and suffix in TEXT_SUFFIXES and os.path.getsize(file_path) > 2 * settings.FILE_SEARCH_SHARD_TEXT_BYTES:
+        starts = [0]
+        for piece in split_text(text, settings.FILE_SEARCH_SHARD_TEXT_BYTES)[:-1]:
+            starts.append(starts[-1] + len(piece))
+        return starts
+    return [0]
+
+
+def _byte_offsets(text: str, entries: List[Tuple[int, int]]) -> Iterator[Tuple[int, int]]:
+    """
+        (key, char offset) -> (key, UTF-8 byte offset), for ascending offsets.
+    """
+    byte_offset = 0
+    last = 0
+    for key, offset in entries:
+        byte_offset += len(text[last:offset].encode("utf-8"))
+        last = offset
+        yield key, byte_offset
+
+
+@dataclass
+class CitationContext:
+    """
+        Text around a cited chunk; the chunk starts at `match_offset` in `context`.
+    """
+    file_name: str
+    page: Optional[int]
+    context: str
+    match_offset: int
+
+
+class CitationPreviewIndex:
+    """
+    Content-addressed local copies of uploaded documents for citation previews.
+
+    Per document (directory = sha256): `text.bin` (UTF-8 text, pages split
+    by form feeds), `index.bin` (open-addressing table: fingerprint of the
+    SHINGLE_WORDS words at each position the whitespace chunker starts a
+    chunk -> byte offset) and `meta.json`. Both files are memory-mapped on lookup, so a preview costs
+    a couple of probes and one slice regardless of document size.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def exists(self, content_hash: str) -> bool:
+        return (self._directory(content_hash) / "meta.json").exists()
+
+    def build(self, content_hash: str, file_path: str, file_name: str, pages: Optional[List[str]] = None) -> bool:
+        """
+            Indexes a document: `pages` when it was uploaded as cleaned text,
+            otherwise the file's own text, so cited chunks resolve to the text
+            File Search chunked. Chunk starts follow the file's chunking
+            profile and its shards. False for formats we can't extract.
+            CPU-bound: runs in the preprocessing process pool.
+        """
+        if self.exists(content_hash):
+            return True
+        prepared = pages is not None
+        if pages is None:
+            pages = extract_text(file_path, file_name)
+        if pages is None:
+            return False
+
+        text = _PAGE_BREAK.join(pages)
+        page_starts = [0]
+        for page in pages[:-1]:
+            page_starts.append(page_starts[-1] + len(page) + len(_PAGE_BREAK))
+
+        ws = select_profile(file_name, os.path.getsize(file_path)).config["white_space_config"]
+        step = max(1, ws["max_tokens_per_chunk"] - ws["max_overlap_tokens"])
+        segments = _chunked_separately(text, page_starts, file_name, file_path, prepared)
+
+        # --- Only where the chunker starts a chunk: one slot per `step` tokens, not per word ---
+        starts = []  # (fingerprint, char offset), ascending
+        for begin, end in zip(segments, segments[1:] + [len(text)]):
+            for match in islice(_TOKEN.finditer(text, begin, end), 0, None, step):
+                words = [w.group().casefold() for w in islice(_WORD.finditer(text, match.start()), SHINGLE_WORDS)]
+                starts.append((_key(words), match.start()))
+
+        capacity = 8
+        while capacity < 2 * max(1, len(starts)):
+            capacity *= 2
+        table = bytearray(capacity * _SLOT.size)
+        for key, offset in _byte_offsets(text, starts):
+            self._insert(table, capacity, key, offset)
+        page_starts = [offset for _, offset in _byte_offsets(text, [(0, c) for c in page_starts])]
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix="preview-", dir=self.root))
+        (staging / "text.bin").write_bytes(text.encode("utf-8"))
+        (staging / "index.bin").write_bytes(bytes(table))
+        (staging / "meta.json").write_text(json.dumps({
+            "file_name": file_name,
+            "capacity": capacity,
+            "pages": page_starts if len(pages) > 1 else None,
+        }))
+        try:
+            os.rename(staging, self._directory(content_hash))
+        except OSError:
+            # --- Built concurrently by another job: keep theirs ---
+            shutil.rmtree(staging, ignore_errors=True)
+        return True
+
+    def lookup(self, content_hash: str, chunk_id: str, window_chars: int) -> Optional[CitationContext]:
+        """
+            Context window around the chunk `chunk_id`, or None if not in this document.
+        """
+        located = self._locate(content_hash, chunk_id)
+        if located is None:
+            return None
+        meta, offset = located
+
+        with open(self._directory(content_hash) / "text.bin", "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as text:
+            # --- Byte window, ~4 bytes per char worst case; trimmed to chars below ---
+            start = max(0, offset - window_chars * 4)
+            before = text[start:offset].decode("utf-8", errors="ignore")[-window_chars:]
+            after = text[offset:offset + window_chars * 4].decode("utf-8", errors="ignore")[:window_chars]
+
+        page = bisect.bisect_right(meta["pages"], offset) if meta["pages"] else None
+        return CitationContext(
+            file_name=meta["file_name"],
+            page=page,
+            context=(before + after).replace(_PAGE_BREAK, "\n\n"),
+            match_offset=len(before)
+        )
+
+    def page(self, content_hash: str, chunk_id: str) -> Optional[int]:
+        """
+            Page the chunk `chunk_id` starts on, or None for single-page
+            documents and chunks not in this one.
+        """
+        located = self._locate(content_hash, chunk_id)
+        if located is None:
+            return None
+        meta, offset = located
+        return bisect.bisect_right(meta["pages"], offset) if meta["pages"] else None
+
+    def prune(self, keep: set, older_than_s: float) -> int:
+        """
+            Removes documents no session references any more; returns the count.
+        """
+        removed = 0
+        cutoff = time.time() - older_than_s
+        if not self.root.is_dir():
+            return removed
+        for directory in self.root.iterdir():
+            if directory.name in keep or not directory.is_dir() or directory.stat().st_mtime > cutoff:
+                continue
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+        return removed
+
+    # --- Internals ---
+    def _directory(self, content_hash: str) -> Path:
+        if not re.fullmatch(r"[0-9a-f]{64}", content_hash):
+            raise ValueError("content hash must be a hex sha256")
+        return self.root / content_hash
+
+    def _locate(self, content_hash: str, chunk_id: str) -> Optional[Tuple[dict, int]]:
+        directory = self._directory(content_hash)
+        if not _HEX_ID.match(chunk_id) or not (directory / "meta.json").exists():
+            return None
+        meta = json.loads((directory / "meta.json").read_text())
+        offset = self._probe(directory / "index.bin", meta["capacity"], int(chunk_id, 16))
+        return (meta, offset) if offset is not None else None
+
+    @staticmethod
+    def _insert(table: bytearray, capacity: int, key: int, offset: int) -> None:
+        slot = key & (capacity - 1)
+        while True:
+            existing, stored = _SLOT.unpack_from(table, slot * _SLOT.size)
+            if stored == 0:
+                _SLOT.pack_into(table, slot * _SLOT.size, key, offset + 1)
+                return
+            if existing == key:
+                return  # --- Repeated passage: keep the first occurrence ---
+            slot = (slot + 1) & (capacity - 1)
+
+    @staticmethod
+    def _probe(path: Path, capacity: int, key: int) -> Optional[int]:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as table:
+            slot = key & (capacity - 1)
+            for _ in range(capacity):
+                existing, stored = _SLOT.unpack_from(table, slot * _SLOT.size)
+                if stored == 0:
+                    return None
+                if existing == key:
+                    return stored - 1
+                slot = (slot + 1) & (capacity - 1)
+        return None
+
+
+def build_citation_previews() -> Optional[CitationPreviewIndex]:
+    """
+        Returns the preview index, or None when previews are disabled.
+    """
+    if not settings.CITATION_PREVIEW_ENABLED:
+        return None
+    return CitationPreviewIndex(settings.CITATION_PREVIEW_DIR)
@@ -0,0 +1,52 @@
+from typing import Any, Callable, Generic, Hashable, List, Set, TypeVar
+
+from app.schemas.chat import SourceCitation
+from app.schemas.file_search import FileSearchCitation
+
+C = TypeVar("C")
+
+
+class CitationCollector(Generic[C]):
+    """
+    Merges grounding citations across every chunk of a stream.
+
+    Each chunk is run through `extract` (candidate -> citations); citations
+    whose `key` was already seen are dropped, so `collect` only returns the
+    sources that are new since the previous chunk.
+    """
+
+    def __init__(self, extract: Callable[[Any], List[C]], key: Callable[[C], Hashable]):
+        self._extract = extract
+        self._key = key
+        self._seen: Set[Hashable] = set()
+        self.citations: List[C] = []
+
+    def collect(self, chunk: Any) -> List[C]:
+        new: List[C] = []
+        for candidate in getattr(chunk, "candidates", None) or []:
+            for citation in self._extract(candidate):
+                key = self._key(citation)
+                if key in self._seen:
+                    continue
+                self._seen.add(key)
+                new.append(citation)
+        self.citations.extend(new)
+        return new
+
+
+def web_citation_key(citation: SourceCitation) -> Hashable:
+    """
+        Web sources are deduplicated by URL (falling back to title).
+    """
+    return citation.url or citation.title
+
+
+def file_citation_key(citation: FileSearchCitation) -> Hashable:
+    """
+        File sources are deduplicated by document and retrieved chunk, so
+        several answer spans grounded in one chunk cite it once. Citations
+        without a chunk fingerprint fall back to their grounded span.
+    """
+    if citation.chunk_id is not None:
+        return (citation.source_title, citation.page_range, citation.chunk_id)
+    return (citation.source_title, citation.start_index, citation.end_index, citation.text_segment)
@@ -2,10 +2,10 @@ import json
 import re
 from typing import List, Optional, Tuple
 from dataclasses import dataclass
-from exa_py import Exa
-from starlette.concurrency import run_in_threadpool  # Non-blocking for sync SDK
+from exa_py import AsyncExa
 
 from app.core.config import get_settings
+from app.core.deadline import DeadlineExceeded, within_deadline
 from app.core.logging import app_logger
 from app.schemas.search import PersonCard, CompanyCard, SearchResponse
 from app.schemas.common import CardType
@@ -33,7 +33,9 @@ class ExaService:
     """
     
     def __init__(self):
-        self.client = Exa(api_key=settings.EXA_API_KEY)
+        # --- Async SDK: a timed-out or cancelled search frees its connection, no thread is left behind ---
+        self.client = AsyncExa(api_key=settings.EXA_API_KEY)
+        self.client.client.timeout = settings.EXA_TIMEOUT_S
         app_logger.info("ExaService initialized")
     
     # --- Helper Methods ---
@@ -98,8 +100,7 @@ class ExaService:
     
     async def search_people(self, query: str, num_results: int = 5) -> ExaSearchResult:
         """
-        Async wrapper that runs the blocking Exa logic in a threadpool.
-        This prevents blocking the FastAPI event loop.
+        People search, bounded by the request deadline and EXA_TIMEOUT_S.
         
         Args:
             query: Natural language query (e.g., "AI Engineer in Berlin with 3 years exp")
@@ -108,22 +109,18 @@ class ExaService:
         Returns:
             ExaSearchResult with request_id and List[PersonCard]
         """
-        return await run_in_threadpool(self._search_people_sync, query, num_results)
-    
-    def _search_people_sync(self, query: str, num_results: int) -> ExaSearchResult:
-        """
-        Synchronous implementation of people search.
-        Called via run_in_threadpool to avoid blocking.
-        """
         app_logger.info(f"Exa People Search | Query: '{query}' | Limit: {num_results}")
         
         try:
-            response = self.client.search_and_contents(
-                query,
-                type="auto",
-                category="people",
-                text=True,
-                num_results=num_results
+            response = await within_deadline(
+                self.client.search_and_contents(
+                    query,
+                    type="auto",
+                    category="people",
+                    text=True,
+                    num_results=num_results
+                ),
+                "exa_people_search"
             )
             
             request_id = getattr(response, 'requestId', 'unknown')
@@ -170,14 +167,15 @@ class ExaService:
             
             return ExaSearchResult(request_id=request_id, results=results)
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             app_logger.error(f"Exa People Search Failed: {str(e)}")
             return ExaSearchResult(request_id="error", results=[])
 
     async def search_companies(self, query: str, num_results: int = 5) -> ExaSearchResult:
         """
-        Async wrapper that runs the blocking Exa logic in a threadpool.
-        This prevents blocking the FastAPI event loop.
+        Company search, bounded by the request deadline and EXA_TIMEOUT_S.
         
         Args:
             query: Natural language query (e.g., "Seed-stage AI startups in London")
@@ -186,13 +184,6 @@ class ExaService:
         Returns:
             ExaSearchResult with request_id and List[CompanyCard]
         """
-        return await run_in_threadpool(self._search_companies_sync, query, num_results)
-    
-    def _search_companies_sync(self, query: str, num_results: int) -> ExaSearchResult:
-        """
-        Synchronous implementation of company search.
-        Called via run_in_threadpool to avoid blocking.
-        """
         app_logger.info(f"Exa Company Search | Query: '{query}' | Limit: {num_results}")
 
         # --- Define schema for structured output ---
@@ -210,12 +201,15 @@ class ExaService:
         }
 
         try:
-            response = self.client.search_and_contents(
-                query,
-                type="auto",
-                category="company",
-                num_results=num_results,
-                summary={"schema": company_schema}
+            response = await within_deadline(
+                self.client.search_and_contents(
+                    query,
+                    type="auto",
+                    category="company",
+                    num_results=num_results,
+                    summary={"schema": company_schema}
+                ),
+                "exa_company_search"
             )
             
             request_id = getattr(response, 'requestId', 'unknown')
@@ -268,6 +262,8 @@ class ExaService:
 
             return ExaSearchResult(request_id=request_id, results=results)
 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             app_logger.error(f"Exa Company Search Failed: {str(e)}")
             return ExaSearchResult(request_id="error", results=[])
\ No newline at end of file
@@ -1,8 +1,8 @@
+import asyncio
 import os
-import time
 import uuid
 import json
-from typing import AsyncGenerator, List, Tuple, Any, Optional
+from typing import AsyncGenerator, Callable, List, Tuple, Any, Optional
 from pathlib import Path
 
 from google import genai
@@ -10,13 +10,39 @@ from google.genai import types
 from starlette.concurrency import run_in_threadpool
 
 from app.core.config import get_settings
+from app.core.deadline import DeadlineExceeded, check_deadline, current_deadline, within_deadline
 from app.core.logging import app_logger
 from app.schemas.chat import ChatStreamResponse
+from app.schemas.common import IndexingState
 from app.schemas.file_search import FileSearchCitation
+from app.services.answer_cache import CachedAnswer, build_answer_cache
+from app.services.chunking import CHUNKING_PROFILES, select_profile
+from app.services.citation_preview import fingerprint
+from app.services.citations import CitationCollector, file_citation_key
+from app.services.local_rag import Passage, build_local_rag, is_local_store
+from app.services.operation_poller import OperationPoller
+from app.services.preprocessing import PreparedDocument, build_preprocessor
+from app.services.store_registry import StoreRegistry
+from app.services.text_extraction import Shard, parse_shard_title, remove_shards, shard_document, shard_pages
+from app.services.usage_service import UsageMeter
 
 # --- Let's Get the Service Settings --- 
 settings = get_settings()
 
+# --- Every store we create is named with this prefix (orphan sweep scope) ---
+STORE_DISPLAY_PREFIX = "warm-ai-"
+
+# --- Fallback chunking; each upload's profile comes from `select_profile` ---
+CHUNKING_CONFIG = CHUNKING_PROFILES["default"].config
+
+
+def chunking_key(config: dict) -> str:
+    """
+        Stable identifier for a chunking config (e.g. "ws:300:30").
+    """
+    ws = config["white_space_config"]
+    return f"ws:{ws['max_tokens_per_chunk']}:{ws['max_overlap_tokens']}"
+
 
 class FileSearchService:
     """
@@ -33,11 +59,186 @@ class FileSearchService:
             If the document does not contain the answer, say you cannot find it in the file.
             Be concise, professional, and helpful.
         """
+        # --- Final answers per (store, normalized query, model) ---
+        self.answer_cache = build_answer_cache()
+        # --- Offline retrieval backend (FILE_SEARCH_BACKEND=local) ---
+        self.local_rag = build_local_rag(CHUNKING_CONFIG)
+        # --- Large PDFs/DOCX are uploaded as their cleaned text (process pool) ---
+        self.preprocessor = build_preprocessor()
+        # --- One asyncio sweep polls every pending indexing operation ---
+        self.operation_poller = OperationPoller(
+            lambda op: self.client.aio.operations.get(op),
+            initial_delay=settings.FILE_SEARCH_POLL_INITIAL_S,
+            max_delay=settings.FILE_SEARCH_POLL_MAX_S,
+            sweep_interval=settings.FILE_SEARCH_POLL_SWEEP_S
+        )
+
+    async def create_store(self) -> str:
+        """
+            Creates an empty FileSearchStore and returns its name.
+        """
+        check_deadline("file_search_create_store")
+        if self.local_rag is not None:
+            return await self.local_rag.create_store()
+        store_display_name = f"{STORE_DISPLAY_PREFIX}{uuid.uuid4().hex[:10]}"
+        store = await within_deadline(
+            self.client.aio.file_search_stores.create(
+                config={"display_name": store_display_name}
+            ),
+            "file_search_create_store"
+        )
+        app_logger.info(f"Created store: {store.name}")
+        return store.name
+
+    async def upload_to_store(
+        self,
+        store_name: str,
+        file_path: str,
+        display_name: str,
+        on_state: Optional[Callable[[IndexingState], None]] = None,
+        chunking: Optional[dict] = None,
+        on_prepared: Optional[Callable[[Optional[List[str]]], None]] = None
+    ) -> str:
+        """
+        Uploads one file into an existing store and waits until it is indexed.
+
+        Large PDFs/DOCX are first replaced by their text with running
+        headers, footers and page numbers stripped. Large text-extractable
+        documents are split locally into page-range shards that are uploaded
+        and indexed concurrently, so indexing time scales with the shard size
+        rather than the whole document. Chunking follows the file's profile
+        (MIME type and size).
+
+        Args:
+            store_name: Target FileSearchStore
+            file_path: Path to the file to upload
+            display_name: Display name for the file
+            on_state: Optional progress callback (uploading, indexing)
+            chunking: Optional chunking config overriding the file's profile
+            on_prepared: Optional callback with the pages uploaded as cleaned
+                text, or None when the file itself is uploaded
+
+        Returns:
+            The file's display name
+        """
+        report = on_state or (lambda _state: None)
+        if chunking is None:
+            chunking = select_profile(display_name, os.path.getsize(file_path)).config
+
+        # --- The store's contents change: cached answers no longer hold ---
+        self._invalidate_answers(store_name)
+
+        if is_local_store(store_name):
+            if self.local_rag is None:
+                raise RuntimeError(f"Local store {store_name} can't be indexed: local backend is disabled")
+            if on_prepared is not None:
+                on_prepared(None)
+            report(IndexingState.INDEXING)
+            await self.local_rag.add_document(store_name, file_path, display_name, chunking)
+            self._invalidate_answers(store_name)
+            app_logger.info(f"File indexed locally: {display_name}")
+            return display_name
+
+        prepared = None
+        if self.preprocessor is not None:
+            prepared = await self.preprocessor.prepare(file_path, display_name)
+        if on_prepared is not None:
+            on_prepared(prepared.pages if prepared is not None else None)
+        try:
+            return await self._upload_document(store_name, file_path, display_name, report, chunking, prepared)
+        finally:
+            if prepared is not None:
+                prepared.remove()
+
+    async def _upload_document(
+        self,
+        store_name: str,
+        file_path: str,
+        display_name: str,
+        report: Callable[[IndexingState], None],
+        chunking: dict,
+        prepared: Optional[PreparedDocument]
+    ) -> str:
+        shards = None
+        if settings.FILE_SEARCH_SHARDING_ENABLED:
+            if prepared is None:
+                shards = await run_in_threadpool(
+                    shard_document,
+                    file_path,
+                    display_name,
+                    pages_per_shard=settings.FILE_SEARCH_SHARD_PAGES,
+                    min_pages=settings.FILE_SEARCH_SHARD_MIN_PAGES,
+                    text_shard_bytes=settings.FILE_SEARCH_SHARD_TEXT_BYTES
+                )
+            elif len(prepared.pages) >= settings.FILE_SEARCH_SHARD_MIN_PAGES:
+                # --- Already extracted: shard the cleaned pages, keeping page ranges ---
+                shards = await run_in_threadpool(
+                    shard_pages, prepared.pages, display_name, settings.FILE_SEARCH_SHARD_PAGES
+                )
+        if not shards:
+            upload_path = prepared.path if prepared is not None else file_path
+            await self._upload_one(store_name, upload_path, display_name, report, chunking)
+            return display_name
+
+        app_logger.info(f"Indexing {display_name} as {len(shards)} shards")
+        slots = asyncio.Semaphore(max(1, settings.FILE_SEARCH_SHARD_CONCURRENCY))
+        indexing = 0
+
+        def shard_state(state: IndexingState) -> None:
+            # --- The file is "indexing" once every shard has been uploaded ---
+            nonlocal indexing
+            if state == IndexingState.INDEXING:
+                indexing += 1
+                if indexing == len(shards):
+                    report(IndexingState.INDEXING)
+
+        async def upload_shard(shard: Shard) -> None:
+            async with slots:
+                await self._upload_one(store_name, shard.path, shard.display_name, shard_state, chunking)
+
+        report(IndexingState.UPLOADING)
+        try:
+            await asyncio.gather(*(upload_shard(shard) for shard in shards))
+        finally:
+            remove_shards(shards)
+        return display_name
+
+    async def _upload_one(
+        self,
+        store_name: str,
+        file_path: str,
+        display_name: str,
+        report: Callable[[IndexingState], None],
+        chunking: dict
+    ) -> None:
+        report(IndexingState.UPLOADING)
+        operation = await within_deadline(
+            self.client.aio.file_search_stores.upload_to_file_search_store(
+                file=file_path,
+                file_search_store_name=store_name,
+                config={
+                    "display_name": display_name,
+                    "chunking_config": chunking
+                }
+            ),
+            "file_search_upload"
+        )
+
+        # --- Poll operation until complete (no thread held while waiting) ---
+        report(IndexingState.INDEXING)
+        final_op = await self._poll_operation(operation)
+        if getattr(final_op, "error", None):
+            raise RuntimeError(f"Indexing failed: {final_op.error}")
+        # --- Again once indexed: answers cached mid-indexing saw partial contents ---
+        self._invalidate_answers(store_name)
+        app_logger.info(f"File indexed successfully: {display_name}")
 
     async def create_store_and_upload(
         self, 
         file_path: str, 
-        display_name: str
+        display_name: str,
+        on_state: Optional[Callable[[IndexingState], None]] = None,
+        on_prepared: Optional[Callable[[Optional[List[str]]], None]] = None
     ) -> Tuple[str, str]:
         """
         Creates a FileSearchStore and uploads file to it.
@@ -45,6 +246,8 @@ class FileSearchService:
         Args:
             file_path: Path to the file to upload
             display_name: Display name for the file
+            on_state: Optional progress callback (uploading, indexing)
+            on_prepared: Optional callback with the pages actually uploaded
             
         Returns:
             Tuple of (store_name, file_name)
@@ -53,62 +256,93 @@ class FileSearchService:
             Exception: If upload or indexing fails
         """
         app_logger.info(f"Creating File Search Store and uploading: {display_name}")
+        store_name = None
         
         try:
-            # --- First We need Create File Search Store ---
-            store_display_name = f"warm-ai-{uuid.uuid4().hex[:10]}"
-            
-            def _create_store():
-                return self.client.file_search_stores.create(
-                    config={"display_name": store_display_name}
-                )
-            
-            store = await run_in_threadpool(_create_store)
-            app_logger.info(f"Created store: {store.name}")
-            
-            # --- Second We need Upload file to store with chunking config ---
-            chunking_config = {
-                "white_space_config": {
-                    "max_tokens_per_chunk": 300,
-                    "max_overlap_tokens": 30
-                }
-            }
-            
-            def _upload_file():
-                return self.client.file_search_stores.upload_to_file_search_store(
-                    file=file_path,
-                    file_search_store_name=store.name,
-                    config={
-                        "display_name": display_name,
-                        "chunking_config": chunking_config
-                    }
-                )
-            
-            operation = await run_in_threadpool(_upload_file)
-            
-            # --- Third We need Poll operation until complete ---
-            def _poll_operation():
-                op = operation
-                start_time = time.time()
-                timeout = 600  # 10 minutes
-                
-                while not getattr(op, "done", False):
-                    if time.time() - start_time > timeout:
-                        raise TimeoutError("File indexing timeout")
-                    time.sleep(2)
-                    op = self.client.operations.get(op)
-                
-                return op
-            
-            final_op = await run_in_threadpool(_poll_operation)
-            app_logger.info(f"File indexed successfully: {display_name}")
-            
-            return store.name, display_name
+            store_name = await self.create_store()
+            file_name = await self.upload_to_store(
+                store_name, file_path, display_name, on_state, on_prepared=on_prepared
+            )
+            return store_name, file_name
             
         except Exception as e:
             app_logger.error(f"Error in create_store_and_upload: {str(e)}")
+            if store_name is not None:
+                await self.delete_store(store_name)
             raise
 
+    async def _poll_operation(self, operation: Any) -> Any:
+        """
+            Waits on the shared poller for an upload operation, bounded by the
+            current deadline (hard cap: 10 minutes).
+        """
+        deadline = current_deadline()
+        timeout = deadline.timeout(600) if deadline is not None else 600
+        try:
+            return await self.operation_poller.wait(operation, timeout)
+        except asyncio.TimeoutError:
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded("file_search_indexing") from None
+            raise TimeoutError("File indexing timeout") from None
+
+    async def upload_or_reuse(
+        self,
+        registry: StoreRegistry,
+        file_path: str,
+        display_name: str,
+        content_hash: str,
+        size_bytes: int,
+        slots: Optional[asyncio.Semaphore] = None,
+        on_state: Optional[Callable[[IndexingState], None]] = None,
+        on_prepared: Optional[Callable[[Optional[List[str]]], None]] = None
+    ) -> Tuple[str, str, bool]:
+        """
+        Returns an indexed store for this content, indexing only on a miss.
+
+        Identical content (same sha256 and chunking profile) already indexed
+        by any session is attached by reference instead of re-uploaded; only
+        the indexing path waits for one of the `slots`. A reused store is still
+        reported under this caller's `display_name`, never the first uploader's.
+        `on_prepared` is only called when the content is actually uploaded.
+
+        Returns:
+            Tuple of (store_name, file_name, reused)
+        """
+        key = chunking_key(select_profile(display_name, size_bytes).config)
+        if self.local_rag is not None:
+            # --- Local indexes are never interchangeable with upstream stores ---
+            key = f"local:{key}"
+        existing = await registry.acquire(content_hash, key)
+        if existing is not None:
+            app_logger.info(f"Reusing indexed store {existing.store_name} for {display_name}")
+            return existing.store_name, display_name, True
+
+        if slots is not None:
+            async with slots:
+                store_name, file_name = await self.create_store_and_upload(file_path, display_name, on_state, on_prepared)
+        else:
+            store_name, file_name = await self.create_store_and_upload(file_path, display_name, on_state, on_prepared)
+        if await registry.register(content_hash, key, store_name, file_name, size_bytes) is not None:
+            return store_name, file_name, False
+
+        # --- Lost a race with a concurrent upload of the same content: use theirs ---
+        existing = await registry.acquire(content_hash, key)
+        if existing is None:
+            app_logger.warning(f"Store {store_name} left unregistered after dedup race")
+            return store_name, file_name, False
+        await self.delete_store(store_name)
+        return existing.store_name, display_name, True
+
+    async def release_store(self, registry: StoreRegistry, store_name: str) -> bool:
+        """
+            Drops a session's reference; deletes the store once nothing uses it.
+        """
+        if not await registry.release(store_name):
+            app_logger.info(f"Store {store_name} still referenced; kept")
+            return False
+        await self.delete_store(store_name)
+        return True
+
     async def chat_with_file(
         self, 
         store_name: str, 
@@ -127,60 +361,106 @@ class FileSearchService:
             ChatStreamResponse chunks (tokens, citations, done, error)
         """
         app_logger.info(f"File Search Query | Store: {store_name}")
-        
+
+        generation = None
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(store_name, query, model)
+            if cached is not None:
+                app_logger.info(f"Answer cache hit | Store: {store_name}")
+                async for event in self._replay(cached, model):
+                    yield event
+                return
+            generation = self.answer_cache.generation(store_name)
+
+        if is_local_store(store_name) and self.local_rag is None:
+            app_logger.warning(f"Local store {store_name} not searched: local backend is disabled")
+            yield ChatStreamResponse(
+                type="error",
+                content="This document is no longer available. Please upload it again."
+            )
+            return
+
         try:
-            # --- Configure File Search tool ---
-            config = types.GenerateContentConfig(
-                system_instruction=self.system_instruction,
-                temperature=0.2,
-                tools=[
-                    types.Tool(
-                        file_search=types.FileSearch(
-                            file_search_store_names=[store_name]
+            passages = None
+            contents = query
+            if is_local_store(store_name):
+                # --- Local retrieval (milliseconds), then answer from the passages ---
+                passages = await self.local_rag.search(store_name, query)
+                contents = self._local_prompt(query, passages)
+                config = types.GenerateContentConfig(
+                    system_instruction=self.system_instruction,
+                    temperature=0.2
+                )
+            else:
+                # --- Configure File Search tool ---
+                config = types.GenerateContentConfig(
+                    system_instruction=self.system_instruction,
+                    temperature=0.2,
+                    tools=[
+                        types.Tool(
+                            file_search=types.FileSearch(
+                                file_search_store_names=[store_name]
+                            )
                         )
-                    )
-                ]
-            )
-            
+                    ]
+                )
+
             # --- Stream response ---
-            response_stream = await self.client.aio.models.generate_content_stream(
-                model=model,
-                contents=query,
-                config=config
+            meter = UsageMeter(model)
+            response_stream = await within_deadline(
+                self.client.aio.models.generate_content_stream(
+                    model=model,
+                    contents=contents,
+                    config=config
+                ),
+                "file_search_stream"
             )
+            deadline = current_deadline()
+            if deadline is not None:
+                response_stream = deadline.bound_stream(response_stream, "file_search_stream")
             
-            # --- Stream tokens ---
-            last_chunk = None
+            # --- Stream tokens and any newly grounded sources per chunk ---
+            collector = CitationCollector(self._extract_file_citations, file_citation_key)
+            answer = ""
+            cited: List[dict] = []
             async for chunk in response_stream:
-                last_chunk = chunk
+                meter.observe(chunk)
                 if chunk.text:
+                    answer += chunk.text
                     yield ChatStreamResponse(
                         type="token",
                         content=chunk.text
                     )
-            
-            # --- Extract and yield citations ---
-            if last_chunk is not None and last_chunk.candidates:
-                citations = self._extract_file_citations(last_chunk.candidates[0])
-                if citations:
+                new_citations = collector.collect(chunk)
+                if new_citations:
                     # Convert FileSearchCitation to dict for JSON serialization
-                    citations_dict = [
-                        {
-                            "source_title": c.source_title,
-                            "text_segment": c.text_segment,
-                            "start_index": c.start_index,
-                            "end_index": c.end_index
-                        }
-                        for c in citations
-                    ]
+                    cited.extend(c.model_dump() for c in new_citations)
                     yield ChatStreamResponse(
                         type="file_citation",
-                        content=json.dumps(citations_dict) 
+                        content=json.dumps([c.model_dump() for c in new_citations])
                     )
             
-            # Signal completion
-            yield ChatStreamResponse(type="done")
+            if passages:
+                cited.extend(p.citation().model_dump() for p in passages)
+                yield ChatStreamResponse(
+                    type="file_citation",
+                    content=json.dumps([p.citation().model_dump() for p in passages])
+                )
+
+            # --- Cache before "done": consumers may stop reading after it ---
+            if generation is not None and answer:
+                self.answer_cache.put(store_name, query, model, answer, cited, generation)
+
+            # Signal completion (with token & latency accounting)
+            yield ChatStreamResponse(type="done", usage=meter.stats())
             
+        except DeadlineExceeded as e:
+            app_logger.warning(f"File Search Deadline: {str(e)}")
+            yield ChatStreamResponse(
+                type="error",
+                content="The request timed out before the document search finished."
+            )
+
         except Exception as e:
             app_logger.error(f"File Search Error: {str(e)}")
             yield ChatStreamResponse(
@@ -226,20 +506,26 @@ class FileSearchService:
                 # --- Get source title from chunks ---
                 indices = getattr(support, 'grounding_chunk_indices', [])
                 source_title = "Document"
+                page_range = None
+                chunk_id = None
                 
                 for idx in indices:
                     if idx < len(chunks):
                         chunk = chunks[idx]
                         ctx = getattr(chunk, 'retrieved_context', None)
                         if ctx:
-                            source_title = getattr(ctx, 'title', 'Document')
+                            # --- Shards map back to the original file and page range ---
+                            source_title, page_range = parse_shard_title(getattr(ctx, 'title', 'Document'))
+                            chunk_id = fingerprint(getattr(ctx, 'text', None) or "")
                             break
                 
                 citations.append(FileSearchCitation(
                     source_title=source_title,
                     text_segment=segment_text,
                     start_index=start_idx,
-                    end_index=end_idx
+                    end_index=end_idx,
+                    page_range=page_range,
+                    chunk_id=chunk_id
                 ))
             
         except Exception as e:
@@ -247,13 +533,66 @@ class FileSearchService:
         
         return citations
 
-    async def delete_store(self, store_name: str) -> None:
+    def _invalidate_answers(self, store_name: str) -> None:
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate(store_name)
+
+    @staticmethod
+    async def _replay(cached: CachedAnswer, model: str) -> AsyncGenerator[ChatStreamResponse, None]:
+        """
+            Streams a cached answer with the same event sequence as a live one.
+        """
+        meter = UsageMeter(model)
+        meter.observe(None)
+        yield ChatStreamResponse(type="token", content=cached.text)
+        if cached.citations:
+            yield ChatStreamResponse(type="file_citation", content=json.dumps(cached.citations))
+        # --- No upstream call: nothing billed ---
+        usage = meter.stats().model_copy(update={"input_tokens": 0, "output_tokens": 0, "cached_tokens": 0})
+        yield ChatStreamResponse(type="done", usage=usage)
+
+    @staticmethod
+    def _local_prompt(query: str, passages: List[Passage]) -> str:
+        """
+            Question plus retrieved passages, numbered, for local-backend stores.
+        """
+        context = "\n\n".join(
+            f"[{i}] {p.title}{f' ({p.page_range})' if p.page_range else ''}:\n{p.text}"
+            for i, p in enumerate(passages, 1)
+        )
+        return f"Document context:\n{context or '(no matching passages)'}\n\nQuestion: {query}"
+
+    async def list_stores(self) -> List[Any]:
+        """
+            Every FileSearchStore this app created (display name "warm-ai-*").
+        """
+        if self.local_rag is not None:
+            return self.local_rag.list_stores()
+        stores = []
+        pager = await within_deadline(self.client.aio.file_search_stores.list(), "file_search_list_stores")
+        async for store in pager:
+            if (getattr(store, "display_name", None) or "").startswith(STORE_DISPLAY_PREFIX):
+                stores.append(store)
+        return stores
+
+    async def delete_store(self, store_name: str) -> bool:
         """
         Delete a FileSearchStore to cleanup resources.
         
         Args:
             store_name: Name of the store to delete
+
+        Returns:
+            False when the delete failed (the orphan sweep retries it later)
         """
+        self._invalidate_answers(store_name)
+        if is_local_store(store_name):
+            if self.local_rag is None:
+                app_logger.warning(f"Local store {store_name} kept: local backend is disabled")
+                return False
+            await self.local_rag.delete_store(store_name)
+            return True
+
         try:
             app_logger.info(f"Deleting File Search Store: {store_name}")
             
@@ -265,7 +604,8 @@ class FileSearchService:
             
             await run_in_threadpool(_delete)
             app_logger.info(f"Store deleted: {store_name}")
+            return True
             
         except Exception as e:
             app_logger.error(f"Error deleting store: {str(e)}")
-    
\ No newline at end of file
+            return False
@@ -0,0 +1,71 @@
+from collections import deque
+from typing import Deque, Optional
+
+from app.core.metrics import LatencyTracker
+
+
+class HedgePolicy:
+    """
+    Decides when a second, identical upstream request should be fired.
+
+    - Threshold: rolling percentile of time-to-first-token for the model,
+      clamped to a minimum delay. No hedging until enough samples exist.
+    - Budget: the share of hedged requests over the last `window_size`
+      requests never exceeds `max_ratio`.
+    """
+
+    def __init__(
+        self,
+        tracker: LatencyTracker,
+        percentile: float = 95.0,
+        max_ratio: float = 0.05,
+        min_samples: int = 20,
+        min_delay: float = 0.25,
+        window_size: int = 500,
+    ):
+        self.tracker = tracker
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._decisions: Deque[bool] = deque(maxlen=window_size)
+        self._hedged_in_window = 0
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """
+            Seconds to wait for the first chunk before hedging, or None to never hedge.
+        """
+        if self.tracker.count(model) < self.min_samples:
+            return None
+        threshold = self.tracker.percentile(model, self.percentile)
+        if threshold is None:
+            return None
+        return max(threshold, self.min_delay)
+
+    def _push(self, hedged: bool) -> None:
+        if len(self._decisions) == self._decisions.maxlen and self._decisions[0]:
+            self._hedged_in_window -= 1
+        self._decisions.append(hedged)
+        if hedged:
+            self._hedged_in_window += 1
+
+    def record_request(self) -> None:
+        """
+            Registers a request that was not hedged.
+        """
+        self._push(False)
+
+    def try_hedge(self) -> bool:
+        """
+            Consumes hedge budget if available; registers the request either way.
+        """
+        total = len(self._decisions) + 1
+        allowed = (self._hedged_in_window + 1) / total <= self.max_ratio
+        self._push(allowed)
+        return allowed
+
+    @property
+    def hedged_ratio(self) -> float:
+        if not self._decisions:
+            return 0.0
+        return self._hedged_in_window / len(self._decisions)
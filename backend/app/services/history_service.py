@@ -1,35 +1,207 @@
+import base64
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import Collection, List, Optional, Tuple
+from sqlalchemy import delete, insert, tuple_, update
 from sqlmodel import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from app.db.models import Session, Message
-from app.schemas.common import ChatMode
+from app.core.deadline import check_deadline
+from app.db.models import Session, Message, SessionFile
+from app.schemas.chat import UsageStats
+from app.schemas.common import ChatMode, IndexingState
+
+def encode_cursor(message: Message) -> str:
+    """
+        Opaque keyset cursor for a message: its (created_at, id).
+    """
+    raw = f"{message.created_at.isoformat()}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+        Inverse of `encode_cursor`; ValueError for anything malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, message_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+@dataclass
+class MessageWindow:
+    """
+        One keyset page of messages (oldest first) and whether more exist on each side.
+    """
+    messages: List[Message]
+    has_more_before: bool
+    has_more_after: bool
+
+
+# --- Indexing has not finished (or failed) yet in these states ---
+_IN_PROGRESS = [IndexingState.QUEUED.value, IndexingState.UPLOADING.value, IndexingState.INDEXING.value]
+
+# --- Send None as NULL so rows with and without optional fields share one INSERT ---
+_BATCHED = {"render_nulls": True}
+
+
+class HistoryBatch:
+    """
+    Unit of work for one request's history writes.
+
+    Queue an optional new session, its files and any number of messages, then
+    `flush()` once: one transaction, ids from multi-row INSERT ... RETURNING,
+    and the session timestamp bumped with a direct UPDATE. After the flush,
+    `session_id`, `session`, `messages` and `files` hold the stored rows.
+    """
+
+    def __init__(self, service: "HistoryService", session_id: Optional[int] = None):
+        self._service = service
+        self.session_id = session_id
+        self.session: Optional[Session] = None
+        self.messages: List[Message] = []
+        self.files: List[SessionFile] = []
+        self._new_session: Optional[dict] = None
+        self._pending_messages: List[dict] = []
+        self._pending_files: List[dict] = []
+
+    def create_session(self, title: str, mode: ChatMode, **fields) -> "HistoryBatch":
+        """
+            Queue a new session; extra `fields` are Session columns (e.g. file_name).
+        """
+        self._new_session = {"title": title, "mode": mode, **fields}
+        return self
+
+    def add_message(
+        self,
+        role: str,
+        content: str,
+        sources: Optional[str] = None,
+        usage: Optional[UsageStats] = None,
+        cards: Optional[str] = None
+    ) -> "HistoryBatch":
+        # --- Every row carries the same keys, so all of them go in one INSERT ---
+        self._pending_messages.append({
+            "role": role,
+            "content": content,
+            "sources": sources,
+            "cards": cards,
+            **(usage or UsageStats()).model_dump()
+        })
+        return self
+
+    def add_files(self, files: List[SessionFile]) -> "HistoryBatch":
+        for file in files:
+            self._pending_files.append({
+                "file_name": file.file_name,
+                "content_hash": file.content_hash,
+                "size_bytes": file.size_bytes,
+                "status": file.status,
+                "error": file.error,
+            })
+        return self
+
+    async def flush(self) -> "HistoryBatch":
+        db = self._service.db
+        now = datetime.utcnow()
+        try:
+            if self._new_session is not None:
+                row = {**self._new_session, "created_at": now, "updated_at": now}
+                self.session = (await db.scalars(insert(Session).returning(Session), [row])).one()
+                self.session_id = self.session.id
+            elif self.session_id is not None:
+                # --- Any write marks the session used, so the store reaper leaves it alone ---
+                await db.execute(
+                    update(Session).where(Session.id == self.session_id).values(updated_at=now)
+                )
+            if self._pending_messages:
+                rows = [{**m, "session_id": self.session_id, "created_at": now} for m in self._pending_messages]
+                self.messages = list(await db.scalars(
+                    insert(Message).returning(Message, sort_by_parameter_order=True),
+                    rows,
+                    execution_options=_BATCHED
+                ))
+            if self._pending_files:
+                rows = [{**f, "session_id": self.session_id, "created_at": now, "updated_at": now} for f in self._pending_files]
+                self.files = list(await db.scalars(
+                    insert(SessionFile).returning(SessionFile, sort_by_parameter_order=True),
+                    rows,
+                    execution_options=_BATCHED
+                ))
+            await self._service._commit()
+        except Exception:
+            await db.rollback()
+            raise
+        self._new_session = None
+        self._pending_messages = []
+        self._pending_files = []
+        return self
+
 
 class HistoryService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, deadline_bound: bool = True):
         self.db = db 
+        self.deadline_bound = deadline_bound
+    async def _commit(self) -> None:
+        """
+            Commit unless the request deadline has already passed (only when
+            `deadline_bound`: background jobs always record their results).
+            A commit in flight is never cancelled: that would leave its outcome unknown.
+        """
+        if self.deadline_bound:
+            check_deadline("history_commit")
+        await self.db.commit()
+    def batch(self, session_id: Optional[int] = None) -> HistoryBatch:
+        """
+            Start a unit of work for an existing session, or for a new one queued on it.
+        """
+        return HistoryBatch(self, session_id)
     async def create_session(self , title: str , mode: ChatMode) -> Session:
         """
             Create a new chat/search session . 
         """
-        session = Session(
-            title=title,
-            mode=mode,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        self.db.add(session)
-        await self.db.commit()
-        await self.db.refresh(session)
-        return session
-    async def get_session(self, session_id: int) -> Optional[Session]:
+        batch = await self.batch().create_session(title=title, mode=mode).flush()
+        return batch.session
+    async def get_session(self, session_id: int, include_messages: bool = True) -> Optional[Session]:
         """
-            Fetch session by ID with messages
+            Fetch session by ID, with all its messages unless `include_messages` is False
         """
+        if not include_messages:
+            return await self.db.get(Session, session_id)
         statement = select(Session).where(Session.id == session_id).options(selectinload(Session.messages))
         result = await self.db.execute(statement)
         return result.scalar_one_or_none()
+    async def get_messages(
+        self,
+        session_id: int,
+        limit: int = 50,
+        before: Optional[Tuple[datetime, int]] = None,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> MessageWindow:
+        """
+            Keyset page over (created_at, id): the latest `limit` messages, or the
+            `limit` just before / after a cursor. Cost is independent of session length.
+        """
+        key = tuple_(Message.created_at, Message.id)
+        statement = select(Message).where(Message.session_id == session_id)
+        if after is not None:
+            statement = statement.where(key > tuple_(*after)).order_by(Message.created_at, Message.id)
+        else:
+            if before is not None:
+                statement = statement.where(key < tuple_(*before))
+            statement = statement.order_by(desc(Message.created_at), desc(Message.id))
+        result = await self.db.execute(statement.limit(limit + 1))
+        rows = list(result.scalars().all())
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if after is not None:
+            return MessageWindow(rows, has_more_before=True, has_more_after=more)
+        rows.reverse()
+        return MessageWindow(rows, has_more_before=more, has_more_after=before is not None)
     async def get_user_sessions(self, limit: int = 20, offset: int = 0) -> List[Session]:
         """
             List all sessions ordered by newest first.
@@ -37,26 +209,21 @@ class HistoryService:
         statement = select(Session).order_by(desc(Session.updated_at)).offset(offset).limit(limit)
         result = await self.db.execute(statement)
         return result.scalars().all()
-    async def add_message(self, session_id: int , role:str , content: str , sources: Optional[str] = None) -> Message:
+    async def add_message(
+        self,
+        session_id: int ,
+        role:str ,
+        content: str ,
+        sources: Optional[str] = None,
+        usage: Optional[UsageStats] = None
+    ) -> Message:
         """
-            Add a message to a session 
+            Add a message to a session (with token/latency accounting for assistant turns).
+            One INSERT and one UPDATE of the session timestamp in a single commit; the
+            session's messages are never loaded, so the cost is flat in session length.
         """
-        message = Message(
-            session_id=session_id,
-            role=role,
-            content=content,
-            sources=sources
-        )
-        self.db.add(message)
-        # --- Update session timestamp --- 
-        session = await self.get_session(session_id)
-        if session:
-            session.updated_at = datetime.utcnow()
-            self.db.add(session)
-
-        await self.db.commit()
-        await self.db.refresh(message)
-        return message
+        batch = await self.batch(session_id).add_message(role, content, sources, usage).flush()
+        return batch.messages[0]
     async def delete_session(self, session_id: int ) -> bool:
         """
             Delete a session and its messages. 
@@ -68,12 +235,14 @@ class HistoryService:
         
         for message in messages:
             await self.db.delete(message)
+
+        await self.db.execute(delete(SessionFile).where(SessionFile.session_id == session_id))
         
         # Then delete the session
         session = await self.get_session(session_id)
         if session:
             await self.db.delete(session)
-            await self.db.commit()
+            await self._commit()
             return True 
         return False
 
@@ -81,12 +250,12 @@ class HistoryService:
         """
             Update a session title 
         """
-        session = await self.get_session(session_id)
+        session = await self.db.get(Session, session_id)
         if session:
             session.title = new_title
             session.updated_at = datetime.utcnow()
             self.db.add(session)
-            await self.db.commit()
+            await self._commit()
             await self.db.refresh(session)
             return session 
         return None
@@ -94,21 +263,94 @@ class HistoryService:
     async def update_session_file_search(
         self,
         session_id: int,
-        store_name: str,
+        store_name: Optional[str],
         file_name: Optional[str] = None,
+        status: Optional[IndexingState] = None,
     ) -> Optional[Session]:
         """
-            Attach File Search metadata (store + file name) to an existing session.
+            Attach File Search metadata (store, file name, indexing status) to an existing session.
         """
-        session = await self.get_session(session_id)
+        session = await self.db.get(Session, session_id)
         if session is None:
             return None
 
         session.file_search_store_name = store_name
         session.file_name = file_name
+        if status is not None:
+            session.file_search_status = status.value
         session.updated_at = datetime.utcnow()
         self.db.add(session)
 
-        await self.db.commit()
+        await self._commit()
         await self.db.refresh(session)
-        return session
\ No newline at end of file
+        return session
+
+    async def add_session_files(self, session_id: int, files: List[SessionFile]) -> List[SessionFile]:
+        """
+            Record documents being added to a session's store (one commit).
+        """
+        batch = await self.batch(session_id).add_files(files).flush()
+        return batch.files
+
+    async def get_session_files(self, session_id: int) -> List[SessionFile]:
+        """
+            Documents in a session's store, oldest first.
+        """
+        statement = select(SessionFile).where(SessionFile.session_id == session_id).order_by(SessionFile.id)
+        result = await self.db.execute(statement)
+        return result.scalars().all()
+
+    async def update_session_file(
+        self,
+        file_id: int,
+        status: IndexingState,
+        error: Optional[str] = None
+    ) -> Optional[SessionFile]:
+        """
+            Record one document's indexing outcome.
+        """
+        file = await self.db.get(SessionFile, file_id)
+        if file is None:
+            return None
+        file.status = status.value
+        file.error = error
+        file.updated_at = datetime.utcnow()
+        self.db.add(file)
+        await self._commit()
+        return file
+
+    async def fail_interrupted_indexing(self, session_id: int, file_ids: List[int], error: str) -> None:
+        """
+            Marks a job's session and files FAILED where they are still in progress.
+        """
+        await self._fail_indexing(Session.id == session_id, SessionFile.id.in_(file_ids), error)
+
+    async def fail_stale_indexing(self, stale_before: datetime, live_session_ids: Collection[int], error: str) -> int:
+        """
+            Marks sessions and files FAILED that have been in progress since
+            before `stale_before` with no live job; returns the sessions failed.
+        """
+        return await self._fail_indexing(
+            (Session.updated_at < stale_before) & Session.id.not_in(live_session_ids),
+            (SessionFile.updated_at < stale_before) & SessionFile.session_id.not_in(live_session_ids),
+            error
+        )
+
+    async def _fail_indexing(self, session_filter, file_filter, error: str) -> int:
+        now = datetime.utcnow()
+        result = await self.db.execute(
+            update(Session)
+            .where(Session.file_search_status.in_(_IN_PROGRESS))
+            .where(session_filter)
+            .values(file_search_status=IndexingState.FAILED.value)
+            .returning(Session.id)
+        )
+        session_ids = list(result.scalars().all())
+        await self.db.execute(
+            update(SessionFile)
+            .where(SessionFile.status.in_(_IN_PROGRESS))
+            .where(file_filter)
+            .values(status=IndexingState.FAILED.value, error=error, updated_at=now)
+        )
+        await self._commit()
+        return len(session_ids)
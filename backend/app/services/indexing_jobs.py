@@ -0,0 +1,443 @@
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.deadline import Deadline, DeadlineExceeded, set_current_deadline
+from app.core.logging import app_logger
+from app.schemas.common import IndexingState
+from app.schemas.file_search import IndexingFileStatus, IndexingJobStatus
+from app.services.citation_preview import CitationPreviewIndex
+from app.services.file_search_service import FileSearchService
+from app.services.history_service import HistoryService
+from app.services.store_registry import StoreRegistry
+
+settings = get_settings()
+
+_TERMINAL = (IndexingState.READY, IndexingState.FAILED)
+
+# --- Finished jobs stay queryable this long (seconds) ---
+JOB_RETENTION_S = 3600
+
+# --- Rows in progress this long past the job timeout have no live job on any worker ---
+JOB_GRACE_S = 60
+RECOVERY_INTERVAL_S = 300
+INTERRUPTED = "Indexing was interrupted."
+
+
+@dataclass
+class IndexedFile:
+    """
+        One spooled document in a job; `record_id` is its SessionFile row.
+    """
+    file_name: str
+    file_path: str
+    content_hash: str
+    size_bytes: int
+    record_id: Optional[int] = None
+    state: IndexingState = IndexingState.QUEUED
+    error: Optional[str] = None
+
+    def status(self) -> IndexingFileStatus:
+        return IndexingFileStatus(file_name=self.file_name, state=self.state, error=self.error)
+
+
+@dataclass
+class IndexingJob:
+    """
+        In-process state of one background indexing run (one or many files).
+    """
+    id: str
+    session_id: int
+    files: List[IndexedFile]
+    store_name: Optional[str] = None
+    state: IndexingState = IndexingState.QUEUED
+    reused: bool = False
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[float] = None
+    # --- Replaced on every change; watchers wait on the one they saw ---
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+    previews: List[asyncio.Task] = field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        return self.state in _TERMINAL
+
+    @property
+    def file_name(self) -> str:
+        if len(self.files) == 1:
+            return self.files[0].file_name
+        return f"{len(self.files)} files"
+
+    def status(self) -> IndexingJobStatus:
+        return IndexingJobStatus(
+            job_id=self.id,
+            session_id=self.session_id,
+            file_name=self.file_name,
+            state=self.state,
+            store_name=self.store_name,
+            reused=self.reused,
+            error=self.error,
+            files=[f.status() for f in self.files],
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+
+class IndexingJobManager:
+    """
+    Runs file indexing in the background so uploads can return 202 at once.
+
+    - A single file for a new session goes through content-addressed
+      dedup (`upload_or_reuse`).
+    - Batches, and files added to an existing store, are uploaded with at
+      most `upload_concurrency` in flight; each file succeeds or fails on
+      its own and is tracked in its SessionFile row.
+    - Across all jobs at most `indexing_concurrency` uploads run at once.
+      Others queue without limit (bounded only by the job timeout) rather
+      than fail, and never take the request-facing file-search admission.
+
+    Each job owns its spooled temp files and its own DB session. Progress is
+    mirrored to `Session.file_search_status`, so chat can refuse with
+    "still indexing" even from another worker. A job that is cancelled or
+    can't record its result marks its rows FAILED from a fresh DB session;
+    rows left in progress by a dead worker are failed by `recover`, which
+    runs on start and every RECOVERY_INTERVAL_S.
+    """
+
+    def __init__(
+        self,
+        file_search: FileSearchService,
+        session_factory: Callable[[], AsyncContextManager[AsyncSession]],
+        timeout_s: float = settings.REQUEST_DEADLINE_FILE_UPLOAD_S,
+        upload_concurrency: int = settings.FILE_SEARCH_UPLOAD_CONCURRENCY,
+        indexing_concurrency: int = settings.FILE_SEARCH_INDEXING_CONCURRENCY,
+        previews: Optional[CitationPreviewIndex] = None
+    ):
+        self.file_search = file_search
+        self.session_factory = session_factory
+        self.timeout_s = timeout_s
+        self.upload_concurrency = max(1, upload_concurrency)
+        # --- Its own limit, not the chat-facing admission: a job already got its 202, so it waits ---
+        self._indexing = asyncio.Semaphore(max(1, indexing_concurrency))
+        self.previews = previews
+        self._jobs: Dict[str, IndexingJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._recording: Set[asyncio.Task] = set()
+        self._recovery: Optional[asyncio.Task] = None
+
+    def get(self, job_id: str) -> Optional[IndexingJob]:
+        return self._jobs.get(job_id)
+
+    def submit(
+        self,
+        session_id: int,
+        files: List[IndexedFile],
+        store_name: Optional[str] = None
+    ) -> IndexingJob:
+        """
+            Starts indexing `files` for `session_id`, into `store_name` when the
+            session already has a store. The job deletes the temp files when done.
+        """
+        self._prune()
+        job = IndexingJob(id=uuid.uuid4().hex, session_id=session_id, files=files, store_name=store_name)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _t: self._tasks.pop(job.id, None))
+        return job
+
+    async def watch(self, job: IndexingJob) -> AsyncIterator[IndexingJobStatus]:
+        """
+            Yields the current status, then every change until the job finishes.
+        """
+        while True:
+            changed = job.changed
+            yield job.status()
+            if job.done:
+                return
+            await changed.wait()
+
+    def start(self) -> None:
+        if self._recovery is None or self._recovery.done():
+            self._recovery = asyncio.create_task(self._recover_loop())
+
+    async def close(self) -> None:
+        tasks = list(self._tasks.values())
+        if self._recovery is not None:
+            tasks.append(self._recovery)
+            self._recovery = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # --- Let interrupted jobs finish writing their FAILED state ---
+        await asyncio.gather(*self._recording, return_exceptions=True)
+
+    async def recover(self) -> int:
+        """
+            Fails sessions and files stuck in progress with no live job (the
+            worker running it died); returns the sessions repaired.
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=self.timeout_s + JOB_GRACE_S)
+        live = {job.session_id for job in self._jobs.values() if not job.done}
+        async with self.session_factory() as db:
+            repaired = await HistoryService(db).fail_stale_indexing(stale_before, live, INTERRUPTED)
+        if repaired:
+            app_logger.warning(f"Marked {repaired} interrupted indexing session(s) as failed")
+        return repaired
+
+    # --- State changes ---
+    def _notify(self, job: IndexingJob) -> None:
+        job.updated_at = datetime.utcnow()
+        changed, job.changed = job.changed, asyncio.Event()
+        changed.set()
+
+    def _set_file(self, job: IndexingJob, file: IndexedFile, state: IndexingState, error: Optional[str] = None) -> None:
+        file.state = state
+        file.error = error
+        if not job.done:
+            active = [f.state for f in job.files if f.state not in _TERMINAL]
+            if any(s in (IndexingState.QUEUED, IndexingState.UPLOADING) for s in active):
+                job.state = IndexingState.UPLOADING
+            elif active:
+                job.state = IndexingState.INDEXING
+        self._notify(job)
+
+    def _finish(self, job: IndexingJob, state: IndexingState, **fields) -> None:
+        job.state = state
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.finished_at = time.monotonic()
+        self._notify(job)
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - JOB_RETENTION_S
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            self._jobs.pop(job_id, None)
+
+    # --- Runs ---
+    async def _run(self, job: IndexingJob) -> None:
+        # --- A fresh budget: the upload request's deadline ended with its 202 ---
+        set_current_deadline(Deadline(self.timeout_s))
+        try:
+            async with self.session_factory() as db:
+                # --- The deadline bounds the uploads; their results are always recorded ---
+                history = HistoryService(db, deadline_bound=False)
+                if job.store_name is None and len(job.files) == 1:
+                    await self._run_single(job, history, StoreRegistry(db, deadline_bound=False))
+                else:
+                    await self._run_batch(job, history)
+        except asyncio.CancelledError:
+            self._finish(job, IndexingState.FAILED, error=INTERRUPTED)
+            await self._record_interrupted(job, INTERRUPTED)
+            raise
+        except Exception as e:
+            app_logger.error(f"Indexing job {job.id} could not record its result: {str(e)}")
+            self._finish(job, IndexingState.FAILED, error="Failed to record indexing result.")
+            await self._record_interrupted(job, "Failed to record indexing result.")
+        finally:
+            await asyncio.gather(*job.previews, return_exceptions=True)
+            for file in job.files:
+                if os.path.exists(file.file_path):
+                    os.unlink(file.file_path)
+
+    async def _run_single(self, job: IndexingJob, history: HistoryService, registry: StoreRegistry) -> None:
+        file = job.files[0]
+        try:
+            store_name, file_name, reused = await self.file_search.upload_or_reuse(
+                registry,
+                file_path=file.file_path,
+                display_name=file.file_name,
+                content_hash=file.content_hash,
+                size_bytes=file.size_bytes,
+                slots=self._indexing,
+                on_state=lambda state: self._set_file(job, file, state),
+                on_prepared=self._preview_builder(job, file)
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            app_logger.error(f"Indexing job {job.id} failed: {str(e)}")
+            self._set_file(job, file, IndexingState.FAILED, self._describe(e))
+            await self._record_file(history, file)
+            await history.update_session_file_search(
+                session_id=job.session_id,
+                store_name=None,
+                file_name=file.file_name,
+                status=IndexingState.FAILED
+            )
+            self._finish(job, IndexingState.FAILED, error=file.error)
+            return
+
+        self._set_file(job, file, IndexingState.READY)
+        try:
+            await self._record_file(history, file)
+            session = await history.update_session_file_search(
+                session_id=job.session_id,
+                store_name=store_name,
+                file_name=file_name,
+                status=IndexingState.READY
+            )
+        except Exception:
+            # --- The reference is taken but the session never got the store: give it back ---
+            await registry.db.rollback()
+            await self.file_search.release_store(registry, store_name)
+            raise
+        if session is None:
+            # --- Session deleted while indexing: don't leak the reference ---
+            await self.file_search.release_store(registry, store_name)
+        self._finish(job, IndexingState.READY, store_name=store_name, reused=reused)
+        app_logger.info(f"Indexing job {job.id} ready | Store: {store_name} | Reused: {reused}")
+
+    async def _run_batch(self, job: IndexingJob, history: HistoryService) -> None:
+        new_store = job.store_name is None
+        if new_store:
+            try:
+                store_name = await self.file_search.create_store()
+            except Exception as e:
+                app_logger.error(f"Indexing job {job.id} could not create a store: {str(e)}")
+                for file in job.files:
+                    self._set_file(job, file, IndexingState.FAILED, self._describe(e))
+                    await self._record_file(history, file)
+                await history.update_session_file_search(
+                    session_id=job.session_id,
+                    store_name=None,
+                    file_name=job.file_name,
+                    status=IndexingState.FAILED
+                )
+                self._finish(job, IndexingState.FAILED, error=self._describe(e))
+                return
+            # --- Attach the store right away so deleting the session cleans it up ---
+            session = await history.update_session_file_search(
+                session_id=job.session_id,
+                store_name=store_name,
+                file_name=job.file_name,
+                status=IndexingState.INDEXING
+            )
+            if session is None:
+                await self.file_search.delete_store(store_name)
+                self._finish(job, IndexingState.FAILED, error="Session was deleted.")
+                return
+            job.store_name = store_name
+
+        # --- One AsyncSession per job: serialise the per-file DB writes ---
+        db_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(self.upload_concurrency)
+
+        async def index_one(file: IndexedFile) -> None:
+            async with slots:
+                try:
+                    async with self._indexing:
+                        await self._upload(job, file)
+                    self._set_file(job, file, IndexingState.READY)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    app_logger.error(f"Indexing job {job.id} | {file.file_name} failed: {str(e)}")
+                    self._set_file(job, file, IndexingState.FAILED, self._describe(e))
+            async with db_lock:
+                await self._record_file(history, file)
+
+        await asyncio.gather(*(index_one(file) for file in job.files))
+
+        indexed = sum(1 for f in job.files if f.state == IndexingState.READY)
+        if new_store:
+            if indexed == 0:
+                await self.file_search.delete_store(job.store_name)
+            await history.update_session_file_search(
+                session_id=job.session_id,
+                store_name=job.store_name if indexed else None,
+                file_name=job.file_name,
+                status=IndexingState.READY if indexed else IndexingState.FAILED
+            )
+
+        if indexed:
+            self._finish(job, IndexingState.READY)
+        else:
+            self._finish(job, IndexingState.FAILED, error="No file could be indexed.")
+        app_logger.info(f"Indexing job {job.id} done | Store: {job.store_name} | {indexed}/{len(job.files)} indexed")
+
+    async def _record_interrupted(self, job: IndexingJob, error: str) -> None:
+        """
+            Persists FAILED for a job's rows still in progress, so the session
+            isn't left "still indexing". Shielded: runs to completion even
+            though the job itself is being cancelled.
+        """
+        task = asyncio.create_task(self._fail_rows(job, error))
+        self._recording.add(task)
+        task.add_done_callback(self._recording.discard)
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            pass
+
+    async def _fail_rows(self, job: IndexingJob, error: str) -> None:
+        # --- The job's deadline may be what stopped it; this write must not depend on it ---
+        set_current_deadline(None)
+        file_ids = [f.record_id for f in job.files if f.record_id is not None]
+        try:
+            async with self.session_factory() as db:
+                await HistoryService(db).fail_interrupted_indexing(job.session_id, file_ids, error)
+        except Exception as e:
+            app_logger.error(f"Indexing job {job.id} could not record its failure: {str(e)}")
+
+    async def _recover_loop(self) -> None:
+        while True:
+            try:
+                await self.recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                app_logger.error(f"Indexing recovery pass failed: {str(e)}")
+            await asyncio.sleep(RECOVERY_INTERVAL_S)
+
+    def _preview_builder(self, job: IndexingJob, file: IndexedFile) -> Optional[Callable[[Optional[List[str]]], None]]:
+        """
+            `on_prepared` callback: once the upload settles on what File Search
+            gets (cleaned pages, or None for the file itself), builds the
+            citation preview from exactly that text alongside indexing.
+        """
+        if self.previews is None:
+            return None
+
+        def build(pages: Optional[List[str]]) -> None:
+            job.previews.append(asyncio.create_task(self._build_preview(file, pages)))
+
+        return build
+
+    async def _build_preview(self, file: IndexedFile, pages: Optional[List[str]]) -> None:
+        try:
+            # --- CPU-bound: the preprocessing process pool, not the request threadpool ---
+            await self.file_search.preprocessor.run(
+                self.previews.build, file.content_hash, file.file_path, file.file_name, pages
+            )
+        except Exception as e:
+            app_logger.warning(f"Citation preview for {file.file_name} not built: {str(e)}")
+
+    async def _upload(self, job: IndexingJob, file: IndexedFile) -> None:
+        await self.file_search.upload_to_store(
+            job.store_name,
+            file.file_path,
+            file.file_name,
+            on_state=lambda state: self._set_file(job, file, state),
+            on_prepared=self._preview_builder(job, file)
+        )
+
+    @staticmethod
+    async def _record_file(history: HistoryService, file: IndexedFile) -> None:
+        if file.record_id is not None:
+            await history.update_session_file(file.record_id, file.state, file.error)
+
+    @staticmethod
+    def _describe(error: Exception) -> str:
+        if isinstance(error, (DeadlineExceeded, TimeoutError)):
+            return "Indexing took too long."
+        return "Failed to index file."
@@ -1,10 +1,16 @@
-from typing import AsyncGenerator , List , Optional , Any 
+import asyncio
+import time
+from typing import AsyncGenerator , AsyncIterator , List , Optional , Any , Tuple
 from google import genai 
 from google.genai import types 
 from app.core.config import get_settings 
+from app.core.deadline import DeadlineExceeded, current_deadline
 from app.core.logging import app_logger 
 from app.schemas.common import ChatMode 
 from app.schemas.chat import ChatStreamResponse , SourceCitation    
+from app.services.citations import CitationCollector, web_citation_key
+from app.services.hedging import HedgePolicy, LatencyTracker
+from app.services.usage_service import UsageMeter
 
 
 settings = get_settings()
@@ -18,6 +24,16 @@ class GeminiService:
             Your goal is to provide accurate , career-focused , and data-driven insights 
             Be concise , professional , and helpful 
         """
+        # --- Time-to-first-token tracking drives the hedging threshold ---
+        self.ttft_tracker = LatencyTracker(window_size=settings.GEMINI_HEDGE_WINDOW)
+        self.hedge_policy = HedgePolicy(
+            self.ttft_tracker,
+            percentile=settings.GEMINI_HEDGE_PERCENTILE,
+            max_ratio=settings.GEMINI_HEDGE_MAX_RATIO,
+            min_samples=settings.GEMINI_HEDGE_MIN_SAMPLES,
+            min_delay=settings.GEMINI_HEDGE_MIN_DELAY_MS / 1000,
+            window_size=settings.GEMINI_HEDGE_WINDOW,
+        )
     def _extract_citations(self, candidate: Any ) -> List[SourceCitation]:
         """
             Parses the complex Gemini GroundingMetadata object to extract URLs and Titles . 
@@ -33,15 +49,135 @@ class GeminiService:
                             url=chunk.web.uri or ""
                         ))
         return sources
+    async def _open_stream(
+        self,
+        model: str,
+        contents: Any,
+        config: types.GenerateContentConfig
+    ) -> Tuple[Optional[Any], AsyncIterator[Any], float]:
+        """
+            Opens an upstream stream and waits for its first chunk.
+            Returns (first_chunk, remaining_iterator, ttft_seconds).
+        """
+        started = time.monotonic()
+        response_stream = await self.client.aio.models.generate_content_stream(
+            model=model,
+            contents=contents,
+            config=config
+        )
+        iterator = response_stream.__aiter__()
+        try:
+            first_chunk = await iterator.__anext__()
+        except StopAsyncIteration:
+            first_chunk = None
+        return first_chunk, iterator, time.monotonic() - started
+
+    @staticmethod
+    async def _discard_attempt(task: asyncio.Task) -> None:
+        """
+            Cancels a losing attempt, or closes its stream if it already opened.
+        """
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+            return
+        if task.cancelled() or task.exception() is not None:
+            return
+        _, iterator, _ = task.result()
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except Exception:
+                pass
+
+    async def _generate_stream(
+        self,
+        model: str,
+        contents: Any,
+        config: types.GenerateContentConfig,
+        hedge: bool = False
+    ) -> AsyncGenerator[Any, None]:
+        """
+            Yields raw upstream chunks. With hedging on, a second identical request
+            is fired when the first chunk is slower than the model's rolling TTFT
+            percentile; whichever answers first is streamed and the other cancelled.
+            Only the primary attempt's TTFT feeds the tracker, so hedging doesn't
+            bias the percentile it is driven by.
+        """
+        started = time.monotonic()
+        primary = asyncio.create_task(self._open_stream(model, contents, config))
+        attempts = {primary}
+        delay = self.hedge_policy.hedge_delay(model) if hedge else None
+        winner: Optional[asyncio.Task] = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                if not done and self.hedge_policy.try_hedge():
+                    app_logger.info(f"Hedging Gemini request | Model: {model} | After: {delay:.3f}s")
+                    attempts.add(asyncio.create_task(self._open_stream(model, contents, config)))
+                elif done:
+                    self.hedge_policy.record_request()
+            else:
+                self.hedge_policy.record_request()
+
+            # --- First successful attempt wins; surface the last error if all fail ---
+            pending = set(attempts)
+            last_error: Optional[BaseException] = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and winner is None:
+                        winner = task
+                    elif task.exception() is not None:
+                        last_error = task.exception()
+            if winner is None:
+                raise last_error
+
+            self._record_primary_ttft(model, primary, started)
+            first_chunk, iterator, _ = winner.result()
+            for task in attempts - {winner}:
+                await self._discard_attempt(task)
+
+            if first_chunk is None:
+                return
+            yield first_chunk
+            async for chunk in iterator:
+                yield chunk
+        finally:
+            for task in attempts:
+                if task is not winner and not task.done():
+                    task.cancel()
+            # --- Consumer stopped early (or finished): release the upstream stream ---
+            if winner is not None:
+                await self._discard_attempt(winner)
+
+    def _record_primary_ttft(self, model: str, primary: asyncio.Task, started: float) -> None:
+        """
+            Records the primary attempt's TTFT. When a hedge beat it, the time
+            waited so far is a lower bound on it and is recorded instead.
+        """
+        if primary.done() and not primary.cancelled() and primary.exception() is None:
+            self.ttft_tracker.record(model, primary.result()[2])
+        elif not primary.done():
+            self.ttft_tracker.record(model, time.monotonic() - started)
+
     async def chat_stream(
         self,
         message: str ,
         mode: ChatMode = ChatMode.STANDARD,
-        model: str = "gemini-flash-latest" 
+        model: str = "gemini-flash-latest" ,
+        hedge: Optional[bool] = None
     ) -> AsyncGenerator[ChatStreamResponse, None]:
         """
             Streams response from Gemini , handling both Standard and Web Search modes . 
+            `hedge` overrides GEMINI_HEDGING_ENABLED for this call . 
         """
+        if hedge is None:
+            hedge = settings.GEMINI_HEDGING_ENABLED
         app_logger.info(f"Starting Chat Stream | Mode: {mode} | Model: {model}")
         # --- Configure Tools (Grounding) --- 
         tools = []
@@ -55,30 +191,35 @@ class GeminiService:
         # --- Let's Call Gemini --- 
         try:
             # --- We Use Client.aio for better non-blocking streaming experience --- 
-            response_stream = await self.client.aio.models.generate_content_stream(
-                model=model, 
-                contents=message,
-                config=config
-            )
+            meter = UsageMeter(model)
+            response_stream = self._generate_stream(model, message, config, hedge=hedge)
+            deadline = current_deadline()
+            if deadline is not None:
+                response_stream = deadline.bound_stream(response_stream, "gemini_stream")
             # --- Stream the response with async iteration --- 
-            last_chunk = None
+            # --- Grounding sources are merged across chunks and emitted as soon as they appear ---
+            collector = CitationCollector(self._extract_citations, web_citation_key)
             async for chunk in response_stream:
-                last_chunk = chunk
+                meter.observe(chunk)
                 if chunk.text:
                     yield ChatStreamResponse(
                         type="token",
                         content=chunk.text
                     )
-            # --- Finally let's handle Grounding/Citations ---
-            if last_chunk is not None and last_chunk.candidates:
-                citations = self._extract_citations(last_chunk.candidates[0])
-                if citations:
+                new_citations = collector.collect(chunk)
+                if new_citations:
                     yield ChatStreamResponse(
                         type="citation",
-                        sources=citations
+                        sources=new_citations
                     )
-            # --- Signal Completion --- 
-            yield ChatStreamResponse(type="done")
+            # --- Signal Completion (with token & latency accounting) --- 
+            yield ChatStreamResponse(type="done", usage=meter.stats())
+        except DeadlineExceeded as e:
+            app_logger.warning(f"Gemini Stream Deadline: {str(e)}")
+            yield ChatStreamResponse(
+                type="error",
+                content="The request timed out before the AI service finished responding."
+            )
         except Exception as e:
             app_logger.error(f"Gemini API Error: {str(e)}")
             yield ChatStreamResponse(
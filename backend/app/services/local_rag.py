@@ -0,0 +1,398 @@
+import asyncio
+import json
+import mmap
+import os
+import re
+import shutil
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.core.logging import app_logger
+from app.schemas.file_search import FileSearchCitation
+from app.services.citation_preview import fingerprint
+from app.services.text_extraction import extract_text
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the local backend needs it
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: writes are then serialised per process only
+    fcntl = None
+
+settings = get_settings()
+
+# --- Local store names never collide with upstream "fileSearchStores/..." ---
+LOCAL_STORE_PREFIX = "local/"
+_STORE_ID = re.compile(r"^[a-z0-9-]+$")
+
+# --- Scoring ---
+VECTOR_DIM = 512
+BM25_K1 = 1.5
+BM25_B = 0.75
+VECTOR_WEIGHT = 0.3
+
+_TOKEN = re.compile(r"\w+")
+_CURRENT = "CURRENT"
+_LOCK = "LOCK"
+_META = "meta.json"
+
+
+def is_local_store(store_name: str) -> bool:
+    return store_name.startswith(LOCAL_STORE_PREFIX)
+
+
+@dataclass
+class TextChunk:
+    """
+        One retrieval unit: `text` spans pages `first_page`..`last_page`.
+    """
+    text: str
+    first_page: int
+    last_page: int
+
+
+@dataclass
+class Passage:
+    """
+        A retrieved chunk with its source document and score.
+    """
+    title: str
+    text: str
+    page_range: Optional[str]
+    score: float
+
+    def citation(self) -> FileSearchCitation:
+        return FileSearchCitation(
+            source_title=self.title,
+            text_segment=self.text,
+            page_range=self.page_range,
+            chunk_id=fingerprint(self.text)
+        )
+
+
+@dataclass
+class LocalStore:
+    """
+        Listing entry shaped like an upstream store (name, display_name, create_time).
+    """
+    name: str
+    display_name: str
+    create_time: datetime
+
+
+def whitespace_chunks(pages: List[str], max_tokens: int, overlap: int) -> List[TextChunk]:
+    """
+        Windows of `max_tokens` whitespace tokens overlapping by `overlap`,
+        mirroring the upstream `white_space_config` chunker.
+    """
+    tokens = [(word, number) for number, page in enumerate(pages, 1) for word in page.split()]
+    step = max(1, max_tokens - overlap)
+    chunks = []
+    for start in range(0, len(tokens), step):
+        window = tokens[start:start + max_tokens]
+        chunks.append(TextChunk(" ".join(w for w, _ in window), window[0][1], window[-1][1]))
+        if start + max_tokens >= len(tokens):
+            break
+    return chunks
+
+
+def term_ids(text: str) -> "np.ndarray":
+    """
+        Stable hashed ids of the lowercase word tokens in `text`.
+    """
+    return np.array(
+        [zlib.crc32(token.encode("utf-8")) for token in _TOKEN.findall(text.lower())],
+        dtype=np.int64
+    )
+
+
+def embed(ids: "np.ndarray") -> "np.ndarray":
+    """
+        Hashed bag-of-words vector (sublinear tf, L2-normalised).
+    """
+    vector = np.log1p(np.bincount(ids % VECTOR_DIM, minlength=VECTOR_DIM).astype(np.float32))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class LocalIndex:
+    """
+    Read-only, memory-mapped view of one generation of a store's index.
+
+    Files: chunk texts (`text.bin` + `offsets.npy`), BM25 postings
+    (`post_chunk`, `post_term`, `post_tf`, `doclen`), `vectors.npy`
+    (chunks x VECTOR_DIM) and `meta.json` (documents, chunk -> document/pages).
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.generation = directory.name
+        with open(directory / _META, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        load = lambda name: np.load(directory / f"{name}.npy", mmap_mode="r")
+        self.offsets = load("offsets")
+        self.post_chunk = load("post_chunk")
+        self.post_term = load("post_term")
+        self.post_tf = load("post_tf")
+        self.doclen = load("doclen")
+        self.vectors = load("vectors")
+        self._text_file = open(directory / "text.bin", "rb")
+        self.text = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def size(self) -> int:
+        return len(self.doclen)
+
+    def chunk_text(self, i: int) -> str:
+        return self.text[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def passage(self, i: int, score: float) -> Passage:
+        doc, first, last = self.meta["chunks"][i]
+        document = self.meta["docs"][doc]
+        page_range = f"pp. {first}-{last}" if document["paged"] else None
+        return Passage(document["title"], self.chunk_text(i), page_range, score)
+
+    def search(self, query: str, top_k: int) -> List[Passage]:
+        """
+            BM25 over hashed terms, blended with hashed-vector cosine.
+        """
+        ids = term_ids(query)
+        if len(ids) == 0:
+            return []
+        mask = np.isin(self.post_term, np.unique(ids))
+        rows = self.post_chunk[mask]
+        terms = self.post_term[mask]
+        tf = self.post_tf[mask]
+
+        bm25 = np.zeros(self.size, dtype=np.float32)
+        if len(rows):
+            # --- Postings are unique per (chunk, term): df is a plain count ---
+            unique, df = np.unique(terms, return_counts=True)
+            idf = np.log1p((self.size - df + 0.5) / (df + 0.5))
+            avgdl = float(self.doclen.mean())
+            dl = self.doclen[rows]
+            weight = idf[np.searchsorted(unique, terms)] * tf * (BM25_K1 + 1)
+            weight /= tf + BM25_K1 * (1 - BM25_B + BM25_B * dl / avgdl)
+            np.add.at(bm25, rows, weight)
+            bm25 /= bm25.max()
+
+        scores = (1 - VECTOR_WEIGHT) * bm25 + VECTOR_WEIGHT * (self.vectors @ embed(ids))
+        top = np.argsort(-scores)[:top_k]
+        return [self.passage(int(i), float(scores[i])) for i in top if bm25[i] > 0]
+
+    def close(self) -> None:
+        self.text.close()
+        self._text_file.close()
+
+
+class LocalRagEngine:
+    """
+    Offline File Search backend: local extraction, whitespace chunking and
+    a BM25 + NumPy vector index kept as memory-mapped files per store.
+
+    Each write builds a new index generation next to the old one and flips
+    `CURRENT`, so searches never see a half-written index. Writes to one
+    store are serialised (across worker processes via a `LOCK` file); reads
+    are lock-free and follow `CURRENT`, so every worker sees a write as soon
+    as it lands, whichever worker made it.
+    """
+
+    def __init__(self, root: str, max_tokens: int = 300, overlap: int = 30, top_k: int = 5):
+        if np is None:
+            raise RuntimeError("The local File Search backend needs the `local-rag` extra (numpy).")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.top_k = top_k
+        self._indexes: Dict[str, LocalIndex] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    # --- Public API ---
+    async def create_store(self) -> str:
+        store_id = f"warm-ai-{uuid.uuid4().hex[:10]}"
+        directory = self.root / store_id
+        directory.mkdir()
+        (directory / "created_at").write_text(datetime.now(timezone.utc).isoformat())
+        app_logger.info(f"Created local store: {store_id}")
+        return f"{LOCAL_STORE_PREFIX}{store_id}"
+
+    async def add_document(
+        self,
+        store_name: str,
+        file_path: str,
+        display_name: str,
+        chunking: Optional[dict] = None
+    ) -> None:
+        """
+            Extracts, chunks and indexes one document into the store, using
+            `chunking` (a `white_space_config`) when given.
+        """
+        directory = self._directory(store_name)
+        max_tokens, overlap = self.max_tokens, self.overlap
+        if chunking is not None:
+            ws = chunking["white_space_config"]
+            max_tokens, overlap = ws["max_tokens_per_chunk"], ws["max_overlap_tokens"]
+        async with self._locks.setdefault(store_name, asyncio.Lock()):
+            await run_in_threadpool(self._locked_add, directory, file_path, display_name, max_tokens, overlap)
+            self._drop(store_name)
+
+    async def search(self, store_name: str, query: str, top_k: Optional[int] = None) -> List[Passage]:
+        index = self._index(store_name)
+        if index is None:
+            return []
+        return index.search(query, top_k or self.top_k)
+
+    async def delete_store(self, store_name: str) -> None:
+        directory = self._directory(store_name)
+        self._drop(store_name)
+        self._locks.pop(store_name, None)
+        await run_in_threadpool(shutil.rmtree, directory, True)
+
+    def list_stores(self) -> List[LocalStore]:
+        stores = []
+        for directory in self.root.iterdir():
+            created = directory / "created_at"
+            if directory.is_dir() and created.exists():
+                stores.append(LocalStore(
+                    name=f"{LOCAL_STORE_PREFIX}{directory.name}",
+                    display_name=directory.name,
+                    create_time=datetime.fromisoformat(created.read_text())
+                ))
+        return stores
+
+    # --- Internals ---
+    def _directory(self, store_name: str) -> Path:
+        store_id = store_name[len(LOCAL_STORE_PREFIX):]
+        if not is_local_store(store_name) or not _STORE_ID.match(store_id):
+            raise ValueError(f"Not a local store: {store_name}")
+        return self.root / store_id
+
+    def _index(self, store_name: str) -> Optional[LocalIndex]:
+        """
+            The open index for the store's current generation. `CURRENT` is
+            re-read on every call: another worker may have flipped it.
+        """
+        directory = self._directory(store_name)
+        for _ in range(3):
+            try:
+                generation = (directory / _CURRENT).read_text().strip()
+            except FileNotFoundError:
+                self._drop(store_name)
+                return None
+            index = self._indexes.get(store_name)
+            if index is not None and index.generation == generation:
+                return index
+            self._drop(store_name)
+            try:
+                index = LocalIndex(directory / generation)
+            except FileNotFoundError:
+                # --- Superseded and removed between the two reads: look again ---
+                continue
+            self._indexes[store_name] = index
+            return index
+        return None
+
+    def _drop(self, store_name: str) -> None:
+        index = self._indexes.pop(store_name, None)
+        if index is not None:
+            index.close()
+
+    def _locked_add(self, directory: Path, file_path: str, display_name: str, max_tokens: int, overlap: int) -> None:
+        with open(directory / _LOCK, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._add(directory, file_path, display_name, max_tokens, overlap)
+
+    def _add(self, directory: Path, file_path: str, display_name: str, max_tokens: int, overlap: int) -> None:
+        pages = extract_text(file_path, display_name)
+        if pages is None:
+            raise ValueError(f"Unsupported file type for local search: {display_name}")
+        chunks = whitespace_chunks(pages, max_tokens, overlap)
+        if not chunks:
+            raise ValueError(f"No text to index in {display_name}")
+
+        current = directory / _CURRENT
+        previous = directory / current.read_text().strip() if current.exists() else None
+        if previous is not None:
+            old = LocalIndex(previous)
+            meta = old.meta
+            texts = [old.chunk_text(i) for i in range(old.size)]
+            arrays = {name: np.array(getattr(old, name)) for name in ("post_chunk", "post_term", "post_tf", "doclen", "vectors")}
+            old.close()
+        else:
+            meta = {"docs": [], "chunks": []}
+            texts = []
+            arrays = {
+                "post_chunk": np.zeros(0, dtype=np.int32),
+                "post_term": np.zeros(0, dtype=np.int64),
+                "post_tf": np.zeros(0, dtype=np.float32),
+                "doclen": np.zeros(0, dtype=np.float32),
+                "vectors": np.zeros((0, VECTOR_DIM), dtype=np.float32),
+            }
+
+        doc = len(meta["docs"])
+        meta["docs"].append({"title": display_name, "paged": len(pages) > 1})
+        post_chunk, post_term, post_tf, doclen, vectors = [], [], [], [], []
+        for chunk in chunks:
+            row = len(texts)
+            ids = term_ids(chunk.text)
+            terms, counts = np.unique(ids, return_counts=True)
+            post_chunk.append(np.full(len(terms), row, dtype=np.int32))
+            post_term.append(terms)
+            post_tf.append(counts.astype(np.float32))
+            doclen.append(len(ids))
+            vectors.append(embed(ids))
+            texts.append(chunk.text)
+            meta["chunks"].append([doc, chunk.first_page, chunk.last_page])
+
+        arrays["post_chunk"] = np.concatenate([arrays["post_chunk"], *post_chunk])
+        arrays["post_term"] = np.concatenate([arrays["post_term"], *post_term])
+        arrays["post_tf"] = np.concatenate([arrays["post_tf"], *post_tf])
+        arrays["doclen"] = np.concatenate([arrays["doclen"], np.array(doclen, dtype=np.float32)])
+        arrays["vectors"] = np.vstack([arrays["vectors"], np.stack(vectors)])
+
+        generation = f"gen-{uuid.uuid4().hex[:8]}"
+        target = directory / generation
+        target.mkdir()
+        encoded = [t.encode("utf-8") for t in texts]
+        with open(target / "text.bin", "wb") as f:
+            f.write(b"".join(encoded))
+        np.save(target / "offsets.npy", np.concatenate([[0], np.cumsum([len(e) for e in encoded])]).astype(np.int64))
+        for name, array in arrays.items():
+            np.save(target / f"{name}.npy", array)
+        with open(target / _META, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        # --- Atomic flip; open memory maps of the old generation stay valid ---
+        pointer = directory / f"{_CURRENT}.tmp"
+        pointer.write_text(generation)
+        os.replace(pointer, current)
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+
+
+def build_local_rag(chunking_config: dict) -> Optional[LocalRagEngine]:
+    """
+        Returns the local engine when it is the configured backend, else None.
+        Chunks match the upstream `white_space_config`.
+    """
+    if settings.FILE_SEARCH_BACKEND != "local":
+        return None
+    ws = chunking_config["white_space_config"]
+    return LocalRagEngine(
+        settings.LOCAL_RAG_DIR,
+        max_tokens=ws["max_tokens_per_chunk"],
+        overlap=ws["max_overlap_tokens"],
+        top_k=settings.LOCAL_RAG_TOP_K
+    )
@@ -0,0 +1,136 @@
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.logging import app_logger
+
+
+@dataclass
+class _PendingOperation:
+    operation: Any
+    future: asyncio.Future
+    delay: float
+    next_poll_at: float
+    errors: int = 0
+
+
+class OperationPoller:
+    """
+    One asyncio sweep that polls every pending long-running operation.
+
+    - Each operation backs off exponentially (`initial_delay` * `multiplier`^n,
+      capped at `max_delay`, with jitter), so short indexing runs resolve
+      quickly and long ones cost few GETs.
+    - A single task sweeps whatever is due; waiters just await a future,
+      so pending uploads hold neither threads nor their own poll loops.
+    - An operation is failed after `max_errors` consecutive GET errors.
+    """
+
+    def __init__(
+        self,
+        get_operation: Callable[[Any], Awaitable[Any]],
+        initial_delay: float = 1.0,
+        max_delay: float = 15.0,
+        multiplier: float = 1.6,
+        sweep_interval: float = 0.5,
+        max_errors: int = 5
+    ):
+        self.get_operation = get_operation
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.sweep_interval = sweep_interval
+        self.max_errors = max_errors
+        self._pending: Dict[int, _PendingOperation] = {}
+        self._wakeup = asyncio.Event()
+        self._sweeper: Optional[asyncio.Task] = None
+        self.polls = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def wait(self, operation: Any, timeout: Optional[float] = None) -> Any:
+        """
+            Resolves with the finished operation. Raises asyncio.TimeoutError
+            after `timeout` seconds; the operation is then no longer tracked.
+        """
+        if getattr(operation, "done", False):
+            return operation
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = id(future)
+        self._pending[key] = _PendingOperation(
+            operation=operation,
+            future=future,
+            delay=self.initial_delay,
+            next_poll_at=loop.time() + self.initial_delay
+        )
+        self._ensure_sweeper()
+        self._wakeup.set()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(key, None)
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        for entry in self._pending.values():
+            if not entry.future.done():
+                entry.future.cancel()
+        self._pending.clear()
+
+    # --- Internals ---
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            self._wakeup.clear()
+            now = loop.time()
+            due = [entry for entry in self._pending.values() if entry.next_poll_at <= now]
+            if due:
+                await asyncio.gather(*(self._refresh(entry) for entry in due))
+
+            if not self._pending:
+                break
+            next_at = min(entry.next_poll_at for entry in self._pending.values())
+            sleep_for = max(self.sweep_interval, next_at - loop.time())
+            try:
+                # --- New registrations cut the sleep short ---
+                await asyncio.wait_for(self._wakeup.wait(), sleep_for)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refresh(self, entry: _PendingOperation) -> None:
+        if entry.future.done():
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            self.polls += 1
+            entry.operation = await self.get_operation(entry.operation)
+            entry.errors = 0
+        except Exception as e:
+            entry.errors += 1
+            app_logger.warning(f"Operation poll failed ({entry.errors}/{self.max_errors}): {str(e)}")
+            if entry.errors >= self.max_errors:
+                if not entry.future.done():
+                    entry.future.set_exception(e)
+                return
+
+        if entry.future.done():
+            # --- Waiter gave up (timeout/cancel) while we were polling ---
+            return
+        if getattr(entry.operation, "done", False):
+            entry.future.set_result(entry.operation)
+            return
+
+        entry.delay = min(entry.delay * self.multiplier, self.max_delay)
+        entry.next_poll_at = loop.time() + entry.delay * random.uniform(0.8, 1.2)
@@ -0,0 +1,229 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import re
+import tempfile
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, TypeVar
+
+from app.core.config import get_settings
+from app.core.logging import app_logger
+from app.services.text_extraction import DOCX_SUFFIXES, PDF_SUFFIXES, extract_text
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+# --- Layout-heavy formats worth replacing with their text before upload ---
+PREPROCESS_SUFFIXES = PDF_SUFFIXES | DOCX_SUFFIXES
+
+# --- Headers/footers live in the first/last few non-empty lines of a page ---
+EDGE_LINES = 3
+MIN_REPEATS = 3
+
+_SPACE = re.compile(r"[ \t\u00a0]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_DIGITS = re.compile(r"\d+")
+_PAGE_NUMBER = re.compile(
+    r"^[\W_]*(page\s+)?(?=[\dmdclxvi])(\d+|m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3}))(\s*(of|/)\s*\d+)?[\W_]*$",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class PreparedDocument:
+    """
+        Compact text of a document, written to `path` and uploaded in its
+        place. `pages[i]` is page i + 1: the page map for shards and citations.
+    """
+    path: str
+    pages: List[str]
+    original_bytes: int
+    compact_bytes: int
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def _edge_keys(line: str, page_index: int) -> Set[tuple]:
+    """
+        Keys under which an edge line can repeat across pages: its text, and
+        per number in it, the text with digits masked plus that number's
+        offset from the page index ("Report 2024 | 17" on page 17, 18, ...).
+    """
+    text = _SPACE.sub(" ", line.strip().casefold())
+    keys = {(text,)}
+    masked = _DIGITS.sub("#", text)
+    for position, number in enumerate(_DIGITS.findall(text)):
+        keys.add((masked, position, int(number) - page_index))
+    return keys
+
+
+def _is_page_number(line: str) -> bool:
+    stripped = line.strip()
+    return bool(stripped) and _PAGE_NUMBER.match(stripped) is not None
+
+
+def _compact(text: str) -> str:
+    lines = (_SPACE.sub(" ", line).strip() for line in text.splitlines())
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def strip_boilerplate(pages: List[str], min_share: float = 0.5) -> List[str]:
+    """
+    Removes running headers, footers and page numbers; keeps one entry per page.
+
+    A line near the top or bottom of a page is boilerplate when it is a bare
+    page number, or when it recurs near the edges of at least `min_share` of
+    the pages (and at least MIN_REPEATS of them), either verbatim or with a
+    number that counts up with the page. Whitespace runs and blank lines are
+    collapsed.
+    """
+    lines = [page.splitlines() for page in pages]
+    edges: List[Dict[int, Set[tuple]]] = []
+    counts: Counter = Counter()
+    for page_index, page_lines in enumerate(lines):
+        content = [i for i, line in enumerate(page_lines) if line.strip()]
+        edge = {i: _edge_keys(page_lines[i], page_index) for i in content[:EDGE_LINES] + content[-EDGE_LINES:]}
+        edges.append(edge)
+        counts.update(set().union(*edge.values()))
+
+    threshold = max(MIN_REPEATS, math.ceil(min_share * len(pages)))
+
+    cleaned = []
+    for page_lines, edge in zip(lines, edges):
+        kept = [
+            line for i, line in enumerate(page_lines)
+            if i not in edge or not (
+                _is_page_number(line) or any(counts[key] >= threshold for key in edge[i])
+            )
+        ]
+        cleaned.append(_compact("\n".join(kept)))
+    return cleaned
+
+
+def prepare_document(path: str, file_name: str, max_ratio: float) -> Optional[PreparedDocument]:
+    """
+        Extracts and cleans a PDF/DOCX and writes its compact text to a temp
+        file. None when there is no text layer or the text isn't at most
+        `max_ratio` of the original size. Runs in a worker process.
+    """
+    pages = extract_text(path, file_name)
+    if pages is None:
+        return None
+    pages = strip_boilerplate(pages)
+    text = "\n\n".join(pages).encode("utf-8")
+    original_bytes = os.path.getsize(path)
+    if not text.strip() or len(text) > original_bytes * max_ratio:
+        return None
+
+    fd, compact_path = tempfile.mkstemp(prefix="warm-ai-text-", suffix=".txt")
+    with os.fdopen(fd, "wb") as f:
+        f.write(text)
+    return PreparedDocument(
+        path=compact_path,
+        pages=pages,
+        original_bytes=original_bytes,
+        compact_bytes=len(text)
+    )
+
+
+def _discard(future: Future) -> None:
+    # --- The caller went away: delete whatever the worker still wrote ---
+    if not future.cancelled() and future.exception() is None and future.result() is not None:
+        future.result().remove()
+
+
+class UploadPreprocessor:
+    """
+    Replaces large PDFs/DOCX with their cleaned text before upload.
+
+    Extraction is CPU-bound (pypdf is pure Python), so it runs in a process
+    pool and never holds the event loop or the GIL of the serving process.
+    The pool is started on first use; `run` hands it other CPU-bound upload
+    work too (citation preview indexes). With `enabled` False, `prepare`
+    leaves every file as-is and only `run` is used.
+    """
+
+    def __init__(self, workers: int, min_bytes: int, max_ratio: float, enabled: bool = True):
+        self.workers = max(1, workers)
+        self.min_bytes = min_bytes
+        self.max_ratio = max_ratio
+        self.enabled = enabled
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def prepare(self, file_path: str, file_name: str) -> Optional[PreparedDocument]:
+        """
+            Compact text for the upload, or None to upload the file as-is.
+        """
+        if not self.enabled or Path(file_name).suffix.lower() not in PREPROCESS_SUFFIXES:
+            return None
+        if os.path.getsize(file_path) < self.min_bytes:
+            return None
+
+        future = self._executor().submit(prepare_document, file_path, file_name, self.max_ratio)
+        try:
+            prepared = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(_discard)
+            raise
+        except BrokenProcessPool as e:
+            app_logger.warning(f"Preprocessing pool broke on {file_name}, uploading whole: {str(e)}")
+            self._reset()
+            return None
+        except Exception as e:
+            app_logger.warning(f"Preprocessing {file_name} failed, uploading whole: {str(e)}")
+            return None
+
+        if prepared is not None:
+            app_logger.info(
+                f"Preprocessed {file_name}: {prepared.original_bytes} -> {prepared.compact_bytes} bytes "
+                f"({len(prepared.pages)} pages)"
+            )
+        return prepared
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+            `fn(*args)` in a worker process; both must be picklable.
+        """
+        try:
+            return await asyncio.wrap_future(self._executor().submit(fn, *args))
+        except BrokenProcessPool:
+            self._reset()
+            raise
+
+    def close(self) -> None:
+        self._reset()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # --- spawn: forking a process with a running event loop and threads is unsafe ---
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _reset(self) -> None:
+        # --- Also recovers from a broken pool (a worker crashed mid-extraction) ---
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def build_preprocessor() -> Optional[UploadPreprocessor]:
+    """
+        Returns the upload preprocessor, or None when neither preprocessing
+        nor citation previews need its process pool.
+    """
+    if not (settings.UPLOAD_PREPROCESSING_ENABLED or settings.CITATION_PREVIEW_ENABLED):
+        return None
+    return UploadPreprocessor(
+        settings.UPLOAD_PREPROCESS_WORKERS,
+        settings.UPLOAD_PREPROCESS_MIN_BYTES,
+        settings.UPLOAD_PREPROCESS_MAX_RATIO,
+        enabled=settings.UPLOAD_PREPROCESSING_ENABLED
+    )
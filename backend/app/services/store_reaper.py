@@ -0,0 +1,163 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncContextManager, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.core.logging import app_logger
+from app.services.citation_preview import CitationPreviewIndex
+from app.services.file_search_service import FileSearchService
+from app.services.store_registry import StoreRegistry
+
+settings = get_settings()
+
+
+@dataclass
+class ReapReport:
+    """
+        Outcome of one reaper pass.
+    """
+    idle_reclaimed: int = 0
+    orphans_reclaimed: int = 0
+    failed: int = 0
+    previews_removed: int = 0
+
+
+class StoreReaper:
+    """
+    Background lifecycle manager for File Search stores.
+
+    - Idle: a store whose sessions were all last used more than `idle_ttl_s`
+      ago is detached (sessions marked expired) and deleted upstream.
+    - Orphans: upstream stores we created that no session references (failed
+      deletes, crashes mid-upload) are deleted once older than `orphan_grace_s`,
+      which must outlast the longest indexing run.
+    - Citation previews of documents no session holds any more are removed.
+
+    Deletes run with at most `concurrency` in flight. Safe to run on every
+    worker: detaching is a conditional UPDATE, so only one worker wins it.
+    """
+
+    def __init__(
+        self,
+        file_search: FileSearchService,
+        session_factory: Callable[[], AsyncContextManager[AsyncSession]],
+        idle_ttl_s: float = settings.STORE_IDLE_TTL_S,
+        interval_s: float = settings.STORE_REAPER_INTERVAL_S,
+        orphan_grace_s: float = settings.STORE_ORPHAN_GRACE_S,
+        concurrency: int = settings.STORE_REAPER_CONCURRENCY,
+        previews: Optional[CitationPreviewIndex] = None
+    ):
+        self.file_search = file_search
+        self.session_factory = session_factory
+        self.idle_ttl_s = idle_ttl_s
+        self.interval_s = interval_s
+        self.orphan_grace_s = orphan_grace_s
+        self.concurrency = max(1, concurrency)
+        self.previews = previews
+        self._task: Optional[asyncio.Task] = None
+        # --- Cumulative counters for the metrics endpoint ---
+        self.runs = 0
+        self.idle_reclaimed = 0
+        self.orphans_reclaimed = 0
+        self.failed = 0
+        self.last_run_at: Optional[datetime] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "runs": self.runs,
+            "idle_reclaimed": self.idle_reclaimed,
+            "orphans_reclaimed": self.orphans_reclaimed,
+            "failed": self.failed,
+            "last_run_at": self.last_run_at,
+            "idle_ttl_s": self.idle_ttl_s,
+        }
+
+    async def run_once(self) -> ReapReport:
+        """
+            One pass: reap idle stores, then sweep orphans.
+        """
+        report = ReapReport()
+        slots = asyncio.Semaphore(self.concurrency)
+        async with self.session_factory() as db:
+            registry = StoreRegistry(db)
+            await self._reap_idle(registry, slots, report)
+            await self._reap_orphans(registry, slots, report)
+            if self.previews is not None:
+                keep = await registry.referenced_content_hashes()
+                report.previews_removed = await run_in_threadpool(self.previews.prune, keep, self.orphan_grace_s)
+
+        self.runs += 1
+        self.idle_reclaimed += report.idle_reclaimed
+        self.orphans_reclaimed += report.orphans_reclaimed
+        self.failed += report.failed
+        self.last_run_at = datetime.utcnow()
+        if report.idle_reclaimed or report.orphans_reclaimed or report.failed:
+            app_logger.info(
+                f"Store reaper | Idle: {report.idle_reclaimed} | "
+                f"Orphans: {report.orphans_reclaimed} | Failed: {report.failed}"
+            )
+        return report
+
+    # --- Internals ---
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                app_logger.error(f"Store reaper pass failed: {str(e)}")
+            await asyncio.sleep(self.interval_s)
+
+    async def _delete(self, store_name: str, slots: asyncio.Semaphore) -> bool:
+        async with slots:
+            return await self.file_search.delete_store(store_name)
+
+    async def _reap_idle(self, registry: StoreRegistry, slots: asyncio.Semaphore, report: ReapReport) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.idle_ttl_s)
+        expired = []
+        # --- Sequential: the registry shares one AsyncSession ---
+        for store_name in await registry.idle_stores(cutoff):
+            if await registry.expire(store_name, cutoff):
+                expired.append(store_name)
+
+        # --- A failed delete is left to the orphan sweep: no session refers to it now ---
+        results = await asyncio.gather(*(self._delete(name, slots) for name in expired))
+        report.idle_reclaimed += sum(1 for ok in results if ok)
+        report.failed += sum(1 for ok in results if not ok)
+
+    async def _reap_orphans(self, registry: StoreRegistry, slots: asyncio.Semaphore, report: ReapReport) -> None:
+        grace = timedelta(seconds=self.orphan_grace_s)
+        referenced = await registry.referenced_stores(registered_since=datetime.utcnow() - grace)
+        grace_cutoff = datetime.now(timezone.utc) - grace
+        orphans = []
+        for store in await self.file_search.list_stores():
+            created = getattr(store, "create_time", None)
+            if store.name in referenced or created is None:
+                continue
+            if created.tzinfo is None:
+                created = created.replace(tzinfo=timezone.utc)
+            if created < grace_cutoff:
+                orphans.append(store.name)
+
+        results = await asyncio.gather(*(self._delete(name, slots) for name in orphans))
+        for name, ok in zip(orphans, results):
+            if ok:
+                await registry.forget(name)
+                report.orphans_reclaimed += 1
+            else:
+                report.failed += 1
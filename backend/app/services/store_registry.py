@@ -0,0 +1,203 @@
+from datetime import datetime
+from typing import List, Optional, Set
+
+from sqlalchemy import delete, exists, func, update
+from sqlalchemy.orm import aliased
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.deadline import check_deadline
+from app.db.models import FileStore, Session, SessionFile
+from app.schemas.common import IndexingState
+
+# --- Sessions in these states still have work running against their store ---
+_ACTIVE_STATES = [IndexingState.QUEUED.value, IndexingState.UPLOADING.value, IndexingState.INDEXING.value]
+
+
+class StoreRegistry:
+    """
+    Reference-counted map of (content hash, chunking config) -> indexed store.
+
+    Counts are changed with single UPDATE statements so concurrent
+    uploads and deletes never lose an increment. Also answers the store
+    lifecycle queries (idle and referenced stores) used by the reaper.
+    With `deadline_bound` False (background jobs), commits ignore the
+    current deadline: a store already indexed is always recorded.
+    """
+
+    def __init__(self, db: AsyncSession, deadline_bound: bool = True):
+        self.db = db
+        self.deadline_bound = deadline_bound
+
+    async def _commit(self) -> None:
+        # --- Checked up front; cancelling a commit mid-flight would leave its outcome unknown ---
+        if self.deadline_bound:
+            check_deadline("store_registry_commit")
+        await self.db.commit()
+
+    async def get(self, store_name: str) -> Optional[FileStore]:
+        result = await self.db.execute(select(FileStore).where(FileStore.store_name == store_name))
+        return result.scalar_one_or_none()
+
+    async def acquire(self, content_hash: str, chunking_key: str) -> Optional[FileStore]:
+        """
+            Takes a reference on an existing store for this content, if any.
+        """
+        statement = (
+            update(FileStore)
+            .where(FileStore.content_hash == content_hash)
+            .where(FileStore.chunking_key == chunking_key)
+            .where(FileStore.ref_count > 0)
+            .values(ref_count=FileStore.ref_count + 1, last_used_at=datetime.utcnow())
+            .returning(FileStore)
+        )
+        result = await self.db.execute(statement)
+        entry = result.scalar_one_or_none()
+        await self._commit()
+        return entry
+
+    async def register(
+        self,
+        content_hash: str,
+        chunking_key: str,
+        store_name: str,
+        file_name: str,
+        size_bytes: int
+    ) -> Optional[FileStore]:
+        """
+            Records a freshly indexed store with one reference. Returns None when
+            a concurrent upload registered the same content first.
+        """
+        entry = FileStore(
+            content_hash=content_hash,
+            chunking_key=chunking_key,
+            store_name=store_name,
+            file_name=file_name,
+            size_bytes=size_bytes
+        )
+        self.db.add(entry)
+        try:
+            await self._commit()
+        except IntegrityError:
+            await self.db.rollback()
+            return None
+        await self.db.refresh(entry)
+        return entry
+
+    async def release(self, store_name: str) -> bool:
+        """
+            Drops one reference. True when the caller should delete the upstream
+            store: the last reference is gone, or the store predates the registry.
+        """
+        statement = (
+            update(FileStore)
+            .where(FileStore.store_name == store_name)
+            .values(ref_count=FileStore.ref_count - 1)
+            .returning(FileStore.ref_count)
+        )
+        result = await self.db.execute(statement)
+        remaining = result.scalar_one_or_none()
+        if remaining is not None and remaining <= 0:
+            await self.db.execute(
+                delete(FileStore)
+                .where(FileStore.store_name == store_name)
+                .where(FileStore.ref_count <= 0)
+            )
+        await self._commit()
+        return remaining is None or remaining <= 0
+
+    async def detach(self, store_name: str) -> bool:
+        """
+            Takes a store out of content-addressed sharing before its contents
+            change. False when other sessions still reference it.
+        """
+        result = await self.db.execute(
+            delete(FileStore)
+            .where(FileStore.store_name == store_name)
+            .where(FileStore.ref_count <= 1)
+            .returning(FileStore.id)
+        )
+        detached = result.scalar_one_or_none() is not None
+        await self._commit()
+        return detached or await self.get(store_name) is None
+
+    async def forget(self, store_name: str) -> None:
+        """
+            Drops a store from the registry regardless of its count (store deleted).
+        """
+        await self.db.execute(delete(FileStore).where(FileStore.store_name == store_name))
+        await self._commit()
+
+    async def idle_stores(self, cutoff: datetime, limit: int = 100) -> List[str]:
+        """
+            Stores whose every session was last used before `cutoff` and has
+            no indexing in progress, least recently used first.
+        """
+        last_used = func.max(Session.updated_at)
+        statement = (
+            select(Session.file_search_store_name)
+            .where(Session.file_search_store_name.is_not(None))
+            .group_by(Session.file_search_store_name)
+            .having(last_used < cutoff)
+            .having(func.count().filter(Session.file_search_status.in_(_ACTIVE_STATES)) == 0)
+            .order_by(last_used)
+            .limit(limit)
+        )
+        result = await self.db.execute(statement)
+        return list(result.scalars().all())
+
+    async def expire(self, store_name: str, cutoff: datetime) -> List[int]:
+        """
+            Detaches an idle store from its sessions, marking them and their
+            files expired. Conditional on the store still being idle, so a
+            chat or upload that raced the reaper keeps it; returns the
+            sessions detached.
+        """
+        other = aliased(Session)
+        still_used = exists().where(
+            other.file_search_store_name == store_name,
+            (other.updated_at >= cutoff) | other.file_search_status.in_(_ACTIVE_STATES)
+        )
+        statement = (
+            update(Session)
+            .where(Session.file_search_store_name == store_name)
+            .where(~still_used)
+            .values(file_search_store_name=None, file_search_status=IndexingState.EXPIRED.value)
+            .returning(Session.id)
+        )
+        result = await self.db.execute(statement)
+        session_ids = list(result.scalars().all())
+        if session_ids:
+            # --- Same transaction: a file left "ready" would be skipped on re-upload ---
+            await self.db.execute(
+                update(SessionFile)
+                .where(SessionFile.session_id.in_(session_ids))
+                .values(status=IndexingState.EXPIRED.value, updated_at=datetime.utcnow())
+            )
+            await self.db.execute(delete(FileStore).where(FileStore.store_name == store_name))
+        await self._commit()
+        return session_ids
+
+    async def referenced_stores(self, registered_since: datetime) -> Set[str]:
+        """
+            Every store name some session still points at, plus registry
+            entries acquired since `registered_since` (a session may be
+            attaching one right now).
+        """
+        sessions = await self.db.execute(
+            select(Session.file_search_store_name)
+            .where(Session.file_search_store_name.is_not(None))
+            .distinct()
+        )
+        registered = await self.db.execute(
+            select(FileStore.store_name).where(FileStore.last_used_at >= registered_since)
+        )
+        return set(sessions.scalars().all()) | set(registered.scalars().all())
+
+    async def referenced_content_hashes(self) -> Set[str]:
+        """
+            Content hashes of every document some session still holds.
+        """
+        result = await self.db.execute(select(SessionFile.content_hash).distinct())
+        return set(result.scalars().all())
@@ -0,0 +1,233 @@
+import os
+import re
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+from xml.etree import ElementTree
+
+from app.core.logging import app_logger
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # optional: PDFs are uploaded whole without it
+    PdfReader = None
+
+# --- Formats we can split locally; anything else is uploaded whole ---
+TEXT_SUFFIXES = {".txt", ".md", ".markdown", ".csv", ".tsv", ".json", ".html", ".htm", ".xml", ".log"}
+PDF_SUFFIXES = {".pdf"}
+DOCX_SUFFIXES = {".docx"}
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# --- "deck.pdf [pp. 51-100]" / "notes.txt [part 2/5]" ---
+_SHARD_TITLE = re.compile(r"^(?P<name>.+) \[(?P<range>pp\. \d+-\d+|part \d+/\d+)\]$")
+
+
+@dataclass
+class Shard:
+    """
+        One locally split piece of a large document, written to `path`.
+    """
+    path: str
+    display_name: str
+    page_range: str
+
+
+def shard_title(file_name: str, page_range: str) -> str:
+    return f"{file_name} [{page_range}]"
+
+
+def parse_shard_title(title: str) -> Tuple[str, Optional[str]]:
+    """
+        Maps a shard's display name back to (original file name, page range).
+        Titles of unsharded documents come back unchanged with no range.
+    """
+    match = _SHARD_TITLE.match(title or "")
+    if match is None:
+        return title, None
+    return match.group("name"), match.group("range")
+
+
+def extract_pdf_pages(path: str) -> Optional[List[str]]:
+    """
+        Text per page, or None when pypdf is missing or the PDF has no text layer.
+    """
+    if PdfReader is None:
+        return None
+    try:
+        reader = PdfReader(path)
+        pages = [page.extract_text() or "" for page in reader.pages]
+    except Exception as e:
+        app_logger.warning(f"PDF text extraction failed, uploading whole: {str(e)}")
+        return None
+    if not any(page.strip() for page in pages):
+        return None
+    return pages
+
+
+def extract_docx_pages(path: str) -> Optional[List[str]]:
+    """
+        Paragraph text of a .docx, split into pages at explicit and
+        last-rendered page breaks. None when the archive can't be read.
+    """
+    pages: List[str] = []
+    page: List[str] = []
+    try:
+        with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as document:
+            for event, node in ElementTree.iterparse(document, events=("start", "end")):
+                if event == "end":
+                    if node.tag == f"{_W}t":
+                        page.append(node.text or "")
+                    elif node.tag == f"{_W}p":
+                        page.append("\n")
+                    node.clear()
+                elif node.tag == f"{_W}tab":
+                    page.append("\t")
+                elif node.tag == f"{_W}lastRenderedPageBreak" or (
+                    node.tag == f"{_W}br" and node.get(f"{_W}type") == "page"
+                ):
+                    if "".join(page).strip():
+                        pages.append("".join(page))
+                        page = []
+                elif node.tag == f"{_W}br":
+                    page.append("\n")
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        app_logger.warning(f"DOCX text extraction failed, uploading whole: {str(e)}")
+        return None
+    if "".join(page).strip() or not pages:
+        pages.append("".join(page))
+    if not any(p.strip() for p in pages):
+        return None
+    return pages
+
+
+def extract_text(path: str, file_name: str) -> Optional[List[str]]:
+    """
+        Text of a document as a list of pages (one page for plain-text
+        formats), or None when the format can't be extracted locally.
+    """
+    suffix = Path(file_name).suffix.lower()
+    if suffix in PDF_SUFFIXES:
+        return extract_pdf_pages(path)
+    if suffix in DOCX_SUFFIXES:
+        return extract_docx_pages(path)
+    if suffix in TEXT_SUFFIXES:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return [f.read()]
+    return None
+
+
+def split_text(text: str, max_bytes: int) -> List[str]:
+    """
+        Splits text into pieces of at most ~`max_bytes`, cutting at a paragraph
+        break, else a line break, else whitespace, so no word is split.
+    """
+    pieces: List[str] = []
+    rest = text
+    while len(rest.encode("utf-8")) > max_bytes:
+        window = rest[:max_bytes]
+        cut = -1
+        for separator in ("\n\n", "\n", " "):
+            cut = window.rfind(separator, max_bytes // 2)
+            if cut != -1:
+                cut += len(separator)
+                break
+        if cut <= 0:
+            cut = len(window)
+        pieces.append(rest[:cut])
+        rest = rest[cut:]
+    if rest.strip():
+        pieces.append(rest)
+    return pieces
+
+
+def _write_shard(text: str, directory: str, index: int) -> str:
+    path = os.path.join(directory, f"shard-{index:04d}.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def shard_pages(pages: List[str], file_name: str, pages_per_shard: int) -> List[Shard]:
+    """
+        Writes `pages_per_shard` whole pages per shard ("pp. a-b" titles).
+    """
+    directory = tempfile.mkdtemp(prefix="warm-ai-shards-")
+    shards = []
+    try:
+        for index, first in enumerate(range(0, len(pages), pages_per_shard)):
+            chunk = pages[first:first + pages_per_shard]
+            page_range = f"pp. {first + 1}-{first + len(chunk)}"
+            shards.append(Shard(
+                path=_write_shard("\n\n".join(chunk), directory, index),
+                display_name=shard_title(file_name, page_range),
+                page_range=page_range
+            ))
+    except Exception:
+        remove_shards([], directory)
+        raise
+    return shards
+
+
+def shard_document(
+    path: str,
+    file_name: str,
+    pages_per_shard: int,
+    min_pages: int,
+    text_shard_bytes: int
+) -> Optional[List[Shard]]:
+    """
+    Splits a large text-extractable document into shards on safe boundaries.
+
+    - PDFs with at least `min_pages` pages: `pages_per_shard` whole pages each.
+    - Plain-text formats over 2x `text_shard_bytes`: paragraph-aligned byte ranges.
+    Returns None when the document should be uploaded whole. The caller
+    removes the shard files (they share one temp directory).
+    """
+    suffix = Path(file_name).suffix.lower()
+    directory = None
+    try:
+        if suffix in PDF_SUFFIXES:
+            pages = extract_pdf_pages(path)
+            if pages is None or len(pages) < min_pages:
+                return None
+            return shard_pages(pages, file_name, pages_per_shard)
+
+        if suffix in TEXT_SUFFIXES:
+            if os.path.getsize(path) <= 2 * text_shard_bytes:
+                return None
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pieces = split_text(f.read(), text_shard_bytes)
+            if len(pieces) < 2:
+                return None
+            directory = tempfile.mkdtemp(prefix="warm-ai-shards-")
+            return [
+                Shard(
+                    path=_write_shard(piece, directory, index),
+                    display_name=shard_title(file_name, f"part {index + 1}/{len(pieces)}"),
+                    page_range=f"part {index + 1}/{len(pieces)}"
+                )
+                for index, piece in enumerate(pieces)
+            ]
+    except Exception as e:
+        app_logger.warning(f"Sharding {file_name} failed, uploading whole: {str(e)}")
+        if directory is not None:
+            remove_shards([], directory)
+        return None
+    return None
+
+
+def remove_shards(shards: List[Shard], directory: Optional[str] = None) -> None:
+    """
+        Deletes shard files and their temp directory.
+    """
+    directory = directory or (os.path.dirname(shards[0].path) if shards else None)
+    for shard in shards:
+        if os.path.exists(shard.path):
+            os.unlink(shard.path)
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
@@ -0,0 +1,145 @@
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.db.models import Message, Session
+from app.schemas.chat import UsageStats
+
+# --- Estimated list prices, USD per 1M tokens: (input, output, cached input) ---
+MODEL_PRICING: Dict[str, Tuple[float, float, float]] = {
+    "gemini-flash-latest": (0.30, 2.50, 0.03),
+    "gemini-2.5-flash": (0.30, 2.50, 0.03),
+    "gemini-2.5-flash-lite": (0.10, 0.40, 0.01),
+    "gemini-2.5-pro": (1.25, 10.00, 0.125),
+}
+
+
+def estimate_cost(
+    model: Optional[str],
+    input_tokens: int,
+    output_tokens: int,
+    cached_tokens: int
+) -> Optional[float]:
+    """
+        Estimated USD cost, or None for models without a known price.
+    """
+    pricing = MODEL_PRICING.get(model or "")
+    if pricing is None:
+        return None
+    input_price, output_price, cached_price = pricing
+    uncached = max(0, input_tokens - cached_tokens)
+    return round(
+        (uncached * input_price + cached_tokens * cached_price + output_tokens * output_price) / 1_000_000,
+        6
+    )
+
+
+class UsageMeter:
+    """
+        Measures one upstream stream: time to first chunk, total duration and
+        the usage_metadata reported on (usually) the final chunk.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._started = time.monotonic()
+        self._first_chunk_at: Optional[float] = None
+        self._usage: Any = None
+
+    def observe(self, chunk: Any) -> None:
+        if self._first_chunk_at is None:
+            self._first_chunk_at = time.monotonic()
+        usage = getattr(chunk, "usage_metadata", None)
+        if usage is not None:
+            self._usage = usage
+
+    def stats(self) -> UsageStats:
+        now = time.monotonic()
+        usage = self._usage
+
+        def count(field: str) -> Optional[int]:
+            value = getattr(usage, field, None) if usage is not None else None
+            return value if isinstance(value, int) else None
+
+        output_tokens = count("candidates_token_count")
+        thoughts = count("thoughts_token_count")
+        if output_tokens is not None and thoughts:
+            output_tokens += thoughts
+
+        return UsageStats(
+            model=self.model,
+            input_tokens=count("prompt_token_count"),
+            output_tokens=output_tokens,
+            cached_tokens=count("cached_content_token_count"),
+            ttft_ms=int((self._first_chunk_at - self._started) * 1000) if self._first_chunk_at else None,
+            duration_ms=int((now - self._started) * 1000),
+        )
+
+
+class UsageService:
+    """
+        Aggregates per-message usage into cost and latency reports.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_usage_summary(self, since: datetime) -> List[Dict[str, Any]]:
+        """
+            Per (mode, model) totals and latency percentiles for assistant
+            messages created after `since`. Percentiles are computed in Postgres.
+        """
+        def pct(column, fraction):
+            return func.percentile_cont(fraction).within_group(column)
+
+        statement = (
+            select(
+                Session.mode,
+                Message.model,
+                func.count(Message.id),
+                func.coalesce(func.sum(Message.input_tokens), 0),
+                func.coalesce(func.sum(Message.output_tokens), 0),
+                func.coalesce(func.sum(Message.cached_tokens), 0),
+                pct(Message.ttft_ms, 0.5),
+                pct(Message.ttft_ms, 0.95),
+                pct(Message.ttft_ms, 0.99),
+                pct(Message.duration_ms, 0.5),
+                pct(Message.duration_ms, 0.95),
+                pct(Message.duration_ms, 0.99),
+            )
+            .join(Session, Session.id == Message.session_id)
+            .where(Message.role == "assistant")
+            .where(Message.model.is_not(None))
+            .where(Message.created_at >= since)
+            .group_by(Session.mode, Message.model)
+            .order_by(Session.mode, Message.model)
+        )
+        result = await self.db.execute(statement)
+
+        rows = []
+        for (mode, model, messages, input_tokens, output_tokens, cached_tokens,
+             ttft_p50, ttft_p95, ttft_p99, dur_p50, dur_p95, dur_p99) in result.all():
+            rows.append({
+                "mode": mode,
+                "model": model,
+                "messages": messages,
+                "input_tokens": int(input_tokens),
+                "output_tokens": int(output_tokens),
+                "cached_tokens": int(cached_tokens),
+                "estimated_cost_usd": estimate_cost(model, int(input_tokens), int(output_tokens), int(cached_tokens)),
+                "ttft_p50_ms": ttft_p50,
+                "ttft_p95_ms": ttft_p95,
+                "ttft_p99_ms": ttft_p99,
+                "duration_p50_ms": dur_p50,
+                "duration_p95_ms": dur_p95,
+                "duration_p99_ms": dur_p99,
+            })
+        return rows
+
+
+def window_start(window_hours: int) -> datetime:
+    return datetime.utcnow() - timedelta(hours=window_hours)
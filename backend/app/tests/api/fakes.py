@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock
+
+from app.schemas.common import ChatMode
+
+
+class FakeBatch:
+    """
+        HistoryBatch stand-in that replays the queued writes on the fake history.
+    """
+
+    def __init__(self, history, session_id=None):
+        self.history = history
+        self.session_id = session_id
+        self.session = None
+        self.new_session = None
+        self.messages = []
+        self.pending_files = []
+        self.files = []
+
+    def create_session(self, title, mode, **fields):
+        self.new_session = (title, mode, fields)
+        return self
+
+    def add_message(self, role, content, sources=None, usage=None, cards=None):
+        self.messages.append((role, content, sources, usage, cards))
+        return self
+
+    def add_files(self, files):
+        self.pending_files.extend(files)
+        return self
+
+    async def flush(self):
+        if self.new_session is not None:
+            title, mode, fields = self.new_session
+            self.session = await self.history.create_session(title, mode, **fields)
+            self.session_id = self.session.id
+        for role, content, sources, usage, cards in self.messages:
+            await self.history.add_message(self.session_id, role, content, sources, usage, cards=cards)
+        if self.pending_files:
+            self.files = await self.history.add_session_files(self.session_id, self.pending_files)
+        return self
+
+
+class FakeHistory:
+    """
+        HistoryService stand-in: numbered new sessions, plus one existing
+        file-search session (id 3, with `status` and `store_name`) and its files.
+    """
+
+    def __init__(self, status=None, store_name=None):
+        self.sessions = 0
+        self.session = MagicMock(
+            id=3,
+            mode=ChatMode.FILE_SEARCH,
+            file_search_status=status,
+            file_search_store_name=store_name,
+        )
+        self.files = []
+        self.messages = []
+        self.loaded_messages = None
+
+    async def create_session(self, title, mode, **fields):
+        self.sessions += 1
+        return MagicMock(id=self.sessions, title=title, mode=mode, **fields)
+
+    async def get_session(self, session_id, include_messages=True):
+        self.loaded_messages = include_messages
+        return self.session
+
+    async def update_session_file_search(self, session_id, store_name, file_name=None, status=None):
+        self.session.file_search_status = status.value if status else None
+        return self.session
+
+    async def add_message(self, session_id, role, content, sources=None, usage=None, cards=None):
+        self.messages.append((role, content, sources, cards))
+
+    async def add_session_files(self, session_id, files):
+        self.files.extend(files)
+        for i, file in enumerate(files):
+            file.id = len(self.files) + i
+        return files
+
+    async def get_session_files(self, session_id):
+        return self.files
+
+    def batch(self, session_id=None):
+        return FakeBatch(self, session_id)
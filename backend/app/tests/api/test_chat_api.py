@@ -1,10 +1,18 @@
+import asyncio
+import json
 from typing import AsyncGenerator
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from fastapi.testclient import TestClient
 
+from app.api.deps import get_agent_service, get_history_service
+from app.main import app
 from app.schemas.chat import ChatStreamResponse
+from app.schemas.search import PersonCard
 from app.schemas.common import ChatMode
+from app.services.history_service import HistoryService
+from app.tests.api.fakes import FakeHistory
 
 
 @pytest.mark.asyncio
@@ -45,3 +53,94 @@ def test_chat_stream_handles_error(client: TestClient, mock_services):
     assert response.status_code == 200
     assert "\"type\":\"error\"" in chunks
     assert "Please try again" in chunks
+
+
+def test_chat_stream_starts_upstream_before_session_is_created(client: TestClient, mock_services):
+    order = []
+
+    async def fake_stream(*_args, **_kwargs):
+        order.append("upstream")
+        yield ChatStreamResponse(type="token", content="Hello")
+        yield ChatStreamResponse(type="done")
+
+    class SlowHistory(FakeHistory):
+        async def create_session(self, title, mode):
+            await asyncio.sleep(0.05)
+            order.append("create_session")
+            return MagicMock(id=42)
+
+        async def add_message(self, session_id, role, content, sources=None, usage=None, cards=None):
+            order.append(f"add_message:{role}")
+
+    mock_services["gemini"].chat_stream = fake_stream
+    app.dependency_overrides[get_history_service] = lambda: SlowHistory()
+
+    with client.stream(
+        "POST",
+        "/api/v1/chat/message",
+        json={"message": "Hi", "mode": ChatMode.STANDARD.value},
+    ) as response:
+        chunks = "".join(response.iter_text())
+
+    assert order.index("upstream") < order.index("create_session")
+    assert order[-1] == "add_message:assistant"
+    assert chunks.index("session_created") < chunks.index("\"type\":\"token\"")
+
+
+class _Rows(list):
+    def one(self):
+        return self[0]
+
+
+def test_answer_is_saved_when_deadline_passes_during_stream(client: TestClient, mock_services):
+    async def slow_stream(*_args, **_kwargs):
+        yield ChatStreamResponse(type="token", content="Hello")
+        await asyncio.sleep(0.3)
+        yield ChatStreamResponse(type="done")
+
+    db = MagicMock(
+        execute=AsyncMock(),
+        scalars=AsyncMock(return_value=_Rows([MagicMock(id=1)])),
+        commit=AsyncMock(),
+        rollback=AsyncMock(),
+    )
+    mock_services["gemini"].chat_stream = slow_stream
+    app.dependency_overrides[get_history_service] = lambda: HistoryService(db)
+
+    with client.stream(
+        "POST",
+        "/api/v1/chat/message",
+        json={"message": "Hi", "mode": ChatMode.STANDARD.value},
+        headers={"X-Request-Timeout": "0.2"},
+    ) as response:
+        chunks = "".join(response.iter_text())
+
+    assert "Error saving chat history" not in chunks
+    assert db.commit.await_count == 2
+    assistant = db.scalars.await_args_list[-1].args[1]
+    assert [m["content"] for m in assistant] == ["Hello"]
+
+
+def test_agent_cards_are_saved_on_the_answer_message(client: TestClient, mock_services):
+    card = PersonCard(name="Ada Lovelace", linkedin_url="https://linkedin.com/in/ada")
+
+    async def agent_stream(*_args, **_kwargs):
+        yield ChatStreamResponse(type="token", content="Found one.")
+        yield ChatStreamResponse(type="cards", cards=[card])
+        yield ChatStreamResponse(type="done")
+
+    history = FakeHistory()
+    app.dependency_overrides[get_history_service] = lambda: history
+    app.dependency_overrides[get_agent_service] = lambda: MagicMock(chat_stream=agent_stream)
+
+    with client.stream(
+        "POST",
+        "/api/v1/chat/message",
+        json={"message": "Find Ada", "mode": ChatMode.AGENT.value},
+    ) as response:
+        chunks = "".join(response.iter_text())
+
+    assert "\"type\":\"cards\"" in chunks
+    [answer] = [m for m in history.messages if m[0] == "assistant"]
+    assert answer[1] == "Found one."
+    assert [c["name"] for c in json.loads(answer[3])] == ["Ada Lovelace"]
@@ -0,0 +1,151 @@
+import hashlib
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_citation_previews, get_history_service, get_indexing_jobs, get_store_registry
+from app.api.v1.endpoints.file_search import file_search_events
+from app.main import app
+from app.schemas.chat import ChatStreamResponse
+from app.schemas.common import IndexingState
+from app.services.citation_preview import CitationContext
+from app.tests.api.fakes import FakeHistory
+
+
+def test_upload_returns_202_with_job(client: TestClient):
+    jobs = MagicMock()
+    jobs.submit.return_value = MagicMock(id="job-1", state=IndexingState.QUEUED)
+    history = FakeHistory()
+    app.dependency_overrides[get_history_service] = lambda: history
+    app.dependency_overrides[get_indexing_jobs] = lambda: jobs
+
+    response = client.post("/api/v1/file-search/upload", files={"file": ("deck.pdf", b"%PDF-1.4")})
+
+    assert response.status_code == 202
+    assert response.json()["job_id"] == "job-1"
+    assert response.json()["status"] == "queued"
+    assert jobs.submit.call_args.kwargs["session_id"] == history.sessions == 1
+    assert [f.file_name for f in history.files] == ["deck.pdf"]
+
+
+def test_chat_refuses_while_indexing(client: TestClient):
+    history = FakeHistory(status=IndexingState.INDEXING.value)
+    app.dependency_overrides[get_history_service] = lambda: history
+
+    response = client.post("/api/v1/file-search/chat", json={"session_id": 3, "message": "Summarise"})
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["code"] == "STILL_INDEXING"
+    assert history.loaded_messages is False
+
+
+def test_unknown_job_is_404(client: TestClient):
+    app.dependency_overrides[get_indexing_jobs] = lambda: MagicMock(get=MagicMock(return_value=None))
+
+    assert client.get("/api/v1/file-search/jobs/missing").status_code == 404
+
+
+def _accepting_jobs():
+    jobs = MagicMock()
+    jobs.submit.side_effect = lambda session_id, files, store_name=None: MagicMock(id="job-2", state=IndexingState.QUEUED)
+    return jobs
+
+
+def test_add_files_skips_content_already_in_store(client: TestClient):
+    history = FakeHistory(status=IndexingState.READY.value, store_name="fileSearchStores/room")
+    jobs = _accepting_jobs()
+    app.dependency_overrides[get_history_service] = lambda: history
+    app.dependency_overrides[get_indexing_jobs] = lambda: jobs
+    app.dependency_overrides[get_store_registry] = lambda: MagicMock(detach=AsyncMock(return_value=True))
+
+    files = [("files", ("a.pdf", b"alpha")), ("files", ("b.pdf", b"beta"))]
+    first = client.post("/api/v1/file-search/sessions/3/files", files=files)
+    for record in history.files:
+        record.status = IndexingState.READY.value
+    again = client.post(
+        "/api/v1/file-search/sessions/3/files",
+        files=[("files", ("a-copy.pdf", b"alpha")), ("files", ("c.pdf", b"gamma"))],
+    )
+
+    assert first.status_code == 202
+    assert again.status_code == 202
+    indexed = jobs.submit.call_args.kwargs["files"]
+    assert [f.file_name for f in indexed] == ["c.pdf"]
+    assert jobs.submit.call_args.kwargs["store_name"] == "fileSearchStores/room"
+    assert {f["file_name"]: f["state"] for f in again.json()["files"]} == {"c.pdf": "queued", "a.pdf": "ready"}
+    assert history.loaded_messages is False
+
+
+def test_add_files_reindexes_records_once_store_expired(client: TestClient):
+    history = FakeHistory(status=IndexingState.EXPIRED.value, store_name=None)
+    alpha = hashlib.sha256(b"alpha").hexdigest()
+    history.files = [MagicMock(id=7, file_name="a.pdf", content_hash=alpha, status=IndexingState.READY.value)]
+    jobs = _accepting_jobs()
+    app.dependency_overrides[get_history_service] = lambda: history
+    app.dependency_overrides[get_indexing_jobs] = lambda: jobs
+
+    response = client.post("/api/v1/file-search/sessions/3/files", files=[("files", ("a.pdf", b"alpha"))])
+
+    assert response.status_code == 202
+    indexed = jobs.submit.call_args.kwargs["files"]
+    assert [(f.file_name, f.record_id) for f in indexed] == [("a.pdf", 7)]
+    assert jobs.submit.call_args.kwargs["store_name"] is None
+
+
+def test_add_files_refused_for_shared_store(client: TestClient):
+    history = FakeHistory(status=IndexingState.READY.value, store_name="fileSearchStores/shared")
+    app.dependency_overrides[get_history_service] = lambda: history
+    app.dependency_overrides[get_store_registry] = lambda: MagicMock(detach=AsyncMock(return_value=False))
+
+    response = client.post("/api/v1/file-search/sessions/3/files", files=[("files", ("a.pdf", b"alpha"))])
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["code"] == "STORE_SHARED"
+
+
+def test_citation_preview_reads_local_index(client: TestClient, tmp_path):
+    history = FakeHistory(status=IndexingState.READY.value)
+    history.files = [MagicMock(content_hash="a" * 64), MagicMock(content_hash="b" * 64)]
+    previews = MagicMock()
+    previews.lookup.side_effect = lambda content_hash, chunk_id, window: (
+        CitationContext(file_name="deck.pdf", page=4, context="before cited", match_offset=7)
+        if content_hash == "b" * 64 else None
+    )
+    app.dependency_overrides[get_history_service] = lambda: history
+    app.dependency_overrides[get_citation_previews] = lambda: previews
+
+    response = client.get("/api/v1/file-search/sessions/3/citations/00112233aabbccdd/preview")
+
+    assert response.status_code == 200
+    assert response.json()["file_name"] == "deck.pdf"
+    assert response.json()["page"] == 4
+    assert client.get("/api/v1/file-search/sessions/3/citations/not-a-chunk/preview").status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_citations_of_unsharded_documents_get_their_page():
+    cited = [
+        {"source_title": "deck.pdf", "text_segment": "a", "chunk_id": "00112233aabbccdd"},
+        {"source_title": "big.pdf", "text_segment": "b", "chunk_id": "ffeeddccbbaa9988", "page_range": "pp. 51-100"},
+    ]
+
+    async def chat_with_file(**_kwargs):
+        yield ChatStreamResponse(type="token", content="Answer")
+        yield ChatStreamResponse(type="file_citation", content=json.dumps(cited))
+        yield ChatStreamResponse(type="done")
+
+    history = FakeHistory(status=IndexingState.READY.value)
+    history.files = [MagicMock(file_name="deck.pdf", content_hash="b" * 64)]
+    previews = MagicMock()
+    previews.page.side_effect = lambda content_hash, chunk_id: 7 if content_hash == "b" * 64 else None
+
+    events = [e async for e in file_search_events(
+        MagicMock(chat_with_file=chat_with_file), history, 3, "fileSearchStores/s", "Q?", "m", previews=previews
+    )]
+
+    [citation_event] = [e for e in events if e.type == "file_citation"]
+    assert [c["page_range"] for c in json.loads(citation_event.content)] == ["p. 7", "pp. 51-100"]
+    assert json.loads(history.messages[-1][2]) == json.loads(citation_event.content)
+    previews.page.assert_called_once_with("b" * 64, "00112233aabbccdd")
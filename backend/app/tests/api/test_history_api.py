@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_history_service
+from app.db.models import Message
+from app.main import app
+from app.services.history_service import MessageWindow, decode_cursor, encode_cursor
+
+
+class FakeHistory:
+    def __init__(self, messages, session=True):
+        self.messages = messages
+        self.session = MagicMock(id=1) if session else None
+        self.calls = []
+
+    async def get_session(self, session_id, include_messages=True):
+        return self.session
+
+    async def get_messages(self, session_id, limit=50, before=None, after=None):
+        self.calls.append({"limit": limit, "before": before, "after": after})
+        rows = self.messages[-limit:]
+        return MessageWindow(rows, has_more_before=len(self.messages) > limit, has_more_after=False)
+
+
+def _messages(count):
+    start = datetime(2025, 1, 1)
+    return [
+        Message(id=i + 1, session_id=1, role="user", content=f"m{i}", created_at=start + timedelta(seconds=i))
+        for i in range(count)
+    ]
+
+
+def test_messages_returns_latest_page_with_cursors(client: TestClient):
+    history = FakeHistory(_messages(5))
+    app.dependency_overrides[get_history_service] = lambda: history
+
+    response = client.get("/api/v1/sessions/1/messages?limit=2")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [m["content"] for m in body["messages"]] == ["m3", "m4"]
+    assert body["has_more_before"] is True
+    assert body["has_more_after"] is False
+    assert decode_cursor(body["before"]) == (history.messages[3].created_at, 4)
+    assert decode_cursor(body["after"]) == (history.messages[4].created_at, 5)
+
+
+def test_messages_passes_decoded_cursor(client: TestClient):
+    history = FakeHistory(_messages(3))
+    app.dependency_overrides[get_history_service] = lambda: history
+
+    cursor = encode_cursor(history.messages[2])
+    response = client.get("/api/v1/sessions/1/messages", params={"before": cursor})
+
+    assert response.status_code == 200
+    assert history.calls[0]["before"] == (history.messages[2].created_at, 3)
+
+
+def test_messages_rejects_bad_cursors(client: TestClient):
+    history = FakeHistory(_messages(3))
+    app.dependency_overrides[get_history_service] = lambda: history
+    cursor = encode_cursor(history.messages[0])
+
+    assert client.get("/api/v1/sessions/1/messages?before=not-a-cursor").status_code == 400
+    assert client.get("/api/v1/sessions/1/messages", params={"before": cursor, "after": cursor}).status_code == 400
+    assert history.calls == []
+
+
+def test_messages_missing_session_returns_404(client: TestClient):
+    app.dependency_overrides[get_history_service] = lambda: FakeHistory([], session=False)
+
+    assert client.get("/api/v1/sessions/9/messages").status_code == 404
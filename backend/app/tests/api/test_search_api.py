@@ -3,6 +3,9 @@ from unittest.mock import AsyncMock
 import pytest
 from fastapi.testclient import TestClient
 
+from app.api.deps import get_exa_admission
+from app.core.admission import AdmissionController
+from app.main import app
 from app.schemas.search import SearchRequest
 from app.services.exa_service import ExaSearchResult
 from app.schemas.search import PersonCard, CompanyCard
@@ -101,3 +104,17 @@ async def test_company_search_handles_error(client: TestClient, mock_services):
 
     assert response.status_code == 503
     assert response.json()["detail"]["code"] == "EXA_API_ERROR"
+
+
+def test_people_search_rejected_when_exa_saturated(client: TestClient):
+    saturated = AdmissionController("exa", max_concurrency=0, max_queue=0, max_wait=1.0)
+    app.dependency_overrides[get_exa_admission] = lambda: saturated
+
+    response = client.post(
+        "/api/v1/search/people",
+        json={"query": "engineer", "num_results": 1},
+    )
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert response.json()["detail"]["code"] == "UPSTREAM_OVERLOADED"
@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+from app.api.sse import HEARTBEAT_FRAME, POLICY_COALESCE, POLICY_DISCONNECT, POLICY_DROP, sse_stream
+from app.schemas.chat import ChatStreamResponse
+
+
+async def _burst(count: int):
+    for i in range(count):
+        yield ChatStreamResponse(type="token", content=str(i % 10))
+    yield ChatStreamResponse(type="citation", sources=[])
+    yield ChatStreamResponse(type="done")
+
+
+async def _read_slowly(stream, delay: float = 0.001):
+    frames = []
+    async for frame in stream:
+        frames.append(frame)
+        await asyncio.sleep(delay)
+    return frames
+
+
+def _events(frames):
+    return [json.loads(f[len("data: "):]) for f in frames if f.startswith("data: ")]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_keeps_full_text_in_fewer_frames():
+    frames = await _read_slowly(sse_stream(_burst(200), max_frames=4, policy=POLICY_COALESCE, heartbeat=5))
+    events = _events(frames)
+
+    text = "".join(e.get("content", "") for e in events if e["type"] == "token")
+    assert text == "".join(str(i % 10) for i in range(200))
+    assert len(events) < 202
+    assert [e["type"] for e in events[-2:]] == ["citation", "done"]
+
+
+@pytest.mark.asyncio
+async def test_drop_discards_tokens_but_keeps_structural_frames():
+    frames = await _read_slowly(sse_stream(_burst(200), max_frames=4, policy=POLICY_DROP, heartbeat=5))
+    events = _events(frames)
+
+    assert sum(1 for e in events if e["type"] == "token") < 200
+    assert [e["type"] for e in events[-2:]] == ["citation", "done"]
+
+
+@pytest.mark.asyncio
+async def test_disconnect_ends_stream_with_error():
+    closed = asyncio.Event()
+
+    async def upstream():
+        try:
+            async for event in _burst(200):
+                yield event
+        finally:
+            closed.set()
+
+    frames = await _read_slowly(sse_stream(upstream(), max_frames=4, policy=POLICY_DISCONNECT, heartbeat=5))
+    events = _events(frames)
+
+    assert events[-1]["type"] == "error"
+    assert all(e["type"] != "done" for e in events)
+    assert closed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_sent_while_upstream_is_idle():
+    async def thinking():
+        await asyncio.sleep(0.05)
+        yield ChatStreamResponse(type="done")
+
+    frames = [f async for f in sse_stream(thinking(), max_frames=4, policy=POLICY_COALESCE, heartbeat=0.01)]
+
+    assert HEARTBEAT_FRAME in frames
+    assert _events(frames) == [{"type": "done"}]
@@ -0,0 +1,78 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock
+
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_file_search_service, get_history_scope_factory
+from app.main import app
+from app.schemas.chat import ChatStreamResponse
+from app.schemas.common import ChatMode
+from app.tests.api.fakes import FakeHistory
+
+
+def _override_history():
+    history = FakeHistory()
+
+    @asynccontextmanager
+    async def scope():
+        yield history
+
+    app.dependency_overrides[get_history_scope_factory] = lambda: scope
+    app.dependency_overrides[get_file_search_service] = lambda: MagicMock()
+
+
+def _collect(ws, until):
+    frames = []
+    while not until(frames):
+        frames.append(ws.receive_json())
+    return frames
+
+
+def test_ws_multiplexes_streams_by_id(client: TestClient, mock_services):
+    async def fake_stream(message, *_args, **_kwargs):
+        for word in message.split():
+            yield ChatStreamResponse(type="token", content=word)
+        yield ChatStreamResponse(type="done")
+
+    mock_services["gemini"].chat_stream = fake_stream
+    _override_history()
+
+    with client.websocket_connect("/api/v1/ws") as ws:
+        for stream_id, message in (("a", "one two"), ("b", "three four")):
+            ws.send_json({"op": "chat", "stream_id": stream_id, "message": message, "mode": ChatMode.STANDARD.value})
+        frames = _collect(ws, lambda f: sum(1 for x in f if x["type"] == "end") == 2)
+
+    tokens = {
+        sid: [f["content"] for f in frames if f["stream_id"] == sid and f["type"] == "token"]
+        for sid in ("a", "b")
+    }
+    assert tokens == {"a": ["one", "two"], "b": ["three", "four"]}
+    assert all("stream_id" in f for f in frames)
+
+
+def test_ws_cancel_stops_one_stream(client: TestClient, mock_services):
+    async def endless_stream(*_args, **_kwargs):
+        yield ChatStreamResponse(type="token", content="tick")
+        await asyncio.sleep(60)
+
+    mock_services["gemini"].chat_stream = endless_stream
+    _override_history()
+
+    with client.websocket_connect("/api/v1/ws") as ws:
+        ws.send_json({"op": "chat", "stream_id": "slow", "message": "Hi", "mode": ChatMode.STANDARD.value})
+        _collect(ws, lambda f: any(x["type"] == "token" for x in f))
+        ws.send_json({"op": "cancel", "stream_id": "slow"})
+        frames = _collect(ws, lambda f: any(x["type"] == "cancelled" for x in f))
+
+    assert frames[-1] == {"type": "cancelled", "stream_id": "slow"}
+
+
+def test_ws_rejects_invalid_message(client: TestClient):
+    _override_history()
+
+    with client.websocket_connect("/api/v1/ws") as ws:
+        ws.send_json({"op": "unknown"})
+        frame = ws.receive_json()
+
+    assert frame["type"] == "error"
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import AdmissionController, AdmissionRejected
+
+
+@pytest.mark.asyncio
+async def test_admits_up_to_concurrency_limit():
+    controller = AdmissionController("test", max_concurrency=2, max_queue=0, max_wait=0.1)
+
+    first = await controller.acquire()
+    second = await controller.acquire()
+    assert controller.snapshot()["in_flight"] == 2
+
+    first.release()
+    second.release()
+    assert controller.snapshot()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_full():
+    controller = AdmissionController("test", max_concurrency=1, max_queue=0, max_wait=1.0)
+    permit = await controller.acquire()
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await controller.acquire()
+
+    assert exc_info.value.retry_after >= 1
+    assert controller.rejected_total == 1
+    permit.release()
+
+
+@pytest.mark.asyncio
+async def test_queued_request_gets_released_slot():
+    controller = AdmissionController("test", max_concurrency=1, max_queue=1, max_wait=1.0)
+    permit = await controller.acquire()
+
+    waiter = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+    assert controller.snapshot()["queue_depth"] == 1
+
+    permit.release()
+    second = await waiter
+    assert controller.snapshot()["in_flight"] == 1
+    assert controller.snapshot()["queue_depth"] == 0
+    second.release()
+    assert controller.snapshot()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_times_out():
+    controller = AdmissionController("test", max_concurrency=1, max_queue=1, max_wait=0.05)
+    permit = await controller.acquire()
+
+    with pytest.raises(AdmissionRejected):
+        await controller.acquire()
+
+    permit.release()
+    assert controller.snapshot()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_release_is_idempotent():
+    controller = AdmissionController("test", max_concurrency=1, max_queue=0, max_wait=0.1)
+    async with controller.admit() as permit:
+        pass
+    permit.release()
+
+    assert controller.snapshot()["in_flight"] == 0
+    assert controller.admitted_total == 1
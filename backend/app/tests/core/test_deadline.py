@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.deadline import (
+    DEADLINE_HEADER,
+    Deadline,
+    DeadlineExceeded,
+    RequestDeadline,
+    current_deadline,
+    within_deadline,
+)
+
+
+def test_deadline_remaining_and_check():
+    deadline = Deadline(10)
+    assert 9 < deadline.remaining() <= 10
+    assert deadline.timeout(cap=2) == 2
+    deadline.check("stage")
+
+    expired = Deadline(0)
+    with pytest.raises(DeadlineExceeded) as exc_info:
+        expired.check("exa")
+    assert exc_info.value.stage == "exa"
+
+
+@pytest.mark.asyncio
+async def test_deadline_wait_times_out():
+    deadline = Deadline(0.05)
+    with pytest.raises(DeadlineExceeded):
+        await deadline.wait(asyncio.sleep(1), "slow")
+
+
+@pytest.mark.asyncio
+async def test_bound_stream_fails_on_stalled_item():
+    async def stalled():
+        yield 1
+        await asyncio.sleep(1)
+        yield 2
+
+    deadline = Deadline(0.05)
+    received = []
+    with pytest.raises(DeadlineExceeded):
+        async for item in deadline.bound_stream(stalled(), "stream"):
+            received.append(item)
+    assert received == [1]
+
+
+@pytest.mark.asyncio
+async def test_within_deadline_without_active_deadline():
+    assert current_deadline() is None
+    assert await within_deadline(asyncio.sleep(0, result="ok"), "noop") == "ok"
+
+
+def test_request_deadline_header_only_shortens_budget():
+    app = FastAPI()
+
+    @app.get("/budget")
+    async def budget(deadline: Deadline = Depends(RequestDeadline(30))):
+        return {"budget": deadline.budget, "bound": current_deadline() is deadline}
+
+    client = TestClient(app)
+
+    assert client.get("/budget").json() == {"budget": 30, "bound": True}
+    assert client.get("/budget", headers={DEADLINE_HEADER: "5"}).json()["budget"] == 5
+    assert client.get("/budget", headers={DEADLINE_HEADER: "300"}).json()["budget"] == 30
+    assert client.get("/budget", headers={DEADLINE_HEADER: "abc"}).json()["budget"] == 30
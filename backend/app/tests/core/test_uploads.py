@@ -0,0 +1,91 @@
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from app.core.uploads import UploadSizeLimitMiddleware, UploadTooLarge, spool_upload
+from app.main import app as main_app
+
+
+def _upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="doc.txt", headers=Headers({}))
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_copies_and_hashes_in_chunks():
+    data = os.urandom(10_000)
+
+    upload = await spool_upload(_upload(data), max_bytes=20_000, chunk_size=1024, suffix=".txt")
+    try:
+        assert upload.size == len(data)
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        assert upload.path.endswith(".txt")
+        with open(upload.path, "rb") as f:
+            assert f.read() == data
+    finally:
+        os.unlink(upload.path)
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_rejects_oversized_file_and_cleans_up(tmp_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+
+    with pytest.raises(UploadTooLarge) as exc:
+        await spool_upload(_upload(b"x" * 5000), max_bytes=4096, chunk_size=1024)
+
+    assert exc.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def _limited_app(max_bytes: int) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_bytes=max_bytes, paths=["/upload"])
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.post("/other")
+    async def other(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return TestClient(app)
+
+
+def test_middleware_rejects_declared_oversized_body():
+    client = _limited_app(max_bytes=1024)
+    big = b"x" * (200 * 1024)
+
+    response = client.post("/upload", files={"file": ("big.bin", big)})
+
+    assert response.status_code == 413
+    assert response.json()["detail"]["code"] == "FILE_TOO_LARGE"
+    assert client.post("/other", files={"file": ("big.bin", big)}).status_code == 200
+
+
+def test_middleware_aborts_chunked_oversized_body():
+    client = _limited_app(max_bytes=1024)
+
+    def body():
+        for _ in range(200):
+            yield b"x" * 1024
+
+    response = client.post(
+        "/upload",
+        content=body(),
+        headers={"content-type": "multipart/form-data; boundary=abc"},
+    )
+
+    assert response.status_code == 413
+
+
+def test_cors_wraps_upload_limits():
+    # --- Outermost first: 413s from the size limit must still carry CORS headers ---
+    layers = [m.cls for m in main_app.user_middleware]
+    assert layers[0] is CORSMiddleware
+    assert UploadSizeLimitMiddleware in layers[1:]
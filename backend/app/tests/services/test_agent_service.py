@@ -0,0 +1,88 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.admission import AdmissionController
+from app.schemas.chat import ChatStreamResponse
+from app.schemas.common import CardType, ChatMode, SearchCategory
+from app.schemas.search import CompanyCard
+from app.services.agent_service import AgentService, classify_intent
+from app.services.exa_service import ExaSearchResult
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("who are the top ML leads at fintechs in Paris", SearchCategory.PEOPLE),
+        ("Seed-stage AI startups in London", SearchCategory.COMPANY),
+        ("Explain transformer attention", None),
+    ],
+)
+def test_classify_intent(message, expected):
+    assert classify_intent(message) == expected
+
+
+def _company_result():
+    return ExaSearchResult(
+        request_id="req",
+        results=[CompanyCard(card_type=CardType.COMPANY, name="Acme", industry="AI")],
+    )
+
+
+@pytest.fixture
+def agent():
+    gemini = MagicMock()
+    exa = MagicMock()
+    exa.search_people = AsyncMock(return_value=ExaSearchResult(request_id="req", results=[]))
+    exa.search_companies = AsyncMock(return_value=_company_result())
+    return AgentService(gemini, exa)
+
+
+@pytest.mark.asyncio
+async def test_agent_interleaves_cards_before_done(agent):
+    async def narrative(message, mode, model):
+        assert mode == ChatMode.WEB_SEARCH
+        yield ChatStreamResponse(type="token", content="Here are")
+        await asyncio.sleep(0.01)
+        yield ChatStreamResponse(type="token", content=" some startups")
+        yield ChatStreamResponse(type="done")
+
+    agent.gemini.chat_stream = narrative
+
+    events = [e async for e in agent.chat_stream("AI startups in London")]
+    types = [e.type for e in events]
+
+    assert types.count("done") == 1 and types[-1] == "done"
+    assert "cards" in types
+    cards = next(e for e in events if e.type == "cards").cards
+    assert cards[0].name == "Acme"
+    agent.exa.search_companies.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_agent_skips_search_without_intent(agent):
+    async def narrative(message, mode, model):
+        yield ChatStreamResponse(type="token", content="Attention is...")
+        yield ChatStreamResponse(type="done")
+
+    agent.gemini.chat_stream = narrative
+
+    events = [e async for e in agent.chat_stream("Explain transformer attention")]
+
+    assert [e.type for e in events] == ["token", "done"]
+    agent.exa.search_people.assert_not_called()
+    agent.exa.search_companies.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_agent_drops_cards_when_exa_saturated(agent):
+    async def narrative(message, mode, model):
+        yield ChatStreamResponse(type="done")
+
+    agent.gemini.chat_stream = narrative
+    agent.exa_admission = AdmissionController("exa", max_concurrency=0, max_queue=0, max_wait=0.1)
+
+    events = [e async for e in agent.chat_stream("AI startups in London")]
+
+    assert [e.type for e in events] == ["done"]
@@ -0,0 +1,40 @@
+from app.services.answer_cache import AnswerCache
+
+
+def test_near_identical_questions_share_an_entry():
+    cache = AnswerCache(ttl=60, max_entries=10)
+    cache.put("store-a", "Summarize the key risks?", "m", "Risks: ...", [{"source_title": "r.pdf"}], 0)
+
+    hit = cache.get("store-a", "  summarize THE key   risks ", "m")
+
+    assert hit is not None and hit.text == "Risks: ..."
+    assert cache.get("store-a", "Summarize the key risks", "other-model") is None
+    assert cache.get("store-b", "Summarize the key risks", "m") is None
+
+
+def test_invalidate_drops_entries_and_rejects_stale_puts():
+    cache = AnswerCache(ttl=60, max_entries=10)
+    generation = cache.generation("store-a")
+    cache.put("store-a", "q", "m", "old", [], generation)
+
+    assert cache.invalidate("store-a") == 1
+    assert cache.get("store-a", "q", "m") is None
+
+    # --- An answer generated before the change must not be cached after it ---
+    cache.put("store-a", "q", "m", "old", [], generation)
+    assert cache.get("store-a", "q", "m") is None
+
+
+def test_expired_and_least_recently_used_entries_are_evicted():
+    cache = AnswerCache(ttl=60, max_entries=2)
+    cache.put("s", "one", "m", "1", [], 0)
+    cache.put("s", "two", "m", "2", [], 0)
+    cache.get("s", "one", "m")
+    cache.put("s", "three", "m", "3", [], 0)
+
+    assert cache.get("s", "two", "m") is None
+    assert cache.get("s", "one", "m") is not None
+
+    expired = AnswerCache(ttl=0, max_entries=2)
+    expired.put("s", "q", "m", "a", [], 0)
+    assert expired.get("s", "q", "m") is None
@@ -0,0 +1,20 @@
+from app.services.chunking import select_profile
+from app.services.file_search_service import chunking_key
+
+MB = 1024 * 1024
+
+
+def test_profiles_follow_mime_type_and_size():
+    assert select_profile("prices.csv", 10 * MB).name == "tabular"
+    assert select_profile("export.bin", 10, mime_type="application/json").name == "tabular"
+    assert select_profile("annual-report.pdf", 20 * MB).name == "prose"
+    assert select_profile("memo.pdf", 40_000).name == "default"
+    assert select_profile("slides.pptx", 20 * MB).name == "default"
+
+
+def test_profile_is_part_of_the_dedup_key():
+    small = chunking_key(select_profile("memo.pdf", 40_000).config)
+    large = chunking_key(select_profile("memo.pdf", 20 * MB).config)
+
+    assert small == "ws:300:30"
+    assert large != small
@@ -0,0 +1,78 @@
+import hashlib
+
+from app.services.citation_preview import CitationPreviewIndex, fingerprint, settings
+from app.services.local_rag import whitespace_chunks
+
+HASH = hashlib.sha256(b"doc").hexdigest()
+
+
+def build(tmp_path, text, name="report.txt"):
+    path = tmp_path / "upload"
+    path.write_text(text)
+    index = CitationPreviewIndex(str(tmp_path / "previews"))
+    assert index.build(HASH, str(path), name)
+    return index
+
+
+def test_retrieved_chunk_resolves_to_its_surrounding_passage(tmp_path):
+    words = [f"w{i}" for i in range(2000)]
+    words[1000:1004] = ["Net", "revenue", "grew", "twelve"]
+    index = build(tmp_path, " ".join(words))
+    # --- A chunk as the upstream whitespace chunker would return it ---
+    chunk = whitespace_chunks([" ".join(words)], 300, 30)[1]
+    assert chunk.text.startswith("w270")
+
+    context = index.lookup(HASH, fingerprint(chunk.text), window_chars=40)
+
+    assert context.file_name == "report.txt"
+    assert context.context[context.match_offset:].startswith("w270 w271")
+    assert context.match_offset == 40
+    assert context.page is None
+
+
+def test_page_map_locates_chunks_of_unsharded_documents(tmp_path):
+    pages = [" ".join(f"p{page}w{i}" for i in range(400)) for page in range(1, 4)]
+    (tmp_path / "deck.pdf").write_bytes(b"%PDF")
+    index = CitationPreviewIndex(str(tmp_path / "previews"))
+    assert index.build(HASH, str(tmp_path / "deck.pdf"), "deck.pdf", pages=pages)
+
+    chunks = whitespace_chunks(pages, 300, 30)
+    assert [index.page(HASH, fingerprint(c.text)) for c in chunks] == [c.first_page for c in chunks]
+    assert index.page(HASH, fingerprint("not in this document at all, no")) is None
+
+
+def test_only_chunk_starts_are_indexed_restarting_at_each_shard(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "FILE_SEARCH_SHARD_MIN_PAGES", 4)
+    monkeypatch.setattr(settings, "FILE_SEARCH_SHARD_PAGES", 2)
+    pages = [" ".join(f"p{page}w{i}" for i in range(500)) for page in range(1, 5)]
+    (tmp_path / "deck.pdf").write_bytes(b"%PDF")
+    index = CitationPreviewIndex(str(tmp_path / "previews"))
+    assert index.build(HASH, str(tmp_path / "deck.pdf"), "deck.pdf", pages=pages)
+
+    # --- Each shard (pages 1-2, 3-4) is chunked from its own start ---
+    for first in (0, 2):
+        for chunk in whitespace_chunks(pages[first:first + 2], 300, 30):
+            assert index.page(HASH, fingerprint(chunk.text)) == first + chunk.first_page
+    assert index.lookup(HASH, fingerprint("p1w1 p1w2 p1w3 p1w4 p1w5 p1w6 p1w7 p1w8"), 10) is None
+    assert (tmp_path / "previews" / HASH / "index.bin").stat().st_size < len(" ".join(pages)) // 20
+
+
+def test_unknown_chunk_or_document_is_none(tmp_path):
+    index = build(tmp_path, "alpha beta gamma delta epsilon zeta eta theta iota")
+
+    assert index.lookup(HASH, fingerprint("not in this document at all, no"), 100) is None
+    assert index.lookup(hashlib.sha256(b"other").hexdigest(), fingerprint("alpha beta"), 100) is None
+    assert index.lookup(HASH, "../../etc", 100) is None
+
+
+def test_unsupported_formats_are_skipped_and_pruned(tmp_path):
+    path = tmp_path / "upload"
+    path.write_bytes(b"\x00")
+    index = CitationPreviewIndex(str(tmp_path / "previews"))
+
+    assert index.build(HASH, str(path), "deck.pptx") is False
+
+    build(tmp_path, "one two three")
+    assert index.prune(keep={HASH}, older_than_s=0) == 0
+    assert index.prune(keep=set(), older_than_s=0) == 1
+    assert not index.exists(HASH)
@@ -0,0 +1,48 @@
+from unittest.mock import MagicMock
+
+from app.schemas.chat import SourceCitation
+from app.schemas.file_search import FileSearchCitation
+from app.services.citations import CitationCollector, file_citation_key, web_citation_key
+
+
+def _chunk(*citations):
+    candidate = MagicMock()
+    candidate.citations = list(citations)
+    return MagicMock(candidates=[candidate])
+
+
+def test_collector_returns_only_new_web_sources():
+    collector = CitationCollector(lambda c: c.citations, web_citation_key)
+    a = SourceCitation(title="A", url="https://a")
+    b = SourceCitation(title="B", url="https://b")
+
+    assert collector.collect(_chunk(a)) == [a]
+    assert collector.collect(_chunk(a, b)) == [b]
+    assert collector.collect(_chunk(a, b)) == []
+    assert collector.citations == [a, b]
+
+
+def test_collector_dedupes_file_spans_without_chunk_ids():
+    collector = CitationCollector(lambda c: c.citations, file_citation_key)
+    first = FileSearchCitation(source_title="deck.pdf", text_segment="x", start_index=0, end_index=1)
+    same_span = FileSearchCitation(source_title="deck.pdf", text_segment="x", start_index=0, end_index=1)
+    other_span = FileSearchCitation(source_title="deck.pdf", text_segment="y", start_index=2, end_index=3)
+
+    assert collector.collect(_chunk(first)) == [first]
+    assert collector.collect(_chunk(same_span, other_span)) == [other_span]
+
+
+def test_collector_cites_each_retrieved_chunk_once():
+    collector = CitationCollector(lambda c: c.citations, file_citation_key)
+    first = FileSearchCitation(source_title="deck.pdf", text_segment="x", start_index=0, end_index=1, chunk_id="a" * 16)
+    same_chunk = FileSearchCitation(source_title="deck.pdf", text_segment="y", start_index=5, end_index=9, chunk_id="a" * 16)
+    other_chunk = FileSearchCitation(source_title="deck.pdf", text_segment="y", start_index=5, end_index=9, chunk_id="b" * 16)
+    other_document = FileSearchCitation(source_title="memo.pdf", text_segment="x", start_index=0, end_index=1, chunk_id="a" * 16)
+
+    assert collector.collect(_chunk(first, same_chunk)) == [first]
+    assert collector.collect(_chunk(same_chunk, other_chunk, other_document)) == [other_chunk, other_document]
+
+
+def test_collector_handles_chunks_without_candidates():
+    collector = CitationCollector(lambda c: c.citations, web_citation_key)
+    assert collector.collect(MagicMock(candidates=None)) == []
@@ -1,19 +1,22 @@
+import asyncio
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from app.core.deadline import Deadline, DeadlineExceeded, set_current_deadline
 from app.schemas.common import CardType
-from app.services.exa_service import ExaSearchResult, ExaService
+from app.services.exa_service import ExaService
 
 
 @pytest.fixture
 def exa_service():
     """Instantiate ExaService with the Exa SDK patched."""
-    with patch("app.services.exa_service.Exa"):
+    with patch("app.services.exa_service.AsyncExa"):
         service = ExaService()
         # Replace the real client with a MagicMock so we can control responses
         service.client = MagicMock()
+        service.client.search_and_contents = AsyncMock()
         yield service
 
 
@@ -58,7 +61,8 @@ def test_is_linkedin_url(exa_service):
     assert exa_service._is_linkedin_url("https://example.com") is False
 
 
-def test_search_people_sync_success(exa_service):
+@pytest.mark.asyncio
+async def test_search_people_success(exa_service):
     response = MagicMock()
     response.requestId = "req_people"
     response.results = [
@@ -76,7 +80,7 @@ def test_search_people_sync_success(exa_service):
     ]
     exa_service.client.search_and_contents.return_value = response
 
-    result = exa_service._search_people_sync("ml engineer", 3)
+    result = await exa_service.search_people("ml engineer", 3)
 
     assert result.request_id == "req_people"
     assert len(result.results) == 1
@@ -91,16 +95,18 @@ def test_search_people_sync_success(exa_service):
     assert "linkedin.com" in str(card.linkedin_url)
 
 
-def test_search_people_sync_handles_exception(exa_service):
+@pytest.mark.asyncio
+async def test_search_people_handles_exception(exa_service):
     exa_service.client.search_and_contents.side_effect = RuntimeError("boom")
 
-    result = exa_service._search_people_sync("query", 2)
+    result = await exa_service.search_people("query", 2)
 
     assert result.request_id == "error"
     assert result.results == []
 
 
-def test_search_companies_sync_success(exa_service):
+@pytest.mark.asyncio
+async def test_search_companies_success(exa_service):
     response = MagicMock()
     response.requestId = "req_companies"
     response.results = [
@@ -121,7 +127,7 @@ def test_search_companies_sync_success(exa_service):
     ]
     exa_service.client.search_and_contents.return_value = response
 
-    result = exa_service._search_companies_sync("ai startups", 4)
+    result = await exa_service.search_companies("ai startups", 4)
 
     assert result.request_id == "req_companies"
     assert len(result.results) == 1
@@ -136,40 +142,44 @@ def test_search_companies_sync_success(exa_service):
     assert company.estimated_employees == "51-100"
 
 
-def test_search_companies_sync_handles_exception(exa_service):
+@pytest.mark.asyncio
+async def test_search_companies_handles_exception(exa_service):
     exa_service.client.search_and_contents.side_effect = ValueError("bad request")
 
-    result = exa_service._search_companies_sync("query", 1)
+    result = await exa_service.search_companies("query", 1)
 
     assert result.request_id == "error"
     assert result.results == []
 
 
+def test_http_client_has_timeout():
+    with patch("app.services.exa_service.settings") as settings:
+        settings.EXA_API_KEY = "key"
+        settings.EXA_TIMEOUT_S = 7.5
+        service = ExaService()
+
+    assert service.client.client.timeout.read == 7.5
+
+
 @pytest.mark.asyncio
-async def test_search_people_async_wrapper(exa_service):
-    with patch(
-        "app.services.exa_service.run_in_threadpool", new_callable=AsyncMock
-    ) as mock_threadpool:
-        mock_threadpool.return_value = ExaSearchResult(request_id="async", results=[])
+async def test_search_people_raises_when_deadline_expires(exa_service):
+    async def slow_search(*_args, **_kwargs):
+        await asyncio.sleep(1)
 
-        result = await exa_service.search_people("async query", 5)
+    exa_service.client.search_and_contents.side_effect = slow_search
+    set_current_deadline(Deadline(0.05))
 
-        assert result.request_id == "async"
-        mock_threadpool.assert_awaited_once_with(
-            exa_service._search_people_sync, "async query", 5
-        )
+    with pytest.raises(DeadlineExceeded):
+        await exa_service.search_people("query", 2)
 
 
 @pytest.mark.asyncio
-async def test_search_companies_async_wrapper(exa_service):
-    with patch(
-        "app.services.exa_service.run_in_threadpool", new_callable=AsyncMock
-    ) as mock_threadpool:
-        mock_threadpool.return_value = ExaSearchResult(request_id="async", results=[])
+async def test_search_companies_raises_when_deadline_expires(exa_service):
+    async def slow_search(*_args, **_kwargs):
+        await asyncio.sleep(1)
 
-        result = await exa_service.search_companies("async query", 2)
+    exa_service.client.search_and_contents.side_effect = slow_search
+    set_current_deadline(Deadline(0.05))
 
-        assert result.request_id == "async"
-        mock_threadpool.assert_awaited_once_with(
-            exa_service._search_companies_sync, "async query", 2
-        )
+    with pytest.raises(DeadlineExceeded):
+        await exa_service.search_companies("query", 2)
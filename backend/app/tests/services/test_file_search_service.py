@@ -0,0 +1,217 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.schemas.common import IndexingState
+from app.services.answer_cache import AnswerCache
+from app.services.citation_preview import fingerprint
+from app.services.file_search_service import FileSearchService
+from app.services.local_rag import Passage
+from app.services.preprocessing import PreparedDocument
+from app.services.text_extraction import Shard
+
+
+class FakeRegistry:
+    """
+        In-memory StoreRegistry with the same reference-count semantics.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    async def acquire(self, content_hash, chunking_key):
+        entry = self.entries.get((content_hash, chunking_key))
+        if entry is None or entry.ref_count <= 0:
+            return None
+        entry.ref_count += 1
+        return entry
+
+    async def register(self, content_hash, chunking_key, store_name, file_name, size_bytes):
+        if (content_hash, chunking_key) in self.entries:
+            return None
+        entry = MagicMock(store_name=store_name, file_name=file_name, ref_count=1)
+        self.entries[(content_hash, chunking_key)] = entry
+        return entry
+
+    async def release(self, store_name):
+        for key, entry in list(self.entries.items()):
+            if entry.store_name == store_name:
+                entry.ref_count -= 1
+                if entry.ref_count <= 0:
+                    del self.entries[key]
+                    return True
+                return False
+        return True
+
+
+@pytest.fixture
+def file_search_service():
+    with patch("app.services.file_search_service.genai.Client"):
+        service = FileSearchService()
+    service.create_store_and_upload = AsyncMock(return_value=("fileSearchStores/a", "deck.pdf"))
+    service.delete_store = AsyncMock()
+    return service
+
+
+@pytest.mark.asyncio
+async def test_repeat_upload_reuses_indexed_store(file_search_service):
+    registry = FakeRegistry()
+
+    first = await file_search_service.upload_or_reuse(registry, "/tmp/a", "deck.pdf", "abc", 10)
+    second = await file_search_service.upload_or_reuse(registry, "/tmp/b", "deck (1).pdf", "abc", 10)
+
+    assert first == ("fileSearchStores/a", "deck.pdf", False)
+    assert second == ("fileSearchStores/a", "deck (1).pdf", True)
+    file_search_service.create_store_and_upload.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_store_deleted_only_when_last_reference_released(file_search_service):
+    registry = FakeRegistry()
+    await file_search_service.upload_or_reuse(registry, "/tmp/a", "deck.pdf", "abc", 10)
+    await file_search_service.upload_or_reuse(registry, "/tmp/a", "deck.pdf", "abc", 10)
+
+    assert await file_search_service.release_store(registry, "fileSearchStores/a") is False
+    file_search_service.delete_store.assert_not_awaited()
+
+    assert await file_search_service.release_store(registry, "fileSearchStores/a") is True
+    file_search_service.delete_store.assert_awaited_once_with("fileSearchStores/a")
+
+
+@pytest.mark.asyncio
+async def test_dedup_race_keeps_winner_and_deletes_duplicate(file_search_service):
+    registry = FakeRegistry()
+    winner = MagicMock(store_name="fileSearchStores/winner", file_name="deck.pdf", ref_count=1)
+
+    async def index_while_another_upload_wins(*_args, **_kwargs):
+        registry.entries[("abc", "ws:300:30")] = winner
+        return "fileSearchStores/loser", "deck.pdf"
+
+    file_search_service.create_store_and_upload = index_while_another_upload_wins
+
+    result = await file_search_service.upload_or_reuse(registry, "/tmp/a", "deck.pdf", "abc", 10)
+
+    assert result == ("fileSearchStores/winner", "deck.pdf", True)
+    assert winner.ref_count == 2
+    file_search_service.delete_store.assert_awaited_once_with("fileSearchStores/loser")
+
+
+@pytest.mark.asyncio
+async def test_large_document_uploads_shards_concurrently(file_search_service, tmp_path):
+    shards = [
+        Shard(path=f"/tmp/shard-{i}", display_name=f"report.pdf [pp. {i * 50 + 1}-{i * 50 + 50}]", page_range="")
+        for i in range(3)
+    ]
+    in_flight = 0
+    peak = 0
+
+    async def upload(store_name, file_path, display_name, report, chunking):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        report(IndexingState.INDEXING)
+        in_flight -= 1
+
+    states = []
+    document = tmp_path / "report.pdf"
+    document.write_bytes(b"%PDF")
+    file_search_service._upload_one = upload
+    with patch("app.services.file_search_service.shard_document", return_value=shards), \
+            patch("app.services.file_search_service.remove_shards") as remove:
+        name = await file_search_service.upload_to_store("fileSearchStores/a", str(document), "report.pdf", states.append)
+
+    assert name == "report.pdf"
+    assert peak == 3
+    assert states == [IndexingState.UPLOADING, IndexingState.INDEXING]
+    remove.assert_called_once_with(shards)
+
+
+@pytest.mark.asyncio
+async def test_preprocessed_document_uploads_compact_text(file_search_service, tmp_path):
+    compact = tmp_path / "compact.txt"
+    compact.write_text("Revenue grew 12%.")
+    prepared = PreparedDocument(path=str(compact), pages=["Revenue grew 12%."], original_bytes=9000, compact_bytes=17)
+    file_search_service.preprocessor = MagicMock(prepare=AsyncMock(return_value=prepared))
+    file_search_service._upload_one = AsyncMock()
+    document = tmp_path / "report.pdf"
+    document.write_bytes(b"%PDF")
+
+    await file_search_service.upload_to_store("fileSearchStores/a", str(document), "report.pdf")
+
+    args = file_search_service._upload_one.await_args.args
+    assert args[1:3] == (str(compact), "report.pdf")
+    assert not compact.exists()
+
+
+def test_citations_from_shards_name_the_original_file(file_search_service):
+    chunk = MagicMock()
+    chunk.retrieved_context.title = "report.pdf [pp. 51-100]"
+    chunk.retrieved_context.text = "Revenue grew in every region during the second half."
+    support = MagicMock(grounding_chunk_indices=[0])
+    support.segment.text = "Revenue grew."
+    candidate = MagicMock()
+    candidate.grounding_metadata.grounding_chunks = [chunk]
+    candidate.grounding_metadata.grounding_supports = [support]
+
+    [citation] = file_search_service._extract_file_citations(candidate)
+
+    assert citation.source_title == "report.pdf"
+    assert citation.page_range == "pp. 51-100"
+    assert citation.chunk_id == fingerprint(chunk.retrieved_context.text)
+
+
+@pytest.mark.asyncio
+async def test_local_store_answers_from_retrieved_passages(file_search_service):
+    passage = Passage(title="report.txt", text="Revenue grew 12%.", page_range=None, score=1.0)
+    file_search_service.local_rag = MagicMock(search=AsyncMock(return_value=[passage]))
+
+    async def stream():
+        yield MagicMock(text="It grew 12%.", candidates=[], usage_metadata=None)
+
+    generate = AsyncMock(return_value=stream())
+    file_search_service.client.aio.models.generate_content_stream = generate
+
+    events = [e async for e in file_search_service.chat_with_file("local/warm-ai-abc", "Revenue growth?")]
+
+    assert [e.type for e in events] == ["token", "file_citation", "done"]
+    assert "Revenue grew 12%." in generate.call_args.kwargs["contents"]
+    assert json.loads(events[1].content)[0]["source_title"] == "report.txt"
+
+
+@pytest.mark.asyncio
+async def test_local_store_refused_when_local_backend_disabled(file_search_service, tmp_path):
+    file_search_service.local_rag = None
+    path = tmp_path / "notes.txt"
+    path.write_text("Revenue grew 12%.")
+
+    with pytest.raises(RuntimeError):
+        await file_search_service.upload_to_store("local/warm-ai-abc", str(path), "notes.txt")
+    events = [e async for e in file_search_service.chat_with_file("local/warm-ai-abc", "Revenue growth?")]
+
+    assert [e.type for e in events] == ["error"]
+
+
+@pytest.mark.asyncio
+async def test_repeat_question_is_replayed_from_answer_cache(file_search_service):
+    file_search_service.answer_cache = AnswerCache(ttl=60, max_entries=10)
+
+    async def stream():
+        yield MagicMock(text="The key risks are FX and churn.", candidates=[], usage_metadata=None)
+
+    generate = AsyncMock(side_effect=lambda **_kwargs: stream())
+    file_search_service.client.aio.models.generate_content_stream = generate
+
+    first = [e async for e in file_search_service.chat_with_file("fileSearchStores/a", "Summarize the key risks")]
+    second = [e async for e in file_search_service.chat_with_file("fileSearchStores/a", "summarize the key risks?")]
+
+    assert generate.await_count == 1
+    assert [e.type for e in second] == ["token", "done"]
+    assert second[0].content == first[0].content
+    assert second[-1].usage.output_tokens == 0
+
+    file_search_service._invalidate_answers("fileSearchStores/a")
+    [e async for e in file_search_service.chat_with_file("fileSearchStores/a", "Summarize the key risks")]
+    assert generate.await_count == 2
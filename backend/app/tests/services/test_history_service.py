@@ -0,0 +1,137 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, select
+
+from app.core.deadline import Deadline, DeadlineExceeded, set_current_deadline
+from app.db.models import Message, Session, SessionFile
+from app.schemas.chat import UsageStats
+from app.schemas.common import ChatMode
+from app.services.history_service import HistoryService
+
+
+@pytest_asyncio.fixture
+async def sqlite():
+    """
+        In-memory SQLite session; `db.statements` collects the SQL sent.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda _conn, _cursor, statement, *_args: statements.append(statement)
+    )
+    set_current_deadline(Deadline(10))
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+        db.statements = statements
+        yield db
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_commit_is_skipped_once_deadline_expired():
+    db = MagicMock(commit=AsyncMock())
+    set_current_deadline(Deadline(0))
+
+    with pytest.raises(DeadlineExceeded):
+        await HistoryService(db)._commit()
+
+    db.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_background_writes_commit_after_deadline():
+    db = MagicMock(commit=AsyncMock())
+    set_current_deadline(Deadline(0))
+
+    await HistoryService(db, deadline_bound=False)._commit()
+
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_commit_is_not_cancelled_by_deadline():
+    db = MagicMock(commit=AsyncMock())
+    set_current_deadline(Deadline(10))
+
+    await HistoryService(db)._commit()
+
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_flush_marks_session_used_even_without_messages():
+    db = MagicMock(execute=AsyncMock(), scalars=AsyncMock(return_value=[]), commit=AsyncMock())
+    set_current_deadline(Deadline(10))
+
+    await HistoryService(db).batch(3).add_files([]).flush()
+
+    statement = db.execute.await_args.args[0]
+    assert statement.is_update and statement.table.name == "session"
+    assert "updated_at" in str(statement)
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_add_message_inserts_and_bumps_session_without_loading_messages(sqlite):
+    history = HistoryService(sqlite)
+    session = await history.create_session("Chat", ChatMode.STANDARD)
+    await history.add_message(session.id, "user", "first")
+    sqlite.statements.clear()
+
+    message = await history.add_message(session.id, "assistant", "second")
+
+    sent = [s.split()[0:3] for s in sqlite.statements]
+    assert sent == [["UPDATE", "session", "SET"], ["INSERT", "INTO", "message"]]
+    assert "updated_at" in sqlite.statements[0]
+    assert not any(s.startswith("SELECT") for s in sqlite.statements)
+    assert message.id == 2 and message.content == "second"
+
+
+def _file(content_hash):
+    return SessionFile(file_name=f"{content_hash}.pdf", content_hash=content_hash, size_bytes=1)
+
+
+@pytest.mark.asyncio
+async def test_flush_inserts_each_table_once_with_ids_in_queue_order(sqlite):
+    batch = await (
+        HistoryService(sqlite).batch()
+        .create_session("Deck", ChatMode.FILE_SEARCH, file_name="deck.pdf")
+        .add_message("user", "question")
+        .add_message("assistant", "answer", usage=UsageStats(model="m", input_tokens=3))
+        .add_message("user", "follow-up")
+        .add_files([_file("b"), _file("a")])
+        .flush()
+    )
+
+    # --- SQLite has no insert sentinel, so ordered RETURNING goes row by row; one shape still means render_nulls ---
+    inserts = [s for s in sqlite.statements if s.startswith("INSERT")]
+    assert [s.split()[2] for s in dict.fromkeys(inserts)] == ["session", "message", "sessionfile"]
+    assert [m.content for m in batch.messages] == ["question", "answer", "follow-up"]
+    assert [m.id for m in batch.messages] == sorted(m.id for m in batch.messages)
+    assert (batch.messages[0].input_tokens, batch.messages[1].input_tokens) == (None, 3)
+    assert [f.file_name for f in batch.files] == ["b.pdf", "a.pdf"]
+    assert {f.session_id for f in batch.files} == {batch.session_id}
+    assert batch.session.file_name == "deck.pdf"
+
+
+@pytest.mark.asyncio
+async def test_flush_rolls_back_every_write_on_error(sqlite):
+    history = HistoryService(sqlite)
+    session = await history.create_session("Deck", ChatMode.FILE_SEARCH)
+    session_id, updated_at = session.id, session.updated_at
+
+    with pytest.raises(IntegrityError):
+        await history.batch(session_id).add_message("user", "lost").add_files([_file("a"), _file("a")]).flush()
+
+    assert await sqlite.scalar(select(func.count()).select_from(Message)) == 0
+    assert await sqlite.scalar(select(Session.updated_at).where(Session.id == session_id)) == updated_at
+    message = await history.add_message(session_id, "user", "kept")
+    assert message.content == "kept"
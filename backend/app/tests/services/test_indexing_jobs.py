@@ -0,0 +1,274 @@
+import asyncio
+from datetime import datetime
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.schemas.common import IndexingState
+from app.services.indexing_jobs import IndexedFile, IndexingJobManager
+
+
+class FakeHistory:
+    updates = []
+    file_updates = []
+    failures = []
+
+    def __init__(self, _db, deadline_bound=True):
+        pass
+
+    async def fail_interrupted_indexing(self, session_id, file_ids, error):
+        FakeHistory.failures.append((session_id, file_ids, error))
+
+    async def fail_stale_indexing(self, stale_before, live_session_ids, error):
+        FakeHistory.failures.append((stale_before, set(live_session_ids), error))
+        return 1
+
+    async def update_session_file_search(self, session_id, store_name, file_name=None, status=None):
+        FakeHistory.updates.append((session_id, store_name, status))
+        return MagicMock(id=session_id)
+
+    async def update_session_file(self, file_id, status, error=None):
+        FakeHistory.file_updates.append((file_id, status))
+
+
+@asynccontextmanager
+async def fake_db():
+    yield MagicMock()
+
+
+@pytest.fixture
+def history():
+    FakeHistory.updates = []
+    FakeHistory.file_updates = []
+    FakeHistory.failures = []
+    with patch("app.services.indexing_jobs.HistoryService", FakeHistory):
+        yield FakeHistory
+
+
+def _spooled(tmp_path, name, record_id=None):
+    path = tmp_path / name
+    path.write_bytes(b"%PDF")
+    return IndexedFile(file_name=name, file_path=str(path), content_hash=name, size_bytes=4, record_id=record_id)
+
+
+@pytest.mark.asyncio
+async def test_job_reports_progress_and_marks_session_ready(history, tmp_path):
+    spooled = tmp_path / "deck.pdf"
+    spooled.write_bytes(b"%PDF")
+    gate = asyncio.Event()
+
+    async def upload_or_reuse(registry, file_path, display_name, content_hash, size_bytes, slots, on_state, on_prepared):
+        on_state(IndexingState.UPLOADING)
+        on_state(IndexingState.INDEXING)
+        await gate.wait()
+        return "fileSearchStores/a", display_name, False
+
+    file_search = MagicMock(upload_or_reuse=upload_or_reuse)
+    manager = IndexingJobManager(file_search, session_factory=fake_db)
+
+    job = manager.submit(7, [IndexedFile("deck.pdf", str(spooled), "abc", 4)])
+    states = []
+
+    async def follow():
+        async for status in manager.watch(job):
+            states.append(status.state)
+
+    watcher = asyncio.create_task(follow())
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.wait_for(watcher, 1)
+
+    assert states[-1] == IndexingState.READY
+    assert IndexingState.INDEXING in states
+    assert job.store_name == "fileSearchStores/a"
+    assert history.updates == [(7, "fileSearchStores/a", IndexingState.READY)]
+    assert not spooled.exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_job_marks_session_failed(history, tmp_path):
+    spooled = tmp_path / "deck.pdf"
+    spooled.write_bytes(b"%PDF")
+    file_search = MagicMock(upload_or_reuse=AsyncMock(side_effect=RuntimeError("boom")))
+    manager = IndexingJobManager(file_search, session_factory=fake_db)
+
+    job = manager.submit(7, [IndexedFile("deck.pdf", str(spooled), "abc", 4)])
+    statuses = [s async for s in manager.watch(job)]
+
+    assert statuses[-1].state == IndexingState.FAILED
+    assert statuses[-1].error == "Failed to index file."
+    assert history.updates == [(7, None, IndexingState.FAILED)]
+    assert not spooled.exists()
+
+
+@pytest.mark.asyncio
+async def test_reference_released_when_result_cannot_be_recorded(history, tmp_path, monkeypatch):
+    db = MagicMock(rollback=AsyncMock())
+
+    @asynccontextmanager
+    async def session_factory():
+        yield db
+
+    async def broken_update(*_args, **_kwargs):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(history, "update_session_file_search", broken_update)
+    file_search = MagicMock(
+        upload_or_reuse=AsyncMock(return_value=("fileSearchStores/a", "deck.pdf", True)),
+        release_store=AsyncMock(),
+    )
+    manager = IndexingJobManager(file_search, session_factory=session_factory)
+
+    job = manager.submit(7, [_spooled(tmp_path, "deck.pdf")])
+    final = [s async for s in manager.watch(job)][-1]
+
+    assert final.state == IndexingState.FAILED
+    db.rollback.assert_awaited()
+    assert file_search.release_store.await_args.args[1] == "fileSearchStores/a"
+
+
+@pytest.mark.asyncio
+async def test_batch_uploads_concurrently_and_tracks_each_file(history, tmp_path):
+    in_flight = 0
+    peak = 0
+
+    async def upload_to_store(store_name, file_path, display_name, on_state, on_prepared):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        on_state(IndexingState.INDEXING)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if display_name == "broken.pdf":
+            raise RuntimeError("unsupported")
+        return display_name
+
+    file_search = MagicMock(
+        create_store=AsyncMock(return_value="fileSearchStores/room"),
+        upload_to_store=upload_to_store,
+        delete_store=AsyncMock(),
+    )
+    manager = IndexingJobManager(file_search, session_factory=fake_db, upload_concurrency=2)
+    files = [_spooled(tmp_path, name, record_id=i) for i, name in enumerate(["a.pdf", "b.pdf", "broken.pdf", "c.pdf"])]
+
+    job = manager.submit(7, files)
+    final = [s async for s in manager.watch(job)][-1]
+
+    assert peak == 2
+    assert final.state == IndexingState.READY
+    assert {f.file_name: f.state for f in final.files} == {
+        "a.pdf": IndexingState.READY,
+        "b.pdf": IndexingState.READY,
+        "broken.pdf": IndexingState.FAILED,
+        "c.pdf": IndexingState.READY,
+    }
+    assert sorted(history.file_updates) == [
+        (0, IndexingState.READY), (1, IndexingState.READY), (2, IndexingState.FAILED), (3, IndexingState.READY)
+    ]
+    assert history.updates[-1] == (7, "fileSearchStores/room", IndexingState.READY)
+    file_search.delete_store.assert_not_awaited()
+    assert not any((tmp_path / f.file_name).exists() for f in files)
+
+
+@pytest.mark.asyncio
+async def test_jobs_beyond_indexing_concurrency_wait_instead_of_failing(history, tmp_path):
+    in_flight = 0
+    peak = 0
+
+    async def upload_to_store(store_name, file_path, display_name, on_state, on_prepared):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return display_name
+
+    manager = IndexingJobManager(
+        MagicMock(upload_to_store=upload_to_store), session_factory=fake_db, indexing_concurrency=2
+    )
+
+    jobs = [
+        manager.submit(i, [_spooled(tmp_path, f"{i}.pdf", record_id=i)], store_name="fileSearchStores/room")
+        for i in range(6)
+    ]
+    finals = [[s async for s in manager.watch(job)][-1] for job in jobs]
+
+    assert peak == 2
+    assert all(f.state == IndexingState.READY for f in finals)
+
+
+@pytest.mark.asyncio
+async def test_files_added_to_existing_store_skip_store_creation(history, tmp_path):
+    file_search = MagicMock(create_store=AsyncMock(), upload_to_store=AsyncMock(return_value="x"))
+    manager = IndexingJobManager(file_search, session_factory=fake_db)
+
+    job = manager.submit(7, [_spooled(tmp_path, "extra.pdf", record_id=5)], store_name="fileSearchStores/room")
+    final = [s async for s in manager.watch(job)][-1]
+
+    assert final.state == IndexingState.READY
+    file_search.create_store.assert_not_awaited()
+    assert file_search.upload_to_store.await_args.args[0] == "fileSearchStores/room"
+    assert history.updates == []
+    assert history.file_updates == [(5, IndexingState.READY)]
+
+
+@pytest.mark.asyncio
+async def test_previews_are_built_from_the_uploaded_pages(history, tmp_path):
+    async def upload_to_store(store_name, file_path, display_name, on_state, on_prepared):
+        on_prepared(["Cleaned text"] if display_name == "long.pdf" else None)
+        return display_name
+
+    previews = MagicMock()
+    pool = MagicMock(run=AsyncMock(side_effect=lambda fn, *args: fn(*args)))
+    file_search = MagicMock(upload_to_store=upload_to_store, preprocessor=pool)
+    manager = IndexingJobManager(file_search, session_factory=fake_db, previews=previews)
+    files = [_spooled(tmp_path, "long.pdf", record_id=1), _spooled(tmp_path, "short.pdf", record_id=2)]
+
+    job = manager.submit(7, files, store_name="fileSearchStores/room")
+    [s async for s in manager.watch(job)]
+    await asyncio.gather(*job.previews)
+
+    built = {call.args[2]: call.args[3] for call in previews.build.call_args_list}
+    assert built == {"long.pdf": ["Cleaned text"], "short.pdf": None}
+    assert all(call.args[0] == previews.build for call in pool.run.await_args_list)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_marks_its_rows_failed(history, tmp_path):
+    started = asyncio.Event()
+
+    async def upload_or_reuse(*_args, **_kwargs):
+        started.set()
+        await asyncio.sleep(10)
+
+    manager = IndexingJobManager(MagicMock(upload_or_reuse=upload_or_reuse), session_factory=fake_db)
+    job = manager.submit(7, [_spooled(tmp_path, "deck.pdf", record_id=4)])
+    await started.wait()
+
+    await manager.close()
+
+    assert job.state == IndexingState.FAILED
+    assert history.failures == [(7, [4], "Indexing was interrupted.")]
+
+
+@pytest.mark.asyncio
+async def test_recover_skips_sessions_with_live_jobs(history, tmp_path):
+    gate = asyncio.Event()
+
+    async def upload_or_reuse(*_args, **_kwargs):
+        await gate.wait()
+        return "fileSearchStores/a", "deck.pdf", False
+
+    manager = IndexingJobManager(
+        MagicMock(upload_or_reuse=upload_or_reuse), session_factory=fake_db, timeout_s=600
+    )
+    manager.submit(7, [_spooled(tmp_path, "deck.pdf")])
+
+    assert await manager.recover() == 1
+    stale_before, live, _ = history.failures[0]
+    assert live == {7}
+    assert (datetime.utcnow() - stale_before).total_seconds() >= 600
+
+    gate.set()
+    await manager.close()
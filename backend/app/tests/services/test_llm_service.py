@@ -1,9 +1,12 @@
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from app.core.deadline import Deadline, set_current_deadline
 from app.schemas.chat import ChatStreamResponse
 from app.schemas.common import ChatMode
+from app.services.hedging import HedgePolicy, LatencyTracker
 from app.services.llm_service import GeminiService
 
 
@@ -116,3 +119,159 @@ async def test_chat_stream_handles_exception(gemini_service):
 
     assert events[-1].type == "error"
     assert "error" in events[-1].content.lower()
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker(window_size=100)
+    for i in range(1, 101):
+        tracker.record("m", i / 100)
+
+    assert tracker.percentile("m", 50) == 0.5
+    assert tracker.percentile("m", 95) == 0.95
+    assert tracker.percentile("other", 95) is None
+
+
+def test_hedge_policy_respects_ratio_cap():
+    tracker = LatencyTracker()
+    policy = HedgePolicy(tracker, max_ratio=0.1, min_samples=1, window_size=20)
+    for _ in range(9):
+        policy.record_request()
+
+    assert policy.try_hedge() is True
+    assert policy.try_hedge() is False
+    assert policy.hedged_ratio <= 0.1
+
+
+def test_hedge_policy_waits_for_samples():
+    tracker = LatencyTracker()
+    policy = HedgePolicy(tracker, min_samples=3, min_delay=0.2)
+    tracker.record("m", 0.1)
+    assert policy.hedge_delay("m") is None
+
+    tracker.record("m", 0.1)
+    tracker.record("m", 0.1)
+    assert policy.hedge_delay("m") == 0.2
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_hedges_slow_first_chunk(gemini_service):
+    calls = {"count": 0}
+
+    async def slow_stream():
+        await asyncio.sleep(5)
+        yield MagicMock(text="slow", candidates=[])
+
+    async def fast_stream():
+        yield MagicMock(text="fast", candidates=[])
+
+    async def open_stream(**_kwargs):
+        calls["count"] += 1
+        return slow_stream() if calls["count"] == 1 else fast_stream()
+
+    gemini_service.client.aio.models.generate_content_stream = open_stream
+    gemini_service.hedge_policy = HedgePolicy(
+        gemini_service.ttft_tracker, max_ratio=1.0, min_samples=1, min_delay=0.01
+    )
+    gemini_service.ttft_tracker.record("gemini-flash-latest", 0.01)
+
+    events = []
+    async for event in gemini_service.chat_stream("Hi", hedge=True):
+        events.append(event)
+
+    assert calls["count"] == 2
+    assert events[0].content == "fast"
+    assert events[-1].type == "done"
+    # --- The hedge's fast TTFT is not recorded; the primary's wait (>= delay) is ---
+    assert gemini_service.ttft_tracker.count("gemini-flash-latest") == 2
+    assert gemini_service.ttft_tracker.percentile("gemini-flash-latest", 100) >= 0.01
+
+
+@pytest.mark.asyncio
+async def test_generate_stream_closes_stream_on_early_exit(gemini_service):
+    closed = asyncio.Event()
+
+    async def long_stream():
+        try:
+            for i in range(100):
+                yield MagicMock(text=str(i), candidates=[])
+        finally:
+            closed.set()
+
+    gemini_service.client.aio.models.generate_content_stream = AsyncMock(
+        return_value=long_stream()
+    )
+
+    stream = gemini_service._generate_stream("gemini-flash-latest", "Hi", MagicMock())
+    assert (await stream.__anext__()).text == "0"
+    await stream.aclose()
+
+    assert closed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_emits_citations_incrementally(gemini_service):
+    def chunk_with_sources(text, *urls):
+        candidate = MagicMock()
+        candidate.grounding_metadata.grounding_chunks = [
+            MagicMock(web=MagicMock(title=url, uri=url)) for url in urls
+        ]
+        return MagicMock(text=text, candidates=[candidate])
+
+    async def stream_generator():
+        yield chunk_with_sources("Hello", "https://a")
+        yield chunk_with_sources(" world", "https://a", "https://b")
+
+    gemini_service.client.aio.models.generate_content_stream = AsyncMock(
+        return_value=stream_generator()
+    )
+
+    events = [event async for event in gemini_service.chat_stream("Hi")]
+    citation_events = [e for e in events if e.type == "citation"]
+
+    assert [e.type for e in events[:2]] == ["token", "citation"]
+    assert [[s.url for s in e.sources] for e in citation_events] == [["https://a"], ["https://b"]]
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_reports_deadline_exceeded(gemini_service):
+    async def stalled_stream():
+        yield MagicMock(text="partial", candidates=[])
+        await asyncio.sleep(1)
+        yield MagicMock(text="late", candidates=[])
+
+    gemini_service.client.aio.models.generate_content_stream = AsyncMock(
+        return_value=stalled_stream()
+    )
+    set_current_deadline(Deadline(0.05))
+
+    events = [event async for event in gemini_service.chat_stream("Hi")]
+
+    assert events[0].content == "partial"
+    assert events[-1].type == "error"
+    assert "timed out" in events[-1].content
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_reports_usage_on_done(gemini_service):
+    final_chunk = MagicMock(text="Hi", candidates=[])
+    final_chunk.usage_metadata = MagicMock(
+        prompt_token_count=12,
+        candidates_token_count=3,
+        thoughts_token_count=None,
+        cached_content_token_count=None,
+    )
+
+    async def stream_generator():
+        yield final_chunk
+
+    gemini_service.client.aio.models.generate_content_stream = AsyncMock(
+        return_value=stream_generator()
+    )
+
+    events = [event async for event in gemini_service.chat_stream("Hi")]
+
+    usage = events[-1].usage
+    assert events[-1].type == "done"
+    assert usage.input_tokens == 12
+    assert usage.output_tokens == 3
+    assert usage.ttft_ms is not None
@@ -0,0 +1,83 @@
+import pytest
+
+from app.services.local_rag import LocalRagEngine, is_local_store, whitespace_chunks
+
+
+def test_whitespace_chunks_overlap_and_track_pages():
+    pages = [" ".join(f"a{i}" for i in range(200)), " ".join(f"b{i}" for i in range(200))]
+
+    chunks = whitespace_chunks(pages, max_tokens=300, overlap=30)
+
+    assert len(chunks) == 2
+    assert (chunks[0].first_page, chunks[0].last_page) == (1, 2)
+    assert chunks[0].text.split()[-30:] == chunks[1].text.split()[:30]
+    assert chunks[1].text.split()[-1] == "b199"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return LocalRagEngine(str(tmp_path / "rag"), max_tokens=20, overlap=2, top_k=3)
+
+
+@pytest.mark.asyncio
+async def test_indexes_and_retrieves_across_documents(engine, tmp_path):
+    store = await engine.create_store()
+    revenue = tmp_path / "a.txt"
+    revenue.write_text("filler words here " * 20 + "Quarterly revenue grew twelve percent in Europe. " + "more filler " * 20)
+    hiring = tmp_path / "b.md"
+    hiring.write_text("The hiring plan adds forty engineers next year. " * 3)
+
+    await engine.add_document(store, str(revenue), "report.txt")
+    await engine.add_document(store, str(hiring), "plan.md")
+
+    [top, *_] = await engine.search(store, "how much did revenue grow in Europe?")
+    assert top.title == "report.txt"
+    assert "revenue grew" in top.text
+    assert top.citation().source_title == "report.txt"
+
+    [top, *_] = await engine.search(store, "hiring engineers")
+    assert top.title == "plan.md"
+    assert await engine.search(store, "zebra") == []
+
+
+@pytest.mark.asyncio
+async def test_searches_follow_writes_made_by_another_worker(engine, tmp_path):
+    other_worker = LocalRagEngine(engine.root, max_tokens=20, overlap=2, top_k=3)
+    store = await engine.create_store()
+    first = tmp_path / "a.txt"
+    first.write_text("Quarterly revenue grew twelve percent in Europe. " * 3)
+    second = tmp_path / "b.txt"
+    second.write_text("The hiring plan adds forty engineers next year. " * 3)
+
+    await engine.add_document(store, str(first), "report.txt")
+    assert (await other_worker.search(store, "hiring engineers")) == []
+
+    await engine.add_document(store, str(second), "plan.md")
+    [top, *_] = await other_worker.search(store, "hiring engineers")
+    assert top.title == "plan.md"
+
+    await engine.delete_store(store)
+    assert await other_worker.search(store, "hiring engineers") == []
+
+
+@pytest.mark.asyncio
+async def test_delete_and_list_stores(engine):
+    store = await engine.create_store()
+    assert is_local_store(store)
+    assert [s.name for s in engine.list_stores()] == [store]
+
+    await engine.delete_store(store)
+
+    assert engine.list_stores() == []
+    with pytest.raises(ValueError):
+        await engine.search("local/../../etc", "x")
+
+
+@pytest.mark.asyncio
+async def test_unsupported_file_type_is_rejected(engine, tmp_path):
+    store = await engine.create_store()
+    path = tmp_path / "deck"
+    path.write_bytes(b"\x00\x01")
+
+    with pytest.raises(ValueError):
+        await engine.add_document(store, str(path), "deck.pptx")
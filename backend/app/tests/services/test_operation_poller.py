@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.operation_poller import OperationPoller
+
+
+class FakeOperation:
+    def __init__(self, name: str, polls_needed: int):
+        self.name = name
+        self.polls_needed = polls_needed
+        self.polls = 0
+        self.done = False
+
+
+async def _get(op: FakeOperation) -> FakeOperation:
+    op.polls += 1
+    op.done = op.polls >= op.polls_needed
+    return op
+
+
+def _poller(**kwargs) -> OperationPoller:
+    options = dict(initial_delay=0.01, max_delay=0.05, multiplier=2, sweep_interval=0.001)
+    options.update(kwargs)
+    return OperationPoller(_get, **options)
+
+
+@pytest.mark.asyncio
+async def test_many_operations_share_one_sweeper_without_threads():
+    poller = _poller()
+    ops = [FakeOperation(f"op{i}", polls_needed=i % 4 + 1) for i in range(20)]
+    threads_before = threading.active_count()
+
+    results = await asyncio.gather(*(poller.wait(op, timeout=2) for op in ops))
+
+    assert [r.name for r in results] == [op.name for op in ops]
+    assert all(op.done for op in ops)
+    # --- Idle worker threads left by earlier tests may exit meanwhile; none may start ---
+    assert threading.active_count() <= threads_before
+    assert poller.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_backoff_grows_per_operation():
+    poller = _poller(initial_delay=0.01, max_delay=1, multiplier=3)
+    op = FakeOperation("slow", polls_needed=4)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    await poller.wait(op, timeout=2)
+
+    # --- 0.01 + 0.03 + 0.09 + 0.27 (+/- jitter) rather than 4 x 0.01 ---
+    assert loop.time() - started > 0.2
+    assert op.polls == 4
+
+
+@pytest.mark.asyncio
+async def test_timeout_stops_tracking_operation():
+    poller = _poller()
+    op = FakeOperation("stuck", polls_needed=10_000)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await poller.wait(op, timeout=0.05)
+
+    assert poller.pending == 0
+    await poller.close()
+
+
+@pytest.mark.asyncio
+async def test_repeated_poll_errors_fail_the_waiter():
+    async def failing_get(_op):
+        raise ConnectionError("unavailable")
+
+    poller = OperationPoller(failing_get, initial_delay=0.001, max_delay=0.002, sweep_interval=0.001, max_errors=3)
+
+    with pytest.raises(ConnectionError):
+        await poller.wait(FakeOperation("x", polls_needed=1), timeout=2)
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from app.services.preprocessing import UploadPreprocessor, prepare_document, strip_boilerplate
+
+
+def _page(number: int, body: str) -> str:
+    return f"ACME Corp — Annual Report 2024\n\n{body}\n\nConfidential | {number + 4}\nPage {number} of 12"
+
+
+def test_strip_boilerplate_removes_running_headers_footers_and_page_numbers():
+    pages = [_page(i, f"Region {i * 7 % 5} grew.\nSee   note  {'abcdefghijkl'[i - 1]}.") for i in range(1, 13)]
+
+    cleaned = strip_boilerplate(pages)
+
+    assert len(cleaned) == 12
+    assert cleaned[0] == "Region 2 grew.\nSee note a."
+    assert all("ACME" not in page and "Confidential" not in page for page in cleaned)
+
+
+def test_strip_boilerplate_keeps_body_lines_and_short_documents():
+    pages = ["Title\n\nIntro paragraph.\n\n1", "Summary\n\nOnly two pages here.\n\nii"]
+
+    cleaned = strip_boilerplate(pages)
+
+    # --- Too few pages to call anything "repeated"; bare page numbers still go ---
+    assert cleaned == ["Title\n\nIntro paragraph.", "Summary\n\nOnly two pages here."]
+
+
+def test_prepare_document_skips_files_that_do_not_shrink(tmp_path):
+    path = tmp_path / "upload"
+    path.write_text("plain text")
+
+    assert prepare_document(str(path), "notes.txt", max_ratio=0.8) is None
+
+
+@pytest.mark.asyncio
+async def test_preprocessor_extracts_in_a_worker_process(tmp_path):
+    from app.tests.services.test_text_extraction import _docx
+
+    path = tmp_path / "upload"
+    body = "".join(
+        f"<w:p><w:r><w:t>Header</w:t></w:r></w:p><w:p><w:r><w:t>Body {'abcd'[i]}</w:t></w:r></w:p>"
+        f'<w:p><w:r><w:t>{i + 1}</w:t><w:br w:type="page"/></w:r></w:p>'
+        for i in range(4)
+    )
+    _docx(path, body)
+    preprocessor = UploadPreprocessor(workers=1, min_bytes=0, max_ratio=10.0)
+
+    try:
+        prepared = await preprocessor.prepare(str(path), "report.docx")
+        skipped = await preprocessor.prepare(str(path), "notes.txt")
+    finally:
+        preprocessor.close()
+
+    assert skipped is None
+    assert prepared.pages == ["Body a", "Body b", "Body c", "Body d"]
+    assert open(prepared.path).read() == "Body a\n\nBody b\n\nBody c\n\nBody d"
+    prepared.remove()
+    assert not os.path.exists(prepared.path)
+
+
+@pytest.mark.asyncio
+async def test_disabled_preprocessor_still_runs_preview_builds(tmp_path):
+    from app.services.citation_preview import CitationPreviewIndex
+
+    path = tmp_path / "notes.txt"
+    path.write_text("alpha beta gamma delta epsilon zeta eta theta iota")
+    content_hash = "c" * 64
+    previews = CitationPreviewIndex(str(tmp_path / "previews"))
+    preprocessor = UploadPreprocessor(workers=1, min_bytes=0, max_ratio=10.0, enabled=False)
+
+    try:
+        assert await preprocessor.prepare(str(path), "report.docx") is None
+        assert await preprocessor.run(previews.build, content_hash, str(path), "notes.txt", None)
+    finally:
+        preprocessor.close()
+
+    assert previews.exists(content_hash)
@@ -0,0 +1,96 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.store_reaper import StoreReaper
+
+
+class FakeRegistry:
+    """
+        Lifecycle queries over an in-memory {store_name: expirable} map.
+    """
+
+    def __init__(self, idle, referenced):
+        self.idle = idle
+        self.referenced = referenced
+        self.forgotten = []
+
+    async def idle_stores(self, cutoff, limit=100):
+        return list(self.idle)
+
+    async def expire(self, store_name, cutoff):
+        return [1] if self.idle[store_name] else []
+
+    async def referenced_stores(self, registered_since):
+        return set(self.referenced)
+
+    async def forget(self, store_name):
+        self.forgotten.append(store_name)
+
+
+class FakeFileSearch:
+    def __init__(self, stores, failing=()):
+        self.stores = stores
+        self.failing = set(failing)
+        self.deleted = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def list_stores(self):
+        return self.stores
+
+    async def delete_store(self, store_name):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if store_name in self.failing:
+            return False
+        self.deleted.append(store_name)
+        return True
+
+
+@asynccontextmanager
+async def no_db():
+    yield None
+
+
+def upstream(name, age_s):
+    store = MagicMock(create_time=datetime.now(timezone.utc) - timedelta(seconds=age_s))
+    store.name = name
+    return store
+
+
+@pytest.mark.asyncio
+async def test_reaps_idle_stores_with_bounded_concurrency():
+    registry = FakeRegistry(idle={f"s{i}": True for i in range(6)} | {"raced": False}, referenced=[])
+    file_search = FakeFileSearch(stores=[])
+    reaper = StoreReaper(file_search, no_db, concurrency=2)
+
+    with patch("app.services.store_reaper.StoreRegistry", return_value=registry):
+        report = await reaper.run_once()
+
+    assert report.idle_reclaimed == 6
+    assert "raced" not in file_search.deleted
+    assert file_search.peak == 2
+    assert reaper.snapshot()["idle_reclaimed"] == 6
+
+
+@pytest.mark.asyncio
+async def test_sweeps_only_old_unreferenced_stores():
+    registry = FakeRegistry(idle={}, referenced=["in-use"])
+    file_search = FakeFileSearch(
+        stores=[upstream("in-use", 7200), upstream("orphan", 7200), upstream("indexing", 60), upstream("stuck", 7200)],
+        failing=["stuck"]
+    )
+    reaper = StoreReaper(file_search, no_db, orphan_grace_s=3600)
+
+    with patch("app.services.store_reaper.StoreRegistry", return_value=registry):
+        report = await reaper.run_once()
+
+    assert file_search.deleted == ["orphan"]
+    assert registry.forgotten == ["orphan"]
+    assert (report.orphans_reclaimed, report.failed) == (1, 1)
@@ -0,0 +1,93 @@
+import os
+import zipfile
+from unittest.mock import patch
+
+from app.services.text_extraction import (
+    extract_docx_pages,
+    extract_text,
+    parse_shard_title,
+    remove_shards,
+    shard_document,
+    split_text,
+)
+
+
+def test_split_text_cuts_at_paragraph_boundaries():
+    text = "\n\n".join(f"Paragraph {i} " + "word " * 20 for i in range(20))
+
+    pieces = split_text(text, 400)
+
+    assert "".join(pieces) == text
+    assert len(pieces) > 1
+    assert all(len(piece.encode("utf-8")) <= 400 for piece in pieces)
+    assert all(piece.endswith("\n\n") for piece in pieces[:-1])
+
+
+def test_parse_shard_title_maps_back_to_original_file():
+    assert parse_shard_title("report.pdf [pp. 51-100]") == ("report.pdf", "pp. 51-100")
+    assert parse_shard_title("notes.txt [part 2/5]") == ("notes.txt", "part 2/5")
+    assert parse_shard_title("plain [draft].pdf") == ("plain [draft].pdf", None)
+
+
+def test_large_text_file_is_sharded(tmp_path):
+    path = tmp_path / "upload"
+    path.write_text("\n\n".join("line " * 50 for _ in range(100)))
+
+    shards = shard_document(str(path), "notes.txt", pages_per_shard=50, min_pages=100, text_shard_bytes=5000)
+
+    assert shards is not None and len(shards) >= 5
+    assert shards[0].display_name == f"notes.txt [part 1/{len(shards)}]"
+    assert "".join(open(s.path).read() for s in shards) == path.read_text()
+    remove_shards(shards)
+    assert not os.path.exists(os.path.dirname(shards[0].path))
+
+
+def test_small_or_unknown_files_are_uploaded_whole(tmp_path):
+    path = tmp_path / "upload"
+    path.write_text("short")
+
+    assert shard_document(str(path), "notes.txt", 50, 100, 5000) is None
+    assert shard_document(str(path), "slides.pptx", 50, 100, 1) is None
+
+
+def test_pdf_is_sharded_by_page_range(tmp_path):
+    pages = [f"page {i}" for i in range(1, 121)]
+    with patch("app.services.text_extraction.extract_pdf_pages", return_value=pages):
+        shards = shard_document(str(tmp_path / "upload"), "report.pdf", 50, 100, 5000)
+
+    assert [s.display_name for s in shards] == [
+        "report.pdf [pp. 1-50]",
+        "report.pdf [pp. 51-100]",
+        "report.pdf [pp. 101-120]",
+    ]
+    assert open(shards[2].path).read().startswith("page 101")
+    remove_shards(shards)
+
+
+def _docx(path, body):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(
+            "word/document.xml",
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f"<w:body>{body}</w:body></w:document>"
+        )
+
+
+def test_docx_pages_split_at_page_breaks(tmp_path):
+    path = tmp_path / "upload"
+    _docx(path, (
+        "<w:p><w:r><w:t>Introduction</w:t></w:r></w:p>"
+        "<w:p><w:r><w:t>Revenue grew</w:t><w:tab/><w:t>12%.</w:t></w:r></w:p>"
+        '<w:p><w:r><w:br w:type="page"/><w:t>Risks</w:t></w:r></w:p>'
+    ))
+
+    pages = extract_text(str(path), "report.docx")
+
+    assert [p.split() for p in pages] == [["Introduction", "Revenue", "grew", "12%."], ["Risks"]]
+
+
+def test_unreadable_docx_is_uploaded_whole(tmp_path):
+    path = tmp_path / "upload"
+    path.write_bytes(b"not a zip")
+
+    assert extract_docx_pages(str(path)) is None
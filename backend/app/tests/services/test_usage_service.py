@@ -0,0 +1,38 @@
+from unittest.mock import MagicMock
+
+from app.services.usage_service import UsageMeter, estimate_cost
+
+
+def test_usage_meter_reads_final_usage_metadata():
+    meter = UsageMeter("gemini-2.5-flash")
+    meter.observe(MagicMock(usage_metadata=None))
+    meter.observe(MagicMock(usage_metadata=MagicMock(
+        prompt_token_count=120,
+        candidates_token_count=40,
+        thoughts_token_count=10,
+        cached_content_token_count=100,
+    )))
+
+    stats = meter.stats()
+
+    assert stats.model == "gemini-2.5-flash"
+    assert stats.input_tokens == 120
+    assert stats.output_tokens == 50
+    assert stats.cached_tokens == 100
+    assert stats.ttft_ms is not None and stats.ttft_ms >= 0
+    assert stats.duration_ms >= stats.ttft_ms
+
+
+def test_usage_meter_without_chunks():
+    stats = UsageMeter("m").stats()
+    assert stats.ttft_ms is None
+    assert stats.input_tokens is None
+
+
+def test_estimate_cost_discounts_cached_tokens():
+    full = estimate_cost("gemini-2.5-flash", 1_000_000, 0, 0)
+    cached = estimate_cost("gemini-2.5-flash", 1_000_000, 0, 1_000_000)
+
+    assert full == 0.30
+    assert cached == 0.03
+    assert estimate_cost("unknown-model", 10, 10, 0) is None
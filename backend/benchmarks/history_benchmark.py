@@ -0,0 +1,136 @@
+"""
+Insert-latency benchmark for HistoryService.add_message.
+
+Grows one session to 10,000 messages and, at each checkpoint, times a batch
+of `add_message` calls. Latency should stay flat as the session grows; with
+`--legacy`, the previous write path (reload the session with all its
+messages to bump `updated_at`) is timed alongside for comparison.
+
+Needs the database from `.env` (DATABASE_URL) with migrations applied. The
+benchmark session is deleted afterwards.
+
+Usage (from backend/):
+
+    python -m benchmarks.history_benchmark
+    python -m benchmarks.history_benchmark --checkpoints 10 100 1000 10000 --samples 100 --legacy
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import delete, insert
+from sqlmodel import select
+from sqlalchemy.orm import selectinload
+
+from app.core.database import AsyncSessionLocal, engine
+from app.db.models import Message, Session
+from app.schemas.common import ChatMode
+from app.services.history_service import HistoryService
+
+FILL_BATCH = 1000
+CONTENT = "Benchmark message " + "lorem ipsum " * 20
+
+
+async def legacy_add_message(service: HistoryService, session_id: int, role: str, content: str) -> Message:
+    """
+        The pre-rework write path: reload the session and all its messages to bump `updated_at`.
+    """
+    message = Message(session_id=session_id, role=role, content=content)
+    service.db.add(message)
+    statement = select(Session).where(Session.id == session_id).options(selectinload(Session.messages))
+    session = (await service.db.execute(statement)).scalar_one_or_none()
+    if session:
+        session.updated_at = datetime.utcnow()
+        service.db.add(session)
+    await service.db.commit()
+    await service.db.refresh(message)
+    return message
+
+
+async def fill(session_id: int, count: int) -> None:
+    """
+        Bulk-inserts `count` messages (not timed) to grow the session quickly.
+    """
+    async with AsyncSessionLocal() as db:
+        for first in range(0, count, FILL_BATCH):
+            rows = [
+                {"session_id": session_id, "role": "user", "content": CONTENT, "created_at": datetime.utcnow()}
+                for _ in range(min(FILL_BATCH, count - first))
+            ]
+            await db.execute(insert(Message), rows)
+        await db.commit()
+
+
+async def measure(session_id: int, samples: int, legacy: bool) -> Dict[str, float]:
+    latencies: List[float] = []
+    async with AsyncSessionLocal() as db:
+        service = HistoryService(db)
+        for _ in range(samples):
+            started = time.perf_counter()
+            if legacy:
+                await legacy_add_message(service, session_id, "user", CONTENT)
+            else:
+                await service.add_message(session_id, "user", CONTENT)
+            latencies.append((time.perf_counter() - started) * 1000)
+            # --- Fresh identity map per sample, like one request per message ---
+            db.expunge_all()
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoints", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--samples", type=int, default=50, help="Timed inserts per checkpoint")
+    parser.add_argument("--legacy", action="store_true", help="Also time the old reload-the-session write path")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        session = await HistoryService(db).create_session("history-benchmark", ChatMode.STANDARD)
+        session_id = session.id
+
+    results: Dict[int, dict] = {}
+    size = 0
+    try:
+        for checkpoint in sorted(args.checkpoints):
+            if checkpoint > size:
+                await fill(session_id, checkpoint - size)
+                size = checkpoint
+            row = {"current": await measure(session_id, args.samples, legacy=False)}
+            size += args.samples
+            if args.legacy:
+                row["legacy"] = await measure(session_id, args.samples, legacy=True)
+                size += args.samples
+            results[checkpoint] = row
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Message).where(Message.session_id == session_id))
+            await db.execute(delete(Session).where(Session.id == session_id))
+            await db.commit()
+        await engine.dispose()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"add_message latency, {args.samples} samples per checkpoint\n")
+    header = f"{'messages':>10}{'p50 ms':>12}{'p95 ms':>12}"
+    if args.legacy:
+        header += f"{'legacy p50':>14}{'legacy p95':>14}"
+    print(header)
+    for checkpoint, row in results.items():
+        line = f"{checkpoint:>10}{row['current']['p50_ms']:>12}{row['current']['p95_ms']:>12}"
+        if args.legacy:
+            line += f"{row['legacy']['p50_ms']:>14}{row['legacy']['p95_ms']:>14}"
+        print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
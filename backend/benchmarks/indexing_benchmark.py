@@ -0,0 +1,207 @@
+"""
+Indexing benchmark for File Search chunking profiles.
+
+For every chunking profile, indexes a fixed document corpus and reports:
+
+- indexing time (wall clock for the whole corpus)
+- store size (bytes on disk of the local index)
+- retrieval hit rate@k (share of questions whose answer appears in the top-k passages)
+- mean query latency
+
+Runs offline against the local RAG engine, whose chunker mirrors the upstream
+`white_space_config`, so profiles can be compared without network noise. With
+`--remote`, also times real upstream indexing per profile (needs GEMINI_API_KEY).
+
+Usage (from backend/, with the `local-rag` extra installed):
+
+    python -m benchmarks.indexing_benchmark
+    python -m benchmarks.indexing_benchmark --corpus ./docs --questions ./questions.json
+    python -m benchmarks.indexing_benchmark --profile wide:1000:100 --json
+
+The questions file is a JSON list of {"question": ..., "answer": ...}; a hit
+means `answer` occurs (case-insensitively) in one of the top-k passages.
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.services.chunking import CHUNKING_PROFILES, ChunkingProfile, select_profile
+from app.services.local_rag import LocalRagEngine
+
+# --- Deterministic built-in corpus ---
+SEED = 7
+FILLER = (
+    "the company continued to invest in operations while managing costs across regions and "
+    "reviewing strategy with partners as market conditions evolved through the year and "
+    "leadership highlighted execution priorities customer demand and long term growth"
+).split()
+DEPARTMENTS = ["research", "marketing", "logistics", "security", "finance", "legal", "support", "design"]
+REGIONS = ["north", "south", "east", "west", "central"]
+PRODUCTS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot"]
+QUARTERS = ["q1", "q2", "q3", "q4"]
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(FILLER) for _ in range(words)).capitalize() + "."
+
+
+def build_corpus(directory: Path) -> List[dict]:
+    """
+        Writes a long report, a short memo and a table; returns the questions.
+    """
+    rng = random.Random(SEED)
+    questions = []
+
+    # --- Long prose: facts buried between filler paragraphs ---
+    paragraphs = []
+    for year in range(2015, 2025):
+        for department in DEPARTMENTS:
+            amount = rng.randint(10, 999)
+            paragraphs.append(_paragraph(rng, rng.randint(80, 200)))
+            paragraphs.append(f"The {department} budget for {year} was {amount} million dollars.")
+            questions.append({"question": f"What was the {department} budget in {year}?", "answer": f"{amount} million"})
+    (directory / "annual-report.txt").write_text("\n\n".join(paragraphs))
+
+    # --- Short prose ---
+    memo = [_paragraph(rng, 60) for _ in range(6)]
+    memo.insert(3, "The offsite will be held in Lisbon on the second Tuesday of May.")
+    (directory / "memo.md").write_text("\n\n".join(memo))
+    questions.append({"question": "Where will the offsite be held?", "answer": "Lisbon"})
+
+    # --- Table: one fact per row ---
+    rows = ["region,product,quarter,units"]
+    for region in REGIONS:
+        for product in PRODUCTS:
+            for quarter in QUARTERS:
+                units = rng.randint(1000, 99999)
+                rows.append(f"{region},{product},{quarter},{units}")
+                if rng.random() < 0.15:
+                    questions.append({
+                        "question": f"How many {product} units sold in {region} {quarter}?",
+                        "answer": f"{region},{product},{quarter},{units}"
+                    })
+    (directory / "sales.csv").write_text("\n".join(rows))
+    return questions
+
+
+def _store_bytes(root: Path) -> int:
+    return sum(p.stat().st_size for p in root.rglob("*") if p.is_file())
+
+
+async def bench_local(
+    corpus: List[Path],
+    questions: List[dict],
+    profile: Optional[ChunkingProfile],
+    top_k: int
+) -> dict:
+    """
+        Indexes `corpus` with `profile` (None = per-file `select_profile`).
+    """
+    root = Path(tempfile.mkdtemp(prefix="indexing-bench-"))
+    try:
+        engine = LocalRagEngine(str(root), top_k=top_k)
+        store = await engine.create_store()
+
+        started = time.perf_counter()
+        for path in corpus:
+            chosen = profile or select_profile(path.name, path.stat().st_size)
+            await engine.add_document(store, str(path), path.name, chosen.config)
+        indexing_s = time.perf_counter() - started
+
+        hits = 0
+        latencies = []
+        for q in questions:
+            started = time.perf_counter()
+            passages = await engine.search(store, q["question"], top_k)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if any(q["answer"].lower() in p.text.lower() for p in passages):
+                hits += 1
+
+        return {
+            "indexing_s": round(indexing_s, 3),
+            "store_bytes": _store_bytes(root),
+            "chunks": engine._index(store).size,
+            "hit_rate": round(hits / len(questions), 3) if questions else None,
+            "query_ms": round(statistics.mean(latencies), 2) if latencies else None,
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+async def bench_remote(corpus: List[Path], profile: Optional[ChunkingProfile]) -> dict:
+    """
+        Upstream indexing time for the corpus into one fresh store (deleted after).
+    """
+    from app.services.file_search_service import FileSearchService
+
+    service = FileSearchService()
+    store = await service.create_store()
+    try:
+        started = time.perf_counter()
+        for path in corpus:
+            chosen = profile or select_profile(path.name, path.stat().st_size)
+            await service.upload_to_store(store, str(path), path.name, chunking=chosen.config)
+        return {"remote_indexing_s": round(time.perf_counter() - started, 3)}
+    finally:
+        await service.delete_store(store)
+        await service.operation_poller.close()
+
+
+def parse_profile(spec: str) -> ChunkingProfile:
+    name, tokens, overlap = spec.split(":")
+    return ChunkingProfile(name, int(tokens), int(overlap))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, help="Directory of documents (default: built-in corpus)")
+    parser.add_argument("--questions", type=Path, help="JSON list of {question, answer} for --corpus")
+    parser.add_argument("--profile", action="append", default=[], help="Extra profile as name:tokens:overlap")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--remote", action="store_true", help="Also time upstream indexing (uses the API)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    scratch = None
+    if args.corpus is None:
+        scratch = Path(tempfile.mkdtemp(prefix="indexing-corpus-"))
+        questions = build_corpus(scratch)
+        corpus_dir = scratch
+    else:
+        corpus_dir = args.corpus
+        questions = json.loads(args.questions.read_text()) if args.questions else []
+    corpus = sorted(p for p in corpus_dir.iterdir() if p.is_file())
+
+    candidates: List[Tuple[str, Optional[ChunkingProfile]]] = [(name, p) for name, p in CHUNKING_PROFILES.items()]
+    candidates += [(p.name, p) for p in map(parse_profile, args.profile)]
+    candidates.append(("auto", None))
+
+    results: Dict[str, dict] = {}
+    try:
+        for name, profile in candidates:
+            results[name] = await bench_local(corpus, questions, profile, args.top_k)
+            if args.remote:
+                results[name].update(await bench_remote(corpus, profile))
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{len(corpus)} documents, {len(questions)} questions, top-k={args.top_k}\n")
+    columns = ["indexing_s", "store_bytes", "chunks", "hit_rate", "query_ms"] + (["remote_indexing_s"] if args.remote else [])
+    print(f"{'profile':<12}" + "".join(f"{c:>18}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<12}" + "".join(f"{str(row.get(c)):>18}" for c in columns))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
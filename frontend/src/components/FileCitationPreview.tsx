@@ -1,18 +1,34 @@
+import { useEffect, useState } from 'react';
 import { X, FileText, Quote, ChevronRight } from 'lucide-react';
 import { cn } from '@/lib/utils';
-import { type FileSearchCitation } from '@/lib/api';
+import { type CitationPreview, type FileSearchCitation, getCitationPreview } from '@/lib/api';
 
 interface FileCitationPreviewProps {
     isOpen: boolean;
     onClose: () => void;
     citation: FileSearchCitation | null;
+    sessionId?: number | null;
 }
 
 export function FileCitationPreview({
     isOpen,
     onClose,
-    citation
+    citation,
+    sessionId
 }: FileCitationPreviewProps) {
+    const [preview, setPreview] = useState<CitationPreview | null>(null);
+
+    // Surrounding passage comes from the local preview index, not the model
+    useEffect(() => {
+        setPreview(null);
+        if (!isOpen || !citation?.chunk_id || !sessionId) return;
+        let cancelled = false;
+        getCitationPreview(sessionId, citation.chunk_id)
+            .then((result) => { if (!cancelled) setPreview(result); })
+            .catch(() => { /* excerpt alone is still shown */ });
+        return () => { cancelled = true; };
+    }, [isOpen, citation, sessionId]);
+
     if (!isOpen || !citation) return null;
 
     return (
@@ -34,7 +50,7 @@ export function FileCitationPreview({
                         <div>
                             <h3 className="font-semibold text-foreground tracking-tight">Source Context</h3>
                             <p className="text-xs text-muted-foreground uppercase tracking-widest font-bold opacity-60">
-                                {citation.source_title}
+                                {citation.source_title}{citation.page_range && ` · ${citation.page_range}`}
                             </p>
                         </div>
                     </div>
@@ -62,6 +78,16 @@ export function FileCitationPreview({
                         </p>
                     </div>
 
+                    {preview && (
+                        <div className="mt-6 text-sm text-muted-foreground whitespace-pre-wrap">
+                            <p className="text-xs uppercase tracking-widest font-bold opacity-40 mb-2">
+                                Surrounding passage{preview.page ? ` · p. ${preview.page}` : ''}
+                            </p>
+                            {preview.context.slice(0, preview.match_offset)}
+                            <span className="text-foreground/90">{preview.context.slice(preview.match_offset)}</span>
+                        </div>
+                    )}
+
                     <div className="mt-8 flex justify-end">
                         <button
                             onClick={onClose}
@@ -41,7 +41,7 @@ export function FileSearchMessage({
                             )}
                         >
                             <FileType className="w-3.5 h-3.5" />
-                            <span>{citation.source_title}</span>
+                            <span>{citation.source_title}{citation.page_range && ` · ${citation.page_range}`}</span>
                             <ExternalLink className="w-3 h-3 opacity-40" />
                         </button>
                     ))}
@@ -2,6 +2,7 @@ import * as React from "react";
 import {
     MessageSquare,
     Globe,
+    Bot,
     Users,
     Building2,
     FileText,
@@ -46,6 +47,14 @@ const modes: ModeOption[] = [
         chatMode: "web_search",
         description: "Search the web for up-to-date information",
     },
+    {
+        id: "chat-agent",
+        label: "Agent",
+        icon: Bot,
+        mode: "chat",
+        chatMode: "agent",
+        description: "Let Warm AI search people and companies for you, with live result cards",
+    },
     {
         id: "file-search",
         label: "File Search",
@@ -1,9 +1,9 @@
 import { useState, useRef, useEffect, useMemo } from 'react';
-import { MessageSquare, Users, Building2, ArrowUp, Square, Sparkles, Globe, ChevronDown, FileText } from 'lucide-react';
+import { MessageSquare, Users, Building2, ArrowUp, Square, Sparkles, Globe, ChevronDown, FileText, Bot } from 'lucide-react';
 import { cn } from '@/lib/utils';
 
 export type InputMode = 'chat' | 'people' | 'companies' | 'file_search';
-export type ChatMode = 'standard' | 'web_search' | 'file_search';
+export type ChatMode = 'standard' | 'web_search' | 'file_search' | 'agent';
 
 interface OmniInputProps {
   mode: InputMode;
@@ -33,6 +33,7 @@ const chatModeIcons = {
   standard: MessageSquare,
   web_search: Globe,
   file_search: FileText,
+  agent: Bot,
 };
 
 export function OmniInput({
@@ -79,7 +80,8 @@ export function OmniInput({
 
   const currentModeLabel = useMemo(() => {
     if (mode === 'chat') {
-      return chatMode === 'web_search' ? 'Web Search' : 'Chat';
+      if (chatMode === 'web_search') return 'Web Search';
+      return chatMode === 'agent' ? 'Agent' : 'Chat';
     }
     if (mode === 'file_search') return 'File Search';
     return mode === 'people' ? 'People' : 'Companies';
@@ -1,7 +1,7 @@
 // Warm AI API Configuration
 const API_BASE_URL = 'http://localhost:8000';
 
-export type ChatMode = 'standard' | 'web_search' | 'file_search';
+export type ChatMode = 'standard' | 'web_search' | 'file_search' | 'agent';
 export type SearchType = 'people' | 'companies';
 
 export interface ChatMessageRequest {
@@ -16,6 +16,16 @@ export interface FileSearchCitation {
   text_segment: string;
   start_index?: number;
   end_index?: number;
+  page_range?: string;
+  chunk_id?: string;
+}
+
+export interface CitationPreview {
+  chunk_id: string;
+  file_name: string;
+  page?: number | null;
+  context: string;
+  match_offset: number;
 }
 
 export interface PersonCard {
@@ -50,9 +60,10 @@ export interface SearchResponse<T> {
 }
 
 export interface SSEEvent {
-  type: 'token' | 'citation' | 'done' | 'error' | 'session_created' | 'file_citation';
+  type: 'token' | 'citation' | 'cards' | 'done' | 'error' | 'session_created' | 'file_citation';
   content?: string;
   sources?: { title: string; url: string }[];
+  cards?: (PersonCard | CompanyCard)[];
   file_citations?: FileSearchCitation[];
   error?: string;
   session_id?: number;
@@ -86,6 +97,11 @@ export async function streamChat(
     throw new Error(`Chat API error: ${response.status}`);
   }
 
+  await readSSE<SSEEvent>(response, onEvent);
+}
+
+// Reads `data:` frames off an SSE response body; comment frames (heartbeats) are skipped
+async function readSSE<T>(response: Response, onEvent: (event: T) => void): Promise<void> {
   const reader = response.body?.getReader();
   if (!reader) throw new Error('No response body');
 
@@ -104,7 +120,7 @@ export async function streamChat(
       if (line.startsWith('data: ')) {
         const data = line.slice(6).trim();
         try {
-          const event = JSON.parse(data) as SSEEvent;
+          const event = JSON.parse(data) as T;
           onEvent(event);
         } catch {
           // Ignore parse errors
@@ -115,7 +131,42 @@ export async function streamChat(
 }
 
 // File Search Upload API
-export async function uploadFileForSearch(file: File): Promise<{
+export interface IndexingJobStatus {
+  type: 'job_status';
+  job_id: string;
+  session_id: number;
+  file_name: string;
+  state: 'queued' | 'uploading' | 'indexing' | 'ready' | 'failed' | 'expired';
+  store_name?: string | null;
+  reused: boolean;
+  error?: string | null;
+}
+
+export async function getIndexingJob(jobId: string, signal?: AbortSignal): Promise<IndexingJobStatus> {
+  const response = await fetch(`${API_BASE_URL}/api/v1/file-search/jobs/${jobId}`, { signal });
+  if (!response.ok) {
+    throw new Error(`Failed to fetch indexing status: ${response.status}`);
+  }
+  return response.json();
+}
+
+export async function getCitationPreview(sessionId: number, chunkId: string): Promise<CitationPreview> {
+  const response = await fetch(`${API_BASE_URL}/api/v1/file-search/sessions/${sessionId}/citations/${chunkId}/preview`);
+  if (!response.ok) {
+    throw new Error(`Failed to fetch citation preview: ${response.status}`);
+  }
+  return response.json();
+}
+
+// Longest we follow an indexing job; the backend gives up on a job after 10 minutes
+const INDEXING_MAX_WAIT_MS = 11 * 60 * 1000;
+
+// Uploads return 202 with a job; resolves once the file is indexed
+export async function uploadFileForSearch(
+  file: File,
+  onProgress?: (status: IndexingJobStatus) => void,
+  signal?: AbortSignal
+): Promise<{
   session_id: number;
   store_name: string;
   file_name: string;
@@ -126,14 +177,64 @@ export async function uploadFileForSearch(file: File): Promise<{
   const response = await fetch(`${API_BASE_URL}/api/v1/file-search/upload`, {
     method: 'POST',
     body: formData,
+    signal,
   });
 
   if (!response.ok) {
     const errorData = await response.json().catch(() => ({ detail: 'Upload failed' }));
-    throw new Error(errorData.detail || `Upload failed with status: ${response.status}`);
+    const detail = errorData.detail;
+    throw new Error(detail?.message || detail || `Upload failed with status: ${response.status}`);
   }
 
-  return response.json();
+  const accepted: { session_id: number; file_name: string; job_id: string } = await response.json();
+  const status = await waitForIndexingJob(accepted.job_id, onProgress, signal);
+  return {
+    session_id: status.session_id,
+    store_name: status.store_name ?? '',
+    file_name: status.file_name,
+  };
+}
+
+// Follows a job's event stream until it is ready; rejects when it fails, the caller aborts or INDEXING_MAX_WAIT_MS passes
+export async function waitForIndexingJob(
+  jobId: string,
+  onProgress?: (status: IndexingJobStatus) => void,
+  signal?: AbortSignal
+): Promise<IndexingJobStatus> {
+  const controller = new AbortController();
+  const abort = () => controller.abort();
+  signal?.addEventListener('abort', abort, { once: true });
+  const timer = setTimeout(abort, INDEXING_MAX_WAIT_MS);
+  let last = null as IndexingJobStatus | null;
+
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/v1/file-search/jobs/${jobId}/events`, {
+      headers: { 'Accept': 'text/event-stream' },
+      signal: controller.signal,
+    });
+    if (!response.ok) {
+      throw new Error(`Failed to follow indexing status: ${response.status}`);
+    }
+    await readSSE<IndexingJobStatus>(response, (event) => {
+      if (event.type !== 'job_status') return;
+      last = event;
+      onProgress?.(event);
+    });
+  } catch (error) {
+    if (controller.signal.aborted && !signal?.aborted) {
+      throw new Error('Indexing is taking too long. Please try again later.');
+    }
+    throw error;
+  } finally {
+    clearTimeout(timer);
+    signal?.removeEventListener('abort', abort);
+  }
+
+  // The stream ends on ready/failed; if it was cut short, ask once
+  const status = last?.state === 'ready' || last?.state === 'failed' ? last : await getIndexingJob(jobId, signal);
+  if (status.state === 'ready') return status;
+  if (status.state === 'failed') throw new Error(status.error || 'Failed to index file');
+  throw new Error('Lost track of indexing. Please try again.');
 }
 
 // People Search API
@@ -183,7 +284,7 @@ export async function checkHealth(): Promise<boolean> {
 }
 
 // --- History API ---
-import { SessionSummary, SessionDetail } from '@/types/history';
+import { SessionSummary, SessionDetail, MessagePage } from '@/types/history';
 
 export const listSessions = async (skip = 0, limit = 20): Promise<SessionSummary[]> => {
   const response = await fetch(`${API_BASE_URL}/api/v1/sessions?skip=${skip}&limit=${limit}`);
@@ -191,12 +292,24 @@ export const listSessions = async (skip = 0, limit = 20): Promise<SessionSummary
   return response.json();
 };
 
-export const getSession = async (sessionId: number): Promise<SessionDetail> => {
-  const response = await fetch(`${API_BASE_URL}/api/v1/sessions/${sessionId}`);
+export const getSession = async (sessionId: number, includeMessages = true): Promise<SessionDetail> => {
+  const response = await fetch(`${API_BASE_URL}/api/v1/sessions/${sessionId}?include_messages=${includeMessages}`);
   if (!response.ok) throw new Error('Failed to fetch session');
   return response.json();
 };
 
+export const getSessionMessages = async (
+  sessionId: number,
+  { limit = 50, before, after }: { limit?: number; before?: string; after?: string } = {}
+): Promise<MessagePage> => {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (before) params.set('before', before);
+  if (after) params.set('after', after);
+  const response = await fetch(`${API_BASE_URL}/api/v1/sessions/${sessionId}/messages?${params}`);
+  if (!response.ok) throw new Error('Failed to fetch messages');
+  return response.json();
+};
+
 export const renameSession = async (sessionId: number, title: string): Promise<SessionSummary> => {
   const response = await fetch(`${API_BASE_URL}/api/v1/sessions/${sessionId}`, {
     method: 'PATCH',
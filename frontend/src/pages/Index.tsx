@@ -50,11 +50,18 @@ export default function Index() {
     setCurrentSessionId,
     setCurrentSessionMeta,
     fetchSessions,
-    isSidebarOpen
+    isSidebarOpen,
+    olderMessagesCursor,
+    isLoadingOlder,
+    loadOlderMessages
   } = useChatStore();
 
   const [isLoading, setIsLoading] = useState(false);
   const abortControllerRef = useRef<AbortController | null>(null);
+  const uploadAbortRef = useRef<AbortController | null>(null);
+
+  // Stop following an indexing job once the page goes away
+  useEffect(() => () => uploadAbortRef.current?.abort(), []);
 
   // Search state
   const [peopleResults, setPeopleResults] = useState<PersonCardType[]>([]);
@@ -76,6 +83,7 @@ export default function Index() {
     }
 
     // Reset states
+    uploadAbortRef.current?.abort();
     setPeopleResults([]);
     setCompanyResults([]);
     setMessages([]);
@@ -85,10 +93,13 @@ export default function Index() {
   };
 
   const handleFileUpload = async (file: File) => {
+    uploadAbortRef.current?.abort();
+    const controller = new AbortController();
+    uploadAbortRef.current = controller;
     setIsUploading(true);
     setUploadError(null);
     try {
-      const result = await uploadFileForSearch(file);
+      const result = await uploadFileForSearch(file, undefined, controller.signal);
       setCurrentSessionId(result.session_id);
       setCurrentSessionMeta({
         id: result.session_id,
@@ -105,14 +116,19 @@ export default function Index() {
       });
       fetchSessions();
     } catch (error) {
+      if (controller.signal.aborted) return;
       console.error('Upload error:', error);
       setUploadError(error instanceof Error ? error.message : 'Failed to upload file');
     } finally {
-      setIsUploading(false);
+      if (uploadAbortRef.current === controller) {
+        uploadAbortRef.current = null;
+        setIsUploading(false);
+      }
     }
   };
 
   const clearFileUpload = () => {
+    uploadAbortRef.current?.abort();
     setUploadedFile(null);
     setMessages([]);
     setUploadError(null);
@@ -134,6 +150,7 @@ export default function Index() {
       const assistantId = generateId();
       let assistantContent = '';
       let fileCitations: FileSearchCitation[] = [];
+      let assistantCards: (PersonCardType | CompanyCardType)[] = [];
 
       addMessage({ id: assistantId, role: 'assistant', content: '', isStreaming: true });
 
@@ -156,9 +173,17 @@ export default function Index() {
                 m.id === assistantId ? { ...m, content: assistantContent } : m
               );
               setMessages(updated);
+            } else if (event.type === 'cards' && event.cards) {
+              // Agent results render as soon as each tool call returns
+              assistantCards = [...assistantCards, ...event.cards];
+              const updated = useChatStore.getState().currentSessionMessages.map((m) =>
+                m.id === assistantId ? { ...m, cards: assistantCards } : m
+              );
+              setMessages(updated);
             } else if (event.type === 'file_citation' && event.content) {
               try {
-                fileCitations = JSON.parse(event.content);
+                // Citations arrive incrementally; each event carries only new sources
+                fileCitations = [...fileCitations, ...JSON.parse(event.content)];
               } catch (e) {
                 console.error('Failed to parse file citations:', e);
               }
@@ -230,6 +255,10 @@ export default function Index() {
         sessionId: currentSessionMeta.id,
         fileName: currentSessionMeta.file_name || 'Uploaded Document'
       });
+    } else if (currentSessionMeta.mode === 'agent') {
+      setMode('chat');
+      setChatMode('agent');
+      setUploadedFile(null);
     } else if (mode === 'file_search' && currentSessionMeta.mode !== 'file_search') {
       setMode('chat');
       setChatMode('standard');
@@ -270,6 +299,7 @@ export default function Index() {
           isOpen={isCitationPreviewOpen}
           onClose={() => setIsCitationPreviewOpen(false)}
           citation={selectedCitation}
+          sessionId={uploadedFile?.sessionId ?? currentSessionId}
         />
 
         {/* Old header removed */}
@@ -334,6 +364,17 @@ export default function Index() {
 
                   {(mode === 'chat' || mode === 'file_search') && (
                     <div className="max-w-3xl mx-auto space-y-8 pb-40">
+                      {olderMessagesCursor && (
+                        <div className="flex justify-center">
+                          <button
+                            onClick={loadOlderMessages}
+                            disabled={isLoadingOlder}
+                            className="text-sm text-muted-foreground hover:text-foreground transition-colors disabled:opacity-50"
+                          >
+                            {isLoadingOlder ? 'Loading…' : 'Load earlier messages'}
+                          </button>
+                        </div>
+                      )}
                       {messages.map((message) => (
                         message.role === 'assistant' && mode === 'file_search' ? (
                           <div key={message.id} className="flex gap-4 group">
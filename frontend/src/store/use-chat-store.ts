@@ -1,6 +1,6 @@
 import { create } from 'zustand';
-import { SessionSummary, SessionDetail } from '@/types/history';
-import { listSessions, getSession, renameSession, deleteSession, type PersonCard, type CompanyCard } from '@/lib/api';
+import { SessionSummary, BackendMessage } from '@/types/history';
+import { listSessions, getSession, getSessionMessages, renameSession, deleteSession, type PersonCard, type CompanyCard } from '@/lib/api';
 import { Message } from '@/components/ChatMessage';
 
 interface ChatState {
@@ -8,6 +8,8 @@ interface ChatState {
     currentSessionId: number | null;
     currentSessionMessages: Message[];
     currentSessionMeta: SessionSummary | null;
+    olderMessagesCursor: string | null; // set while older messages remain to be loaded
+    isLoadingOlder: boolean;
     isLoading: boolean;
     error: string | null;
     isSidebarOpen: boolean;
@@ -15,6 +17,7 @@ interface ChatState {
     // Actions
     fetchSessions: () => Promise<void>;
     selectSession: (sessionId: number) => Promise<void>;
+    loadOlderMessages: () => Promise<void>;
     clearCurrentSession: () => void;
     createNewSession: () => void; // Resets current session state for a new chat
     deleteSession: (sessionId: number) => Promise<void>;
@@ -29,11 +32,57 @@ interface ChatState {
     setCurrentSessionMeta: (session: SessionSummary | null) => void;
 }
 
+const MESSAGE_PAGE_SIZE = 50;
+
+// Transform a backend message to the frontend Message format
+const toMessage = (msg: BackendMessage): Message => {
+    let citations;
+    let cards: Array<PersonCard | CompanyCard> | undefined;
+    let content = msg.content;
+    try {
+        citations = msg.sources ? JSON.parse(msg.sources) : undefined;
+    } catch (e) {
+        console.warn('Failed to parse sources:', e);
+        citations = undefined;
+    }
+
+    // Agent answers keep their cards next to the text
+    try {
+        cards = msg.cards ? JSON.parse(msg.cards) : undefined;
+    } catch (e) {
+        console.warn('Failed to parse cards:', e);
+    }
+
+    // Search results are stored as a JSON array of cards in the content
+    try {
+        const parsed = cards ? undefined : JSON.parse(msg.content);
+        if (Array.isArray(parsed) && parsed.length > 0 && parsed[0]?.card_type) {
+            cards = parsed as Array<PersonCard | CompanyCard>;
+            // Hide raw JSON when we have rich cards
+            if (msg.role === 'assistant') {
+                content = '';
+            }
+        }
+    } catch (e) {
+        // Ignore parse errors – content stays as-is for normal chat history
+    }
+
+    return {
+        id: msg.id.toString(),
+        role: msg.role as 'user' | 'assistant',
+        content,
+        citations,
+        cards,
+    };
+};
+
 export const useChatStore = create<ChatState>((set, get) => ({
     sessions: [],
     currentSessionId: null,
     currentSessionMessages: [],
     currentSessionMeta: null,
+    olderMessagesCursor: null,
+    isLoadingOlder: false,
     isLoading: false,
     error: null,
     isSidebarOpen: true,
@@ -52,48 +101,20 @@ export const useChatStore = create<ChatState>((set, get) => ({
     },
 
     selectSession: async (sessionId: number) => {
-        set({ isLoading: true, error: null, currentSessionId: sessionId });
+        set({ isLoading: true, error: null, currentSessionId: sessionId, olderMessagesCursor: null });
         try {
-            const session = await getSession(sessionId);
-
-            // Transform backend messages to frontend Message format
-            const messages: Message[] = session.messages.map((msg) => {
-                let citations;
-                let cards: Array<PersonCard | CompanyCard> | undefined;
-                let content = msg.content;
-                try {
-                    citations = msg.sources ? JSON.parse(msg.sources) : undefined;
-                } catch (e) {
-                    console.warn('Failed to parse sources:', e);
-                    citations = undefined;
-                }
-
-                // Attempt to parse structured cards stored as JSON
-                try {
-                    const parsed = JSON.parse(msg.content);
-                    if (Array.isArray(parsed) && parsed.length > 0 && parsed[0]?.card_type) {
-                        cards = parsed as Array<PersonCard | CompanyCard>;
-                        // Hide raw JSON when we have rich cards
-                        if (msg.role === 'assistant') {
-                            content = '';
-                        }
-                    }
-                } catch (e) {
-                    // Ignore parse errors – content stays as-is for normal chat history
-                }
-
-                return {
-                    id: msg.id.toString(),
-                    role: msg.role as 'user' | 'assistant',
-                    content,
-                    citations,
-                    cards,
-                };
-            });
+            // Session metadata and the latest page of messages, in parallel
+            const [session, page] = await Promise.all([
+                getSession(sessionId, false),
+                getSessionMessages(sessionId, { limit: MESSAGE_PAGE_SIZE }),
+            ]);
+            // A newer selection won the race
+            if (get().currentSessionId !== sessionId) return;
 
             set({
-                currentSessionMessages: messages,
+                currentSessionMessages: page.messages.map(toMessage),
                 currentSessionMeta: session,
+                olderMessagesCursor: page.has_more_before ? page.before ?? null : null,
                 isLoading: false
             });
         } catch (error) {
@@ -102,12 +123,30 @@ export const useChatStore = create<ChatState>((set, get) => ({
         }
     },
 
+    loadOlderMessages: async () => {
+        const { currentSessionId: sessionId, olderMessagesCursor: cursor, isLoadingOlder } = get();
+        if (sessionId === null || !cursor || isLoadingOlder) return;
+        set({ isLoadingOlder: true });
+        try {
+            const page = await getSessionMessages(sessionId, { limit: MESSAGE_PAGE_SIZE, before: cursor });
+            if (get().currentSessionId !== sessionId) return;
+            set((state) => ({
+                currentSessionMessages: [...page.messages.map(toMessage), ...state.currentSessionMessages],
+                olderMessagesCursor: page.has_more_before ? page.before ?? null : null,
+            }));
+        } catch (error) {
+            console.error('Failed to load older messages:', error);
+        } finally {
+            set({ isLoadingOlder: false });
+        }
+    },
+
     clearCurrentSession: () => {
-        set({ currentSessionId: null, currentSessionMessages: [], currentSessionMeta: null });
+        set({ currentSessionId: null, currentSessionMessages: [], currentSessionMeta: null, olderMessagesCursor: null });
     },
 
     createNewSession: () => {
-        set({ currentSessionId: null, currentSessionMessages: [] });
+        set({ currentSessionId: null, currentSessionMessages: [], olderMessagesCursor: null });
     },
 
     deleteSession: async (sessionId: number) => {
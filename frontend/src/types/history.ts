@@ -15,11 +15,20 @@ export interface BackendMessage {
     role: string;
     content: string;
     sources?: string; // JSON string from backend
+    cards?: string | null; // JSON array of person/company cards (agent answers)
     created_at: string;
 }
 
 export interface SessionDetail extends SessionSummary {
-    messages: BackendMessage[];
+    messages?: BackendMessage[] | null; // omitted with include_messages=false
+}
+
+export interface MessagePage {
+    messages: BackendMessage[]; // oldest first
+    before?: string | null; // cursor for the previous (older) page
+    after?: string | null; // cursor for the next (newer) page
+    has_more_before: boolean;
+    has_more_after: boolean;
 }
 
 export interface SessionUpdate {